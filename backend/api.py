@@ -1,11 +1,17 @@
 import os
 import sys
 from pathlib import Path
-from creation_base_donnees.models import Article, ArticleManufacturer, Nomenclature, Image
-from sqlmodel import Session, select, create_engine
-from sqlmodel import or_
+from creation_base_donnees.models import (
+    Article, ArticleManufacturer, Nomenclature, NomenclatureLevel, NomenclatureClosure, Image, ImageMiniature, ArticleImage
+)
+from creation_base_donnees.items import Nomenclatures, NomenclatureCycleError
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+from sqlmodel import or_, text
 from sqlmodel import func
 import logging
+from creation_base_donnees.publication import MANIFEST_NAME, read_manifest, images_path
+from backend.snapshots import SnapshotManager, snapshot_url, file_uri, is_immutable, url_path
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -19,29 +25,66 @@ def get_executable_dir():
         # Si on est en développement
         return os.path.dirname(os.path.dirname(__file__))
 
+def get_configured_path(db_path=None):
+    """
+    Retourne le chemin configuré : une base SQLite ou le manifeste de publication
+    (articles_manifest.json). Si db_path n'est pas spécifié, il est lu depuis
+    database_settings.txt, à défaut le manifeste ou articles.db à côté de l'exécutable.
+    """
+    if db_path is None:
+        executable_dir = get_executable_dir()
+        settings_file = os.path.join(executable_dir, 'database_settings.txt')
+
+        if os.path.exists(settings_file):
+            with open(settings_file, 'r', encoding='utf-8') as f:
+                db_path = f.readline().strip()
+            logger.info(f"Chemin de la base de données lu depuis settings: {db_path}")
+        else:
+            db_path = os.path.join(executable_dir, MANIFEST_NAME)
+            if not os.path.exists(db_path):
+                db_path = os.path.join(executable_dir, 'articles.db')
+            logger.info(f"Fichier settings non trouvé, utilisation du chemin par défaut: {db_path}")
+
+    # Convertir en chemin absolu si ce n'est pas déjà le cas
+    return os.path.abspath(db_path)
+
+def get_replica_dir():
+    """
+    Dossier de la réplique locale de la base, activée par une ligne
+    replique_locale=<dossier> dans database_settings.txt ; None si elle n'est pas activée.
+    """
+    settings_file = os.path.join(get_executable_dir(), 'database_settings.txt')
+    if not os.path.exists(settings_file):
+        return None
+    with open(settings_file, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()[1:]
+    for line in lines:
+        key, _, value = line.partition('=')
+        if key.strip() == 'replique_locale' and value.strip():
+            return os.path.abspath(os.path.expanduser(value.strip()))
+    return None
+
 def get_database_url(db_path=None):
     """
     Retourne l'URL de la base de données
-    Si db_path n'est pas spécifié, utilise le chemin par défaut
+    Si db_path n'est pas spécifié, utilise le chemin par défaut.
+    Si db_path désigne un manifeste de publication, la base utilisée est
+    la version qu'il référence. Une version que le manifeste déclare immuable
+    est ouverte en lecture seule (sans verrou ni recherche de journal).
     """
     try:
         logger.info("Récupération du chemin de la base de données")
-        
-        # Utiliser le chemin fourni ou lire depuis le fichier settings
-        if db_path is None:
-            executable_dir = get_executable_dir()
-            settings_file = os.path.join(executable_dir, 'database_settings.txt')
-            
-            if os.path.exists(settings_file):
-                with open(settings_file, 'r', encoding='utf-8') as f:
-                    db_path = f.readline().strip()
-                logger.info(f"Chemin de la base de données lu depuis settings: {db_path}")
-            else:
-                db_path = os.path.join(executable_dir, 'articles.db')
-                logger.info(f"Fichier settings non trouvé, utilisation du chemin par défaut: {db_path}")
-        
-        # Convertir en chemin absolu si ce n'est pas déjà le cas
-        db_path = os.path.abspath(db_path)
+        db_path = get_configured_path(db_path)
+        immutable = False
+
+        if db_path.endswith('.json'):
+            manifest = read_manifest(db_path)
+            if manifest is None:
+                logger.error(f"Manifeste de publication non trouvé à {db_path}")
+                raise FileNotFoundError(f"Manifeste de publication non trouvé à {db_path}")
+            logger.info(f"Version publiée : {manifest['version']}")
+            db_path = os.path.join(os.path.dirname(db_path), manifest['fichier'])
+            immutable = manifest.get('immutable', False)
         logger.info(f"Chemin final de la base de données: {db_path}")
         
         if not os.path.exists(db_path):
@@ -49,7 +92,7 @@ def get_database_url(db_path=None):
             raise FileNotFoundError(f"Base de données non trouvée à {db_path}")
         
         # Construire et retourner l'URL SQLAlchemy
-        url = f"sqlite:///{db_path}"
+        url = snapshot_url(db_path, immutable)
         logger.info(f"URL de la base de données: {url}")
         return url
         
@@ -57,23 +100,22 @@ def get_database_url(db_path=None):
         logger.error(f"Erreur lors de la récupération du chemin de la base de données: {str(e)}", exc_info=True)
         raise
 
-# Variable globale pour stocker l'URL de la base de données
-DATABASE_URL = get_database_url()
-engine = create_engine(DATABASE_URL)
+# Base lue par l'application : bascule sur chaque nouvelle version publiée,
+# et sur sa réplique locale si elle est activée
+snapshots = SnapshotManager(get_configured_path(), get_database_url, get_replica_dir())
 
 def set_database_path(db_path):
     """
-    Permet de changer le chemin de la base de données
+    Permet de changer le chemin de la base de données (base SQLite ou manifeste de publication)
     """
-    global DATABASE_URL, engine
-    DATABASE_URL = get_database_url(db_path)
-    engine = create_engine(DATABASE_URL)
+    snapshots.configure(get_configured_path(db_path))
 
 def get_session():
     """
     Crée et retourne une nouvelle session de base de données
+    sur la dernière version publiée (sa réplique locale si elle est prête)
     """
-    return Session(engine)
+    return snapshots.session()
 
 # Fonction pour récupérer tous les articles
 def get_all_articles():
@@ -348,13 +390,178 @@ def search_articles(search_term):
             )
         ).all()
 
-def get_article_tree(code_article, level=0, max_depth=10):
+def get_nomenclature_level(code_article):
+    """
+    Position de l'article dans le graphe des nomenclatures, calculée à la construction.
+
+    Returns:
+        NomenclatureLevel: niveau, hauteur, nombre de descendants et cycle de
+        l'article, None s'il n'apparaît dans aucune nomenclature
+    """
+    with get_session() as session:
+        try:
+            return session.get(NomenclatureLevel, code_article)
+        except OperationalError:
+            # Base construite avant l'ajout de la table nomenclaturelevel
+            return None
+
+def get_tree_height(code_article):
+    """
+    Nombre de niveaux sous l'article dans ses nomenclatures, None si un cycle
+    est atteint (arbre infini) ou si l'information n'est pas disponible
+    """
+    level = get_nomenclature_level(code_article)
+    return level.hauteur if level is not None else None
+
+# Lignes de nomenclature sous un article, à tous les niveaux (UNION : chaque
+# article n'est développé qu'une fois, même en cas de cycle)
+_DESCENDANT_LINES_SQL = text("""
+    WITH RECURSIVE sous_ensembles(code) AS (
+        SELECT :code
+        UNION
+        SELECT n.code_article_fils FROM nomenclature n JOIN sous_ensembles s ON n.code_article_parent = s.code
+    )
+    SELECT n.code_article_parent, n.code_article_fils, n.quantite
+    FROM nomenclature n JOIN sous_ensembles s ON n.code_article_parent = s.code
+""")
+
+# Ancêtres d'un article dont la fermeture n'est pas matérialisée : ceux-ci
+# n'ont que des ancêtres non matérialisés, la remontée ne parcourt qu'eux
+_UNMATERIALIZED_ANCESTORS_SQL = text("""
+    WITH RECURSIVE ancetres(code) AS (
+        SELECT n.code_article_parent FROM nomenclature n
+        JOIN nomenclaturelevel l ON l.code_article = n.code_article_parent AND NOT l.fermeture_materialisee
+        WHERE n.code_article_fils = :code
+           OR n.code_article_fils IN (SELECT ancestor FROM nomenclature_closure WHERE descendant = :code)
+        UNION
+        SELECT n.code_article_parent FROM nomenclature n JOIN ancetres a ON n.code_article_fils = a.code
+    )
+    SELECT code FROM ancetres
+""")
+
+def _closure_materialized(session, code_article):
+    """
+    Les descendants de l'article sont dans nomenclature_closure (vrai pour un
+    article sans nomenclature, faux pour une base construite avant l'ajout de
+    la fermeture : ils sont alors parcourus par _DESCENDANT_LINES_SQL)
+    """
+    try:
+        level = session.get(NomenclatureLevel, code_article)
+    except OperationalError:
+        session.rollback()
+        return False
+    return level is None or level.fermeture_materialisee
+
+def _descendant_nomenclatures(session, code_article):
+    """Nomenclatures de l'article à tous les niveaux, pour les articles hors de la fermeture matérialisée"""
+    rows = session.exec(_DESCENDANT_LINES_SQL, params={"code": code_article}).all()
+    return Nomenclatures.from_lines(rows)
+
+def article_contains(code_article, code_article_fils):
+    """
+    Indique si un article contient un autre article, à n'importe quel niveau de ses nomenclatures.
+
+    Args:
+        code_article: Le code de l'article contenant (équipement)
+        code_article_fils: Le code de l'article recherché
+
+    Returns:
+        bool: True si code_article_fils apparaît sous code_article
+    """
+    with get_session() as session:
+        if _closure_materialized(session, code_article):
+            return session.get(NomenclatureClosure, (code_article, code_article_fils)) is not None
+        if code_article_fils == code_article:
+            # Comme dans nomenclature_closure : un article d'un cycle n'est pas son propre descendant
+            return False
+        rows = session.exec(_DESCENDANT_LINES_SQL, params={"code": code_article}).all()
+        return any(row.code_article_fils == code_article_fils for row in rows)
+
+def get_where_used(code_article):
+    """
+    Récupère tous les articles qui contiennent un article, à tous les niveaux de leurs nomenclatures.
+
+    Args:
+        code_article: Le code de l'article recherché
+
+    Returns:
+        List[dict]: Articles contenant l'article, avec la profondeur minimale,
+        la quantité totale et le nombre de chemins (None si un cycle est
+        atteint ou hors de la fermeture matérialisée)
+    """
+    with get_session() as session:
+        results = session.exec(
+            select(NomenclatureClosure, Article)
+            .join(Article, NomenclatureClosure.ancestor == Article.code_article)
+            .where(NomenclatureClosure.descendant == code_article)
+        ).all()
+        where_used = [
+            {
+                "code_article": article.code_article,
+                "libelle_court_article": article.libelle_court_article,
+                "type_article": article.type_article,
+                "statut_abrege_article": article.statut_abrege_article,
+                "profondeur_min": closure.min_depth,
+                "quantite_totale": closure.cumulative_quantity,
+                "nb_chemins": closure.path_count,
+            }
+            for closure, article in results
+        ]
+        ancestors = [
+            ancestor for ancestor in session.exec(_UNMATERIALIZED_ANCESTORS_SQL, params={"code": code_article}).scalars()
+            if ancestor != code_article
+        ]
+        if ancestors:
+            for article in session.exec(select(Article).where(Article.code_article.in_(ancestors))).all():
+                where_used.append({
+                    "code_article": article.code_article,
+                    "libelle_court_article": article.libelle_court_article,
+                    "type_article": article.type_article,
+                    "statut_abrege_article": article.statut_abrege_article,
+                    "profondeur_min": None,
+                    "quantite_totale": None,
+                    "nb_chemins": None,
+                })
+        return where_used
+
+def get_total_quantity(code_article, code_article_fils):
+    """
+    Quantité totale d'un article dans un autre, tous niveaux et chemins confondus.
+
+    Args:
+        code_article: Le code de l'article contenant (équipement)
+        code_article_fils: Le code de l'article recherché
+
+    Returns:
+        float: la quantité totale, 0 si l'article n'est pas contenu, None si
+        un cycle est atteint (quantité infinie)
+    """
+    with get_session() as session:
+        if _closure_materialized(session, code_article):
+            closure = session.get(NomenclatureClosure, (code_article, code_article_fils))
+            return closure.cumulative_quantity if closure is not None else 0.0
+        nomenclatures = _descendant_nomenclatures(session, code_article)
+        try:
+            return float(nomenclatures.get_item_total_quantities(code_article).get(code_article_fils, 0.0))
+        except NomenclatureCycleError:
+            # Un cycle est atteint depuis l'article : la quantité totale est infinie
+            return None
+
+def get_article_tree(code_article, level=0, max_depth=None):
     """
     Récupère l'arborescence complète d'un article avec ses nomenclatures.
     Retourne un dictionnaire avec la structure de l'arbre.
+
+    Sans max_depth, la profondeur est la hauteur de l'article calculée à la
+    construction : l'arbre est parcouru entièrement ; elle est limitée à 10
+    niveaux si un cycle est atteint.
     """
     print(f"Recherche de l'arborescence pour l'article {code_article} (niveau {level})")
-    
+
+    if max_depth is None:
+        height = get_tree_height(code_article)
+        max_depth = height + 1 if height is not None else 10
+
     if level >= max_depth:  # Éviter les boucles infinies
         print(f"Niveau maximum atteint pour {code_article}")
         return None
@@ -501,6 +708,39 @@ def get_full_article_tree(code_article):
     # Récupérer le contenu du buffer
     return f.getvalue()
 
+def _attach_images(session):
+    """
+    Attache, au premier besoin, le fichier des images (images_<version>.db) à la
+    connexion de la session : la table image y est ensuite lue sans préfixe.
+    Les requêtes qui ne lisent pas d'images n'ouvrent jamais ce fichier. Une
+    base antérieure à la séparation des images contient elle-même la table image.
+    """
+    connection = session.connection()
+    if connection.exec_driver_sql("SELECT 1 FROM pragma_database_list WHERE name = 'images'").first():
+        return
+    path = images_path(url_path(connection.engine.url))
+    if path.exists():
+        # Le fichier d'images d'une version immuable l'est aussi
+        target = file_uri(path, immutable=True) if is_immutable(connection.engine.url) else str(path)
+        connection.exec_driver_sql("ATTACH DATABASE ? AS images", (target,))
+
+def _legacy_article_images(session, code_article, columns):
+    """
+    Lignes (columns) des images d'un article dans une base construite avant la
+    table articleimage, où chaque image porte son code article. Liste vide si
+    la table image est absente (fichier d'images manquant).
+    """
+    session.rollback()
+    _attach_images(session)
+    try:
+        return session.connection().exec_driver_sql(
+            f"SELECT {columns} FROM image WHERE code_article = ? ORDER BY id", (code_article,)
+        ).all()
+    except OperationalError as e:
+        logger.warning(f"Images de l'article {code_article} illisibles : {str(e)}")
+        session.rollback()
+        return []
+
 def get_images_by_article(code_article: str):
     """
     Récupère toutes les images associées à un article.
@@ -509,10 +749,57 @@ def get_images_by_article(code_article: str):
         code_article: Le code de l'article dont on veut les images
         
     Returns:
-        List[Image]: Liste des images de l'article
+        List[Image]: Liste des images de l'article ; pour une base construite
+        avant la table articleimage, seuls leur identifiant et l'image sont renseignés
     """
     with get_session() as session:
-        images = session.exec(
-            select(Image).where(Image.code_article == code_article)
-        ).all()
-        return images
+        _attach_images(session)
+        try:
+            return session.exec(
+                select(Image)
+                .join(ArticleImage, ArticleImage.image_id == Image.id)
+                .where(ArticleImage.code_article == code_article)
+                .order_by(Image.id)
+            ).all()
+        except OperationalError:
+            return [
+                Image(id=image_id, image=image)
+                for image_id, image in _legacy_article_images(session, code_article, "id, image")
+            ]
+
+
+def get_image_thumbnails(code_article: str):
+    """
+    Récupère les miniatures des images d'un article, sans lire les images en
+    taille réelle (voir get_image_data).
+
+    Args:
+        code_article: Le code de l'article dont on veut les images
+
+    Returns:
+        List[tuple[int, bytes]]: identifiant et miniature de chaque image ; la
+        miniature est None pour une base construite avant leur ajout
+    """
+    with get_session() as session:
+        try:
+            return session.exec(
+                select(ImageMiniature.image_id, ImageMiniature.miniature)
+                .join(ArticleImage, ArticleImage.image_id == ImageMiniature.image_id)
+                .where(ArticleImage.code_article == code_article)
+                .order_by(ImageMiniature.image_id)
+            ).all()
+        except OperationalError:
+            # Base construite avant l'ajout des miniatures et de la table articleimage
+            return [(image_id, None) for (image_id,) in _legacy_article_images(session, code_article, "id")]
+
+
+def get_image_data(image_id: int):
+    """
+    Récupère une image en taille réelle, lue seulement quand elle est affichée.
+
+    Returns:
+        bytes: l'image, None si elle n'existe pas
+    """
+    with get_session() as session:
+        _attach_images(session)
+        return session.exec(select(Image.image).where(Image.id == image_id)).first()
@@ -0,0 +1,218 @@
+"""
+Réplique locale de la base publiée sur le partage réseau.
+
+Les versions publiées (articles_<version>.db, images_<version>.db) ne sont
+jamais modifiées : une fois copiée et vérifiée, une version est lue en local,
+sans aller-retour réseau pour chaque page lue. La copie se fait par blocs :
+les blocs de la version précédente déjà répliquée dont l'empreinte est celle
+publiée dans le manifeste sont repris en local, seuls les autres sont lus sur
+le partage. Chaque bloc est vérifié avant que la copie ne soit utilisée.
+"""
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from creation_base_donnees.publication import read_manifest, block_hash, read_only_uri
+
+logger = logging.getLogger(__name__)
+
+# Nombre de versions conservées dans le dossier de la réplique
+REPLICA_VERSIONS_KEPT = 2
+# Taille des blocs copiés quand le manifeste ne porte pas d'empreintes
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class ReplicaError(Exception):
+    """Levée quand la copie locale ne correspond pas à la version publiée"""
+
+
+def _version_pattern(name: str) -> str:
+    """articles_<version>.db -> articles_????????_??????_??????.db (idem pour images_)"""
+    return name.split("_", 1)[0] + "_????????_??????_??????.db"
+
+
+def _previous_copy(folder: Path, name: str) -> Path | None:
+    """Copie locale la plus récente d'une autre version du même fichier"""
+    copies = sorted((path for path in folder.glob(_version_pattern(name)) if path.name != name), reverse=True)
+    return copies[0] if copies else None
+
+
+def _quick_check(path):
+    connection = sqlite3.connect(read_only_uri(path), uri=True)
+    try:
+        result = connection.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        connection.close()
+    if result != "ok":
+        raise ReplicaError(f"Contrôle d'intégrité en échec pour {path} : {result}")
+
+
+def _check_stopped(stop):
+    if stop is not None and stop.is_set():
+        raise ReplicaError("Synchronisation de la réplique interrompue")
+
+
+def copy_file(remote, local, hashes=None, block_size=COPY_BLOCK_SIZE, previous=None, stop=None) -> dict[str, int]:
+    """
+    Copie un fichier publié dans la réplique. Avec les empreintes du manifeste,
+    un bloc identique dans previous (copie locale d'une version antérieure)
+    est repris sans lecture réseau, et chaque bloc est vérifié. La copie est
+    écrite dans un fichier temporaire et ne prend son nom qu'une fois vérifiée.
+    Elle est abandonnée dès que l'événement stop est levé.
+
+    Returns:
+        dict: nombre de blocs repris en local et lus sur le partage
+
+    Raises:
+        ReplicaError: si un bloc lu, la taille ou l'intégrité SQLite de la copie
+        ne correspondent pas à la version publiée, ou si la copie est interrompue
+    """
+    remote, local = Path(remote), Path(local)
+    tmp_path = local.with_name(local.name + ".tmp")
+    stats = {"blocs_locaux": 0, "blocs_distants": 0}
+    try:
+        with open(remote, "rb") as source, open(tmp_path, "wb") as destination, \
+                (open(previous, "rb") if previous else nullcontext()) as previous_file:
+            if hashes is None:
+                while block := source.read(block_size):
+                    _check_stopped(stop)
+                    destination.write(block)
+                    stats["blocs_distants"] += 1
+            for index, expected in enumerate(hashes or []):
+                _check_stopped(stop)
+                block = None
+                if previous_file is not None:
+                    previous_file.seek(index * block_size)
+                    candidate = previous_file.read(block_size)
+                    if candidate and block_hash(candidate) == expected:
+                        block = candidate
+                        stats["blocs_locaux"] += 1
+                if block is None:
+                    source.seek(index * block_size)
+                    block = source.read(block_size)
+                    if block_hash(block) != expected:
+                        raise ReplicaError(f"Bloc {index} de {remote} différent de celui publié")
+                    stats["blocs_distants"] += 1
+                destination.write(block)
+            destination.flush()
+            os.fsync(destination.fileno())
+
+        if tmp_path.stat().st_size != remote.stat().st_size:
+            raise ReplicaError(f"Taille de la copie de {remote} différente de celle publiée")
+        _quick_check(tmp_path)
+        os.replace(tmp_path, local)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return stats
+
+
+def _remove_old_copies(folder: Path, keep: int):
+    for pattern in ("articles_????????_??????_??????.db", "images_????????_??????_??????.db"):
+        for path in sorted(folder.glob(pattern), reverse=True)[keep:]:
+            try:
+                path.unlink()
+                logger.info(f"Ancienne copie locale supprimée : {path}")
+            except OSError as e:
+                # Copie encore ouverte : elle sera supprimée à la prochaine synchronisation
+                logger.warning(f"Impossible de supprimer {path} : {str(e)}")
+
+
+def sync(manifest_path, folder, stop=None) -> tuple[Path, Path]:
+    """
+    Met la réplique à jour avec la version référencée par le manifeste. Une
+    version déjà copiée n'est pas relue : un fichier de la réplique ne porte
+    son nom qu'après vérification. La copie en cours est abandonnée dès que
+    l'événement stop est levé.
+
+    Returns:
+        tuple[Path, Path]: base publiée sur le partage et sa copie locale
+    """
+    manifest = read_manifest(manifest_path)
+    if manifest is None:
+        raise FileNotFoundError(f"Manifeste de publication non trouvé à {manifest_path}")
+    remote_folder = Path(manifest_path).parent
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    names = [manifest["fichier"]] + ([manifest["images"]] if "images" in manifest else [])
+    blocks = manifest.get("blocs", {})
+    # Le fichier d'images est copié avant la base qui le référence
+    for name in reversed(names):
+        remote, local = remote_folder / name, folder / name
+        if local.exists() and local.stat().st_size == remote.stat().st_size:
+            continue
+        stats = copy_file(
+            remote, local, blocks.get(name), manifest.get("taille_bloc", COPY_BLOCK_SIZE), _previous_copy(folder, name),
+            stop
+        )
+        logger.info(
+            f"Réplique de {name} : {stats['blocs_locaux']} blocs repris en local, "
+            f"{stats['blocs_distants']} lus sur le partage"
+        )
+
+    _remove_old_copies(folder, keep=REPLICA_VERSIONS_KEPT)
+    return remote_folder / manifest["fichier"], folder / manifest["fichier"]
+
+
+class ReplicaSync:
+    """
+    Synchronisation de la réplique dans un thread d'arrière-plan. Tant que la
+    copie de la version publiée n'est pas vérifiée, ready() renvoie None et
+    la base est lue sur le partage.
+    """
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self._lock = threading.Lock()
+        self._requested = None
+        self._thread = None
+        self._ready = {}
+        self._stop = threading.Event()
+
+    def start(self, manifest_path):
+        """Lance la synchronisation (ou la relance après celle en cours)"""
+        with self._lock:
+            if self._stop.is_set():
+                return
+            self._requested = manifest_path
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="replique_locale", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Arrête définitivement la synchronisation : la copie en cours est
+        abandonnée et le thread attendu, pour qu'une autre réplique puisse
+        écrire dans le même dossier.
+        """
+        with self._lock:
+            self._stop.set()
+            self._requested = None
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def ready(self, name: str) -> Path | None:
+        """Copie locale vérifiée de la base publiée sous ce nom, None si elle n'est pas prête"""
+        with self._lock:
+            return self._ready.get(name)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                manifest_path, self._requested = self._requested, None
+                if manifest_path is None or self._stop.is_set():
+                    self._thread = None
+                    return
+            try:
+                remote, local = sync(manifest_path, self.folder, self._stop)
+                with self._lock:
+                    self._ready = {remote.name: local}
+            except Exception as e:
+                if self._stop.is_set():
+                    logger.info(f"Synchronisation de la réplique locale {self.folder} arrêtée")
+                    continue
+                # La base reste lue sur le partage
+                logger.error(f"Erreur lors de la synchronisation de la réplique locale : {str(e)}")
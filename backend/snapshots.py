@@ -0,0 +1,241 @@
+"""
+Base lue par l'application et bascule à chaud sur une nouvelle version.
+
+Le SnapshotManager surveille le fichier configuré (manifeste de publication
+ou base SQLite). Quand une nouvelle version est publiée, les nouvelles
+sessions lisent la nouvelle base. Les sessions ouvertes terminent leurs
+requêtes sur l'ancienne base, dont le moteur n'est fermé qu'à la fermeture
+de sa dernière session. Les abonnés (caches, interface) sont ensuite prévenus.
+"""
+import os
+import re
+import logging
+import threading
+from pathlib import Path
+from time import monotonic
+from urllib.parse import unquote, urlsplit
+from sqlalchemy import event, make_url
+from sqlmodel import Session, create_engine
+from creation_base_donnees.publication import file_uri
+from backend.replica import ReplicaSync
+
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal (en secondes) entre deux vérifications du fichier configuré
+MANIFEST_CHECK_INTERVAL = 2.0
+# Taille maximale projetée en mémoire (mmap) d'une version publiée ouverte en lecture seule
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def snapshot_url(db_path, immutable=False) -> str:
+    """URL SQLAlchemy d'une base ; une version publiée immuable est ouverte par URI en lecture seule"""
+    if not immutable:
+        return f"sqlite:///{db_path}"
+    return f"sqlite:///{file_uri(db_path, immutable=True)}&uri=true"
+
+
+def is_immutable(url) -> bool:
+    return make_url(url).query.get("immutable") == "1"
+
+
+def url_path(url) -> str:
+    """Chemin du fichier d'une URL SQLAlchemy, qu'elle soit un chemin ou une URI file:"""
+    database = make_url(url).database
+    if not database.startswith("file:"):
+        return database
+    path = unquote(urlsplit(database).path)
+    # /C:/... -> C:/...
+    return path[1:] if re.match(r"/[A-Za-z]:", path) else path
+
+
+def create_snapshot_engine(url):
+    """
+    Moteur d'une base. Pour une version immuable, chaque connexion est en
+    lecture seule (query_only) et lit le fichier par projection en mémoire.
+    """
+    engine = create_engine(url)
+    if is_immutable(url):
+        @event.listens_for(engine, "connect")
+        def _read_only_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA query_only = ON")
+            cursor.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            cursor.close()
+    return engine
+
+
+class _TrackedSession(Session):
+    """Session qui signale sa fermeture au SnapshotManager"""
+
+    def __init__(self, engine, release):
+        super().__init__(engine)
+        self._tracked_engine = engine
+        self._release = release
+
+    def close(self):
+        super().close()
+        if self._release is not None:
+            release, self._release = self._release, None
+            release(self._tracked_engine)
+
+
+class SnapshotManager:
+    """
+    Moteur de la base lue par l'application, remplacé à chaque nouvelle version.
+
+    Args:
+        configured_path: manifeste de publication ou base SQLite
+        resolve_url: fonction donnant l'URL de la base à lire pour ce chemin
+        replica_dir: dossier de la réplique locale, None si elle n'est pas activée
+        check_interval: intervalle minimal entre deux vérifications du fichier configuré
+    """
+
+    def __init__(self, configured_path, resolve_url, replica_dir=None, check_interval=MANIFEST_CHECK_INTERVAL):
+        self.resolve_url = resolve_url
+        self.replica_dir = replica_dir
+        self.check_interval = check_interval
+        self.engine = None
+        self.url = None
+        self.replica = None
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._in_flight = {}
+        self._retired = []
+        self.configure(configured_path, notify=False)
+
+    def configure(self, configured_path, notify=True):
+        """Change le fichier configuré : les sessions suivantes lisent la base qu'il désigne"""
+        with self._lock:
+            self.configured_path = configured_path
+            self.manifest_path = configured_path if configured_path.endswith('.json') else None
+            self.published_url = self.resolve_url(configured_path)
+            self._checked_at = monotonic()
+            self._seen_mtime = self._watched_mtime()
+            # La réplique de l'ancien fichier configuré est arrêtée avant d'en lancer une autre
+            if self.replica is not None:
+                self.replica.stop()
+            self.replica = self._start_replica()
+            self._swap(self.published_url)
+        if notify:
+            self._notify()
+
+    def _start_replica(self):
+        """
+        Réplique locale (optionnelle) de la version publiée : copiée en arrière-plan,
+        elle n'est lue qu'une fois vérifiée. Seules les bases publiées par manifeste,
+        dont les versions ne sont jamais modifiées, peuvent être répliquées.
+        """
+        if self.replica_dir is None:
+            return None
+        if self.manifest_path is None:
+            logger.warning("La réplique locale nécessite une base publiée par manifeste : elle n'est pas utilisée")
+            return None
+        logger.info(f"Réplique locale de la base dans {self.replica_dir}")
+        replica = ReplicaSync(self.replica_dir)
+        replica.start(self.manifest_path)
+        return replica
+
+    def add_listener(self, callback):
+        """
+        Abonne callback(url) aux changements de version. Il peut être appelé
+        depuis n'importe quel thread qui ouvre une session.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners.remove(callback)
+
+    def _notify(self):
+        with self._lock:
+            listeners, url = list(self._listeners), self.url
+        for callback in listeners:
+            try:
+                callback(url)
+            except Exception as e:
+                logger.error(f"Erreur lors de la notification du changement de version : {str(e)}")
+
+    def _watched_mtime(self):
+        """Date de modification du fichier configuré, None s'il est inaccessible"""
+        try:
+            return os.stat(self.configured_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _swap(self, url):
+        """Les nouvelles sessions lisent url ; l'ancien moteur est fermé une fois ses sessions fermées"""
+        previous = self.engine
+        self.url = url
+        self.engine = create_snapshot_engine(url)
+        self.generation += 1
+        if previous is not None:
+            self._retired.append(previous)
+            self._dispose_drained()
+
+    def _dispose_drained(self):
+        for engine in [engine for engine in self._retired if engine not in self._in_flight]:
+            self._retired.remove(engine)
+            engine.dispose()
+
+    def _release(self, engine):
+        with self._lock:
+            self._in_flight[engine] -= 1
+            if not self._in_flight[engine]:
+                del self._in_flight[engine]
+                self._dispose_drained()
+
+    def check(self) -> bool:
+        """
+        Bascule sur la nouvelle version si le fichier configuré a été republié
+        (au plus une vérification par check_interval), ou sur la réplique locale
+        de la version publiée dès qu'elle est vérifiée.
+
+        Returns:
+            bool: True si une nouvelle version est lue (les abonnés ont été prévenus)
+        """
+        with self._lock:
+            changed = self._check_published()
+            if not changed:
+                self._check_replica()
+        if changed:
+            self._notify()
+        return changed
+
+    def _check_published(self) -> bool:
+        if monotonic() - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = monotonic()
+        mtime = self._watched_mtime()
+        if mtime is None or mtime == self._seen_mtime:
+            return False
+        self._seen_mtime = mtime
+        url = self.resolve_url(self.configured_path)
+        # Une base configurée directement, remplacée sur place, garde son URL
+        if self.manifest_path is not None and url == self.published_url:
+            return False
+        logger.info(f"Nouvelle version publiée, bascule vers {url}")
+        self.published_url = url
+        self._swap(url)
+        # La nouvelle version est lue sur le partage jusqu'à ce que sa copie locale soit vérifiée
+        if self.replica is not None:
+            self.replica.start(self.manifest_path)
+        return True
+
+    def _check_replica(self):
+        if self.replica is None or self.url != self.published_url:
+            return
+        local = self.replica.ready(os.path.basename(url_path(self.published_url)))
+        if local is not None:
+            # Même version : les caches des abonnés restent valables
+            logger.info(f"Réplique locale vérifiée, bascule vers {local}")
+            self._swap(snapshot_url(local, immutable=is_immutable(self.published_url)))
+
+    def session(self) -> Session:
+        """Nouvelle session sur la dernière version (sa réplique locale si elle est prête)"""
+        self.check()
+        with self._lock:
+            engine = self.engine
+            self._in_flight[engine] = self._in_flight.get(engine, 0) + 1
+        return _TrackedSession(engine, self._release)
@@ -0,0 +1,127 @@
+"""
+Benchmark des formats d'encodage des images stockées (voir photos.encode_image).
+
+Pour chaque encodage (format, qualité, taille cible), redimensionne les
+photos comme l'étape image de la construction, puis mesure la taille totale
+des images, la taille du fichier SQLite qui les contient, le temps
+d'encodage et le temps de décodage (celui que paie l'application à
+l'affichage d'une image).
+
+Les photos sont lues dans --dossier ; à défaut, des photos synthétiques sont
+générées (dégradés et bruit, proches d'une photo pour l'encodeur).
+
+Usage :
+    python benchmarks/bench_image_formats.py --photos 200
+    python benchmarks/bench_image_formats.py --dossier data_input/photos --encodages JPEG:85 WEBP:80 WEBP:80:40000
+"""
+import io
+import os
+import sys
+import sqlite3
+import argparse
+import random
+import tempfile
+from time import perf_counter
+
+sys.path.append(os.getcwd())
+
+from PIL import Image as PILImage
+from creation_base_donnees.photos import EXTENSIONS_PHOTO, resize_image, encoding_label
+
+
+def make_photos(nb_photos: int, size=(1600, 1200), seed: int = 0) -> list[bytes]:
+    """Génère des photos synthétiques encodées en JPEG de haute qualité"""
+    rng = random.Random(seed)
+    photos = []
+    for _ in range(nb_photos):
+        gradient = PILImage.radial_gradient("L").resize(size)
+        noise = PILImage.effect_noise(size, rng.uniform(20, 60))
+        channels = [
+            PILImage.blend(gradient, noise, rng.uniform(0.2, 0.6)).point(lambda v, k=rng.uniform(0.5, 1.5): min(255, int(v * k)))
+            for _ in range(3)
+        ]
+        output = io.BytesIO()
+        PILImage.merge("RGB", channels).save(output, format="JPEG", quality=95)
+        photos.append(output.getvalue())
+    return photos
+
+
+def read_photos(folder: str, nb_photos: int) -> list[bytes]:
+    """Lit au plus nb_photos photos du dossier"""
+    photos = []
+    for name in sorted(os.listdir(folder)):
+        if os.path.splitext(name)[1].lower().lstrip(".") in EXTENSIONS_PHOTO:
+            with open(os.path.join(folder, name), "rb") as f:
+                photos.append(f.read())
+            if len(photos) >= nb_photos:
+                break
+    return photos
+
+
+def parse_encoder(text: str) -> dict:
+    """FORMAT:QUALITE[:CIBLE_OCTETS] -> paramètres de resize_image"""
+    parts = text.split(":")
+    return {
+        "format": parts[0].upper(),
+        "quality": int(parts[1]) if len(parts) > 1 else 85,
+        "target_bytes": int(parts[2]) if len(parts) > 2 else None,
+    }
+
+
+def database_size(images: list[bytes]) -> int:
+    """Taille du fichier SQLite d'une table image contenant ces images"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "images.db")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE image (id INTEGER PRIMARY KEY, image BLOB)")
+        connection.executemany("INSERT INTO image (image) VALUES (?)", [(image,) for image in images])
+        connection.commit()
+        connection.close()
+        return os.path.getsize(path)
+
+
+def bench(photos: list[bytes], encoder: dict) -> dict:
+    t0 = perf_counter()
+    images = [resize_image(photo, **encoder) for photo in photos]
+    t_encode = perf_counter() - t0
+
+    t0 = perf_counter()
+    for image in images:
+        PILImage.open(io.BytesIO(image)).load()
+    t_decode = perf_counter() - t0
+
+    total = sum(len(image) for image in images)
+    return {
+        "encodage": encoding_label(**encoder),
+        "octets_moyens": total / len(images),
+        "total_mo": total / 1e6,
+        "base_mo": database_size(images) / 1e6,
+        "encodage_ms": 1000 * t_encode / len(images),
+        "decodage_ms": 1000 * t_decode / len(images),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dossier", help="Dossier de photos (par défaut : photos synthétiques)")
+    parser.add_argument("--photos", type=int, default=100, help="Nombre de photos")
+    parser.add_argument("--encodages", nargs="+", default=["JPEG:85", "JPEG:75", "WEBP:85", "WEBP:75", "WEBP:80:40000"],
+                        help="Encodages comparés : FORMAT:QUALITE[:CIBLE_OCTETS]")
+    args = parser.parse_args()
+
+    photos = read_photos(args.dossier, args.photos) if args.dossier else make_photos(args.photos)
+    print(f"{len(photos)} photos, {sum(len(photo) for photo in photos) / 1e6:.1f} Mo en entrée")
+
+    results = [bench(photos, parse_encoder(text)) for text in args.encodages]
+    reference = results[0]
+    print(f"{'encodage':<24} {'moy. (ko)':>10} {'base (Mo)':>10} {'gain':>7} {'encodage':>12} {'décodage':>12}")
+    for result in results:
+        gain = 1 - result["base_mo"] / reference["base_mo"]
+        print(
+            f"{result['encodage']:<24} {result['octets_moyens'] / 1e3:>10.1f} {result['base_mo']:>10.2f} {gain:>7.0%} "
+            f"{result['encodage_ms']:>9.1f} ms {result['decodage_ms']:>9.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark de la construction de la table article (Items) depuis le fichier 521.
+
+Compare la lecture de toutes les colonnes des feuilles PIM à la lecture des
+seules colonnes du modèle Article (read_excel(..., columns=ARTICLE_SHEET_COLUMNS)),
+chacune suivie du même plan Items, dans trois situations :
+- première lecture : cache vide, les en-têtes des feuilles ne sont pas connus ;
+- à froid : le cache Parquet est vidé (nouvelle version du fichier), les
+  en-têtes retenus lors de la lecture précédente sont conservés ;
+- à chaud : les feuilles sont lues depuis le cache Parquet.
+
+À froid, le moteur Excel analyse la feuille entière quelles que soient les
+colonnes demandées : la lecture restreinte n'y est ni plus rapide ni moins
+gourmande en mémoire, et la première lecture analyse la feuille deux fois
+quand une colonne numérique contient du texte (voir load_file._read_columns).
+Elle ne réduit que les DataFrames transmis au plan et le cache Parquet, ce
+qui ne se voit qu'à chaud et dans la durée du plan.
+
+Chaque mesure est faite dans un processus neuf, avec un cache dans un dossier
+temporaire, pour que le pic de mémoire soit celui de la mesure.
+
+Usage :
+    python benchmarks/bench_items.py --dossier .\\data_input
+"""
+import os
+import sys
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from time import perf_counter
+
+sys.path.append(os.getcwd())
+
+from creation_base_donnees import load_file
+from creation_base_donnees.constants import folder_path_input, file_name_521, sheet_names_521
+from creation_base_donnees.schemas import ARTICLE_SHEET_COLUMNS
+from creation_base_donnees.load_file import read_excel
+from creation_base_donnees.items import Items
+from creation_base_donnees.profiling import peak_rss
+
+MODES = {"toutes les colonnes": None, "colonnes utiles": ARTICLE_SHEET_COLUMNS}
+PHASES = ["première lecture", "à froid", "à chaud"]
+
+
+def measure(folder: str, file_name: str, columns, cache_folder: str, phase: str) -> dict:
+    """Durées de lecture et de transformation, pic de mémoire du processus"""
+    load_file.get_cache_folder = lambda: Path(cache_folder)
+    if phase == "à froid":
+        for cache_file in Path(cache_folder).glob("*.parquet"):
+            cache_file.unlink()
+    t0 = perf_counter()
+    dfs = [read_excel(folder, file_name, sheet_name, columns=columns) for sheet_name in sheet_names_521]
+    t_read = perf_counter() - t0
+    t0 = perf_counter()
+    items = Items.from_dataframes(dfs)
+    return {
+        "lecture": t_read,
+        "transformation": perf_counter() - t0,
+        "colonnes_lues": sum(df.width for df in dfs),
+        "articles": items.items_df.height,
+        "pic_memoire": peak_rss(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dossier", default=folder_path_input, help="Dossier du fichier 521")
+    parser.add_argument("--fichier", default=file_name_521, help="Nom du fichier 521")
+    args = parser.parse_args()
+
+    print(f"{'mode':<20} {'phase':<17} {'colonnes':>9} {'articles':>9} {'lecture':>9} {'plan':>9} {'pic':>9}")
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for mode, columns in MODES.items():
+            with tempfile.TemporaryDirectory() as cache_folder:
+                for phase in PHASES:
+                    result = pool.apply(measure, (args.dossier, args.fichier, columns, cache_folder, phase))
+                    peak = "-" if result["pic_memoire"] is None else f"{result['pic_memoire'] / 1e6:.0f} Mo"
+                    print(
+                        f"{mode:<20} {phase:<17} {result['colonnes_lues']:>9} {result['articles']:>9} "
+                        f"{result['lecture']:>7.2f} s {result['transformation']:>7.3f} s {peak:>9}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark de la construction de Nomenclatures.nomenclature_dictionnary
+sur une feuille 531 synthétique.
+
+Compare l'ancienne construction (un filtre complet du DataFrame par article
+parent) à la construction par group_by.
+
+Mesure aussi le calcul des niveaux et du nombre de descendants
+(nomenclature_levels) : durée et pic de mémoire Python, comparés à l'ancien
+cumul des descendants en ensembles de bits sur tous les articles. Avec
+--acyclique, chaque fils a un indice supérieur à son parent : le graphe est
+sans cycle, comme une nomenclature réelle ; --parents 20000 le rend creux.
+
+Usage :
+    python benchmarks/bench_nomenclatures.py --lignes 300000 --parents 5000
+    python benchmarks/bench_nomenclatures.py --lignes 60000 --parents 20000 --acyclique
+"""
+import os
+import sys
+import argparse
+import random
+import tracemalloc
+from time import perf_counter
+
+sys.path.append(os.getcwd())
+
+import polars as pl
+from creation_base_donnees.items import Nomenclatures, VALID_NOMENCLATURE_LINE
+from creation_base_donnees.nomenclature_graph import nomenclature_levels, strongly_connected_components, _adjacency
+
+
+def make_sheet(nb_lines: int, nb_parents: int, seed: int = 0, acyclic: bool = False) -> pl.DataFrame:
+    """Génère une feuille 'Nomenclature Fils' synthétique (colonnes normalisées)"""
+    rng = random.Random(seed)
+    nb_codes = nb_parents * 5
+    parent_indexes = [rng.randrange(nb_parents) for _ in range(nb_lines)]
+    parents = [f"TDF{parent:06d}" for parent in parent_indexes]
+    fils = [
+        f"TDF{rng.randrange(parent + 1, nb_codes) if acyclic else rng.randrange(nb_codes):06d}"
+        for parent in parent_indexes
+    ]
+    quantites = [rng.choice([None, 0.0, 1.0, 2.0, 4.0]) for _ in range(nb_lines)]
+    return pl.DataFrame({
+        "article": parents,
+        "article_eqpt_article_fils": fils,
+        "art_et_art_fils_eqpt_quantite": quantites,
+    })
+
+
+def legacy_nomenclature_dictionnary(df: pl.DataFrame) -> dict:
+    """Ancienne construction : un filtre du DataFrame complet par article parent"""
+    nomenclature_dictionnary = {}
+    list_items = sorted(df.filter(VALID_NOMENCLATURE_LINE)["article"].unique().to_list())
+    for item in list_items:
+        nomenclature_dictionnary[item] = []
+        df_item = df.filter(
+            (pl.col("article") == item) & VALID_NOMENCLATURE_LINE
+        ).iter_rows(named=True)
+        for row in df_item:
+            nomenclature_dictionnary[item].append({"code_article": row["article_eqpt_article_fils"],
+                                                   "quantite": row["art_et_art_fils_eqpt_quantite"]})
+    return nomenclature_dictionnary
+
+
+def legacy_descendant_counts(nomenclature_df: pl.DataFrame) -> list[int]:
+    """
+    Ancien cumul des descendants : un ensemble de bits sur tous les articles
+    par composante, en O(composantes x articles / 64) mémoire
+    """
+    codes, children = _adjacency(nomenclature_df)
+    components = strongly_connected_components(children)
+    component_of = [0] * len(codes)
+    for c, members in enumerate(components):
+        for member in members:
+            component_of[member] = c
+    cyclic = [len(members) > 1 or members[0] in children[members[0]] for members in components]
+    member_bits = [sum(1 << member for member in members) for members in components]
+    descendant_bits = [0] * len(components)
+    for c, members in enumerate(components):
+        for successor in {component_of[child] for member in members for child in children[member]} - {c}:
+            descendant_bits[c] |= descendant_bits[successor] | member_bits[successor]
+        if cyclic[c]:
+            descendant_bits[c] |= member_bits[c]
+    return [descendant_bits[component_of[i]].bit_count() - cyclic[component_of[i]] for i in range(len(codes))]
+
+
+def measure_memory(function, *args):
+    """Résultat, durée et pic de mémoire Python (tracemalloc) d'un appel"""
+    tracemalloc.start()
+    t0 = perf_counter()
+    result = function(*args)
+    duration = perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lignes", type=int, default=300_000, help="Nombre de lignes de la feuille 531")
+    parser.add_argument("--parents", type=int, default=5_000, help="Nombre d'articles parents distincts")
+    parser.add_argument("--acyclique", action="store_true", help="Graphe sans cycle (fils d'indice supérieur au parent)")
+    parser.add_argument("--sans-ancien", action="store_true", help="Ne mesure pas l'ancienne construction")
+    args = parser.parse_args()
+
+    df = make_sheet(args.lignes, args.parents, acyclic=args.acyclique)
+    print(f"Feuille synthétique : {df.height} lignes, {df['article'].n_unique()} parents")
+
+    t0 = perf_counter()
+    nomenclatures = Nomenclatures.from_dataframe(df)
+    t_group_by = perf_counter() - t0
+    print(f"group_by : {t_group_by:.3f} s ({len(nomenclatures.nomenclature_dictionnary)} parents)")
+
+    if not args.sans_ancien:
+        t0 = perf_counter()
+        legacy = legacy_nomenclature_dictionnary(df)
+        t_legacy = perf_counter() - t0
+        print(f"filtre par parent : {t_legacy:.3f} s")
+        print(f"Accélération : x{t_legacy / t_group_by:.1f}")
+        assert legacy == nomenclatures.nomenclature_dictionnary, "Les deux constructions divergent"
+
+    nomenclature_df = nomenclatures.get_nomenclature_lines()
+    (levels_df, cycles), t_levels, peak_levels = measure_memory(nomenclature_levels, nomenclature_df)
+    print(
+        f"nomenclature_levels : {t_levels:.3f} s, pic {peak_levels / 1e6:.1f} Mo ({len(cycles)} cycles, "
+        f"{levels_df['nb_descendants'].sum()} descendants au total, {levels_df['nb_descendants'].max()} au plus)"
+    )
+    if not args.sans_ancien:
+        legacy_counts, t_bits, peak_bits = measure_memory(legacy_descendant_counts, nomenclature_df)
+        print(f"ensembles de bits : {t_bits:.3f} s, pic {peak_bits / 1e6:.1f} Mo")
+        assert legacy_counts == levels_df["nb_descendants"].to_list(), "Les deux décomptes divergent"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark de la latence par requête selon le mode d'ouverture de la base.
+
+Compare l'ouverture par défaut (verrou partagé et recherche de journal à
+chaque lecture) à l'ouverture en lecture seule d'une version publiée immuable
+(URI mode=ro&immutable=1, query_only, mmap_size ; voir backend/snapshots.py).
+Chaque requête ouvre sa session, comme les fonctions de backend/api.py.
+
+La base synthétique est créée dans --dossier : pointer ce dossier sur le
+partage réseau pour mesurer le gain en conditions réelles.
+
+Usage :
+    python benchmarks/bench_sqlite_immutable.py --requetes 2000
+    python benchmarks/bench_sqlite_immutable.py --dossier \\\\serveur\\partage\\bench --articles 100000
+"""
+import os
+import sys
+import sqlite3
+import argparse
+import random
+import tempfile
+import statistics
+from time import perf_counter
+
+sys.path.append(os.getcwd())
+
+from sqlmodel import Session, text
+from backend.snapshots import snapshot_url, create_snapshot_engine
+
+QUERIES = {
+    "article": "SELECT * FROM article WHERE code_article = :code",
+    "nomenclature": (
+        "SELECT a.* FROM nomenclature n JOIN article a ON a.code_article = n.code_article_fils "
+        "WHERE n.code_article_parent = :code"
+    ),
+}
+
+
+def make_database(path, nb_articles: int, seed: int = 0):
+    """Base avec une table article et une table nomenclature (3 fils par article en moyenne)"""
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE article (code_article TEXT PRIMARY KEY, libelle_court_article TEXT, type_article TEXT)")
+    connection.execute("CREATE TABLE nomenclature (code_article_parent TEXT, code_article_fils TEXT, quantite REAL)")
+    connection.execute("CREATE INDEX ix_nomenclature_parent ON nomenclature (code_article_parent)")
+    codes = [f"TDF{i:06d}" for i in range(nb_articles)]
+    connection.executemany(
+        "INSERT INTO article VALUES (?, ?, ?)", [(code, f"Libellé {code} " * 3, "PIECE") for code in codes]
+    )
+    connection.executemany(
+        "INSERT INTO nomenclature VALUES (?, ?, ?)",
+        [(rng.choice(codes), rng.choice(codes), rng.randint(1, 5)) for _ in range(3 * nb_articles)],
+    )
+    connection.commit()
+    connection.close()
+    return codes
+
+
+def bench(url: str, query: str, codes: list[str], nb_queries: int, seed: int = 1) -> list[float]:
+    """Latences (en secondes) de nb_queries requêtes, une session par requête"""
+    rng = random.Random(seed)
+    engine = create_snapshot_engine(url)
+    latencies = []
+    for _ in range(nb_queries):
+        t0 = perf_counter()
+        with Session(engine) as session:
+            session.exec(text(query), params={"code": rng.choice(codes)}).all()
+        latencies.append(perf_counter() - t0)
+    engine.dispose()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dossier", help="Dossier de la base synthétique (par défaut : dossier temporaire)")
+    parser.add_argument("--articles", type=int, default=50000, help="Nombre d'articles")
+    parser.add_argument("--requetes", type=int, default=1000, help="Nombre de requêtes par mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dossier) as folder:
+        path = os.path.join(folder, "articles_bench.db")
+        codes = make_database(path, args.articles)
+        print(f"{args.articles} articles, base de {os.path.getsize(path) / 1e6:.1f} Mo dans {folder}")
+
+        modes = {"défaut": snapshot_url(path), "immuable": snapshot_url(path, immutable=True)}
+        print(f"{'requête':<14} {'mode':<10} {'moyenne':>10} {'médiane':>10} {'p95':>10} {'gain':>7}")
+        for name, query in QUERIES.items():
+            reference = None
+            for mode, url in modes.items():
+                # Une première passe réchauffe le cache du système de fichiers
+                bench(url, query, codes, min(100, args.requetes))
+                latencies = bench(url, query, codes, args.requetes)
+                mean = statistics.mean(latencies)
+                reference = reference or mean
+                p95 = statistics.quantiles(latencies, n=20)[-1]
+                print(
+                    f"{name:<14} {mode:<10} {1000 * mean:>7.3f} ms {1000 * statistics.median(latencies):>7.3f} ms "
+                    f"{1000 * p95:>7.3f} ms {1 - mean / reference:>7.0%}"
+                )
+
+
+if __name__ == "__main__":
+    main()
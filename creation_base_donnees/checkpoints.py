@@ -0,0 +1,38 @@
+import logging
+from datetime import datetime
+from sqlmodel import Session, select, delete
+from creation_base_donnees.models import BuildStage
+
+
+logger = logging.getLogger(__name__)
+
+
+def completed_stages(session: Session) -> dict[str, BuildStage]:
+    """Étapes déjà terminées dans la base en cours de construction"""
+    return {stage.etape: stage for stage in session.exec(select(BuildStage)).all()}
+
+
+def is_completed(stages: dict[str, BuildStage], name: str, fingerprint: str) -> bool:
+    """L'étape est terminée et ses données d'entrée n'ont pas changé depuis"""
+    stage = stages.get(name)
+    return stage is not None and stage.empreinte == fingerprint
+
+
+def reset_stage(session: Session, stages: dict[str, BuildStage], name: str, model):
+    """
+    Vide la table d'une étape terminée avec d'autres données d'entrée
+    (source modifiée entre deux reprises), pour la refaire entièrement
+    """
+    if name in stages:
+        logger.info(f"Étape {name} : les données d'entrée ont changé, elle est refaite")
+        session.execute(delete(model))
+        session.execute(delete(BuildStage).where(BuildStage.etape == name))
+
+
+def mark_completed(session: Session, name: str, fingerprint: str, lignes: int):
+    """
+    Enregistre la fin d'une étape. À appeler dans la même transaction que les
+    écritures de l'étape : une étape est terminée si et seulement si ses
+    données sont en base.
+    """
+    session.merge(BuildStage(etape=name, empreinte=fingerprint, lignes=lignes, termine_le=datetime.now()))
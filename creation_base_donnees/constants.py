@@ -7,4 +7,25 @@ sheet_name_531 = "Nomenclature Fils"
 
 folder_photo = r"\\apps\Vol1\Data\35-Recherche_Stock\Photos"
 
-folder_sqlite = r".\database_sqlite"
\ No newline at end of file
+folder_sqlite = r".\database_sqlite"
+
+# Cache des feuilles Excel déjà lues (format Parquet), relatif à la racine du projet
+folder_cache_excel = r".\cache_excel"
+
+# Nombre de processus pour le redimensionnement des photos (None : nombre de coeurs)
+photo_workers = None
+photo_batch_size = 200
+
+# Encodage des images stockées : format (JPEG ou WEBP), qualité et taille cible
+# en octets (qualité abaissée jusqu'à l'atteindre, None : pas de cible).
+# Un changement d'encodage fait retraiter toutes les photos.
+image_encoder = {"format": "JPEG", "quality": 85, "target_bytes": None}
+
+# Politique appliquée aux références orphelines, doublons et boucles des
+# fabricants et nomenclatures avant chargement : keep, drop ou aggregate
+integrity_policy = "aggregate"
+
+# Limites de taille de la fermeture transitive des nomenclatures : les articles
+# au-delà ne sont pas matérialisés et sont parcourus à la demande
+closure_max_descendants = 20_000
+closure_max_rows = 2_000_000
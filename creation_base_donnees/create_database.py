@@ -1,18 +1,40 @@
 import logging
 import os
 import sys
-import io
+import argparse
+import polars as pl
 
 sys.path.append(os.getcwd())
 
-import re
+from time import perf_counter
 from pathlib import Path
-from PIL import Image as PILImage
-from sqlmodel import SQLModel, Session, create_engine
-from creation_base_donnees.models import Article, ArticleManufacturer, Nomenclature, Image
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine, insert, select, delete, func
+from creation_base_donnees.models import (
+    Article, ArticleManufacturer, Nomenclature, NomenclatureLevel, NomenclatureClosure, Image, ImageMiniature, PhotoManifest
+)
 from creation_base_donnees.items import Items, Nomenclatures
-import polars as pl
-from creation_base_donnees.constants import folder_photo, folder_sqlite
+from creation_base_donnees.load_file import read_excel, file_fingerprint
+from creation_base_donnees.checkpoints import completed_stages, is_completed, reset_stage, mark_completed
+from creation_base_donnees.profiling import BuildProfiler
+from creation_base_donnees.schemas import ARTICLE_SHEET_COLUMNS, NOMENCLATURE_SHEET_COLUMNS, NOMENCLATURE_SCHEMA
+from creation_base_donnees.refresh import refresh_database
+from creation_base_donnees.validation import INTEGRITY_POLICIES, validate_references
+from creation_base_donnees.nomenclature_graph import nomenclature_levels, nomenclature_closure
+from creation_base_donnees.photos import (
+    DEFAULT_ENCODER, encoding_label, list_photos, listing_fingerprint, compare_with_manifest, deduplicate_photos,
+    resize_photos
+)
+from creation_base_donnees.publication import (
+    PublicationError, new_version, snapshot_name, images_path, current_snapshot, unfinished_build, copy_snapshot,
+    validate_database, publish, read_only_uri
+)
+from creation_base_donnees.constants import (
+    folder_photo, folder_sqlite, photo_workers, photo_batch_size, image_encoder, integrity_policy,
+    closure_max_descendants, closure_max_rows,
+    file_name_521, sheet_names_521, file_name_531, sheet_name_531
+)
 
 
 # Configuration du logging
@@ -23,44 +45,23 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def resize_image(image_bytes, max_size=(700, 700)):
-    """Redimensionne une image tout en conservant son ratio d'aspect.
-    
-    Args:
-        image_bytes (bytes): L'image en format bytes
-        max_size (tuple): La taille maximale (largeur, hauteur)
-    
-    Returns:
-        bytes: L'image redimensionnée en format bytes
-    """
-    # Ouvre l'image depuis les bytes
-    img = PILImage.open(io.BytesIO(image_bytes))
-    
-    # Convertit en RGB si nécessaire (pour les images PNG avec transparence)
-    if img.mode in ('RGBA', 'P'):
-        img = img.convert('RGB')
-    
-    # Calcule les nouvelles dimensions en conservant le ratio
-    ratio = min(max_size[0] / img.width, max_size[1] / img.height)
-    if ratio < 1:  # Seulement si l'image est plus grande que max_size
-        new_size = (int(img.width * ratio), int(img.height * ratio))
-        img = img.resize(new_size, PILImage.Resampling.LANCZOS)
-    
-    # Convertit l'image redimensionnée en bytes
-    output = io.BytesIO()
-    img.save(output, format='JPEG', quality=85, optimize=True)
-    return output.getvalue()
-
-
-def create_database():
-    """Crée la base de données et les tables"""
+def get_database_folder():
+    """Chemin absolu du dossier de publication des bases de données"""
     # Obtient le chemin absolu du projet
     project_root = Path(__file__).parent.parent.absolute()
-    print(project_root)
     logger.info(f"Racine du projet : {project_root}")
-    
-    # Chemin absolu de la base de données
-    db_path = project_root / folder_sqlite / "articles.db"
+    return project_root / folder_sqlite
+
+
+def create_database(db_path):
+    """Crée la base de données et les tables.
+
+    Les images en taille réelle sont stockées dans un fichier à part
+    (images_<version>.db, voir publication.images_path), attaché sous le nom
+    images à chaque connexion du moteur renvoyé : la table image y est
+    accessible sans préfixe, la base principale ne contenant que les données
+    textuelles et les miniatures.
+    """
     logger.info(f"Création de la base de données à : {db_path}")
     
     # Crée le répertoire s'il n'existe pas
@@ -75,206 +76,729 @@ def create_database():
     engine = create_engine(
         database_url,
         echo=False,
-        connect_args={"check_same_thread": False}
+        # uri : la base précédente est attachée en lecture seule par son URI
+        connect_args={"check_same_thread": False, "uri": True}
     )
     
+    # Le fichier des images est attaché à chaque nouvelle connexion
+    images_db_path = images_path(db_path)
+
+    @event.listens_for(engine, "connect")
+    def attach_images(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ? AS images", (str(images_db_path),))
+
     # Crée les tables
     logger.info("Création des tables...")
-    SQLModel.metadata.create_all(engine)
+    _reset_outdated_photos(engine)
+    images_engine = create_engine(f"sqlite:///{images_db_path}")
+    SQLModel.metadata.create_all(images_engine, tables=[Image.__table__])
+    images_engine.dispose()
+    SQLModel.metadata.create_all(engine, tables=[
+        table for table in SQLModel.metadata.sorted_tables if table is not Image.__table__
+    ])
     logger.info("Tables créées avec succès")
     
     return engine
 
 
-def import_data(engine):
-    """Importe les données depuis le fichier Excel"""
+def _reset_outdated_photos(engine):
+    """Supprime les tables des photos d'une base d'un format antérieur (copie
+    d'une ancienne base publiée) : images dans la base principale, ou pas
+    encore dédupliquées. Les photos sont retraitées par l'étape image."""
+    with engine.begin() as connection:
+        outdated = (
+            _has_table(connection, "main", "image")
+            or (_has_table(connection, "images", "image") and not _has_column(connection, "images", "image", "empreinte"))
+            or (_has_table(connection, "main", "photomanifest")
+                and not _has_column(connection, "main", "photomanifest", "encodage"))
+        )
+        if not outdated:
+            return
+        logger.info("Tables des photos d'un format antérieur : les photos seront retraitées")
+        for schema, table in (("main", "image"), ("main", "imageminiature"), ("main", "photomanifest"),
+                              ("main", "articleimage"), ("images", "image")):
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {schema}.{table}")
+        if _has_table(connection, "main", "buildstage"):
+            connection.exec_driver_sql("DELETE FROM buildstage WHERE etape = 'image'")
+    # Rend au système les pages libérées par les images
+    with engine.connect() as connection:
+        connection.exec_driver_sql("VACUUM main")
+        connection.exec_driver_sql("VACUUM images")
+
+
+def _has_table(connection, schema, name) -> bool:
+    return connection.exec_driver_sql(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).first() is not None
+
+
+def _has_column(connection, schema, table, column) -> bool:
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM pragma_table_info(?, ?) WHERE name = ?", (table, schema, column)
+    ).first() is not None
+
+
+def _read_sheet(profiler, data_path, file_name, sheet_name, columns):
+    with profiler.stage(f"lecture {sheet_name}") as stage:
+        df = read_excel(str(data_path), file_name, sheet_name, columns=columns)
+        stage["lignes_sortie"] = df.height
+    return df
+
+
+def _build_items(profiler, sheet_futures):
+    dfs = [future.result() for future in sheet_futures]
+    with profiler.stage("transformation 521", rows_in=sum(df.height for df in dfs)) as stage:
+        items = Items.from_dataframes(dfs)
+        stage["lignes_sortie"] = items.items_df.height
+    # Les doublons de code article ont déjà été écartés par Items (première occurrence conservée)
+    for code_article in items.duplicate_codes:
+        logger.warning(f"Code article en doublon : {code_article}")
+    return items
+
+
+def _build_nomenclatures(profiler, sheet_future):
+    df = sheet_future.result()
+    with profiler.stage("transformation 531", rows_in=df.height) as stage:
+        nomenclatures = Nomenclatures.from_dataframe(df)
+        stage["lignes_sortie"] = len(nomenclatures.nomenclature_dictionnary)
+    return nomenclatures
+
+
+def get_data_path():
+    """Dossier des exports Excel 521 et 531"""
     # Obtient le chemin absolu du projet
     project_root = Path(__file__).parent.parent.absolute()
-    
+    return project_root / "data_input"
+
+
+def source_fingerprints(policy: str = integrity_policy) -> dict[str, str]:
+    """Empreintes des données d'entrée de chaque table, pour les reprises de construction.
+
+    Les tables contrôlées par rapport aux articles dépendent aussi du 521 et
+    de la politique d'intégrité.
+    """
+    data_path = get_data_path()
+    fingerprint_521 = file_fingerprint(str(data_path / file_name_521), sheet_names_521, ARTICLE_SHEET_COLUMNS)
+    fingerprint_531 = file_fingerprint(
+        str(data_path / file_name_531), sheet_name_531, NOMENCLATURE_SHEET_COLUMNS, fingerprint_521, policy
+    )
+    fingerprint_graph = f"{fingerprint_531}|{closure_max_descendants}|{closure_max_rows}"
+    return {
+        "article": fingerprint_521,
+        "articlemanufacturer": f"{fingerprint_521}|{policy}",
+        "nomenclature": fingerprint_531,
+        "nomenclaturelevel": fingerprint_graph,
+        "nomenclature_closure": fingerprint_graph,
+    }
+
+
+def load_sources(executor, profiler, load_521=True, load_531=True):
+    """Lance le chargement des exports 521 (articles, fabricants) et 531 (nomenclatures).
+
+    Les trois feuilles sont lues en parallèle (la lecture Excel libère le GIL) ;
+    chaque export est transformé dès que ses feuilles sont lues. L'executor doit
+    disposer d'au moins len(sheet_names_521) + 3 threads.
+
+    Returns:
+        tuple: (Future[Items], Future[Nomenclatures]), None pour un export non chargé
+    """
     # Configure les chemins et charge les données
-    data_path = project_root / "data_input"
+    data_path = get_data_path()
     logger.info(f"Chargement des données depuis : {data_path}")
-    
-    file_name = "521 - (PIM) - REFERENTIEL ARTICLES.xlsx"
-    logger.info(f"Fichier Excel : {file_name}")
-    
-    items = Items(str(data_path), file_name, ["ARTICLES PIM", "ARTICLES PIM - TRANSPORT"])
-    
-    with Session(engine) as session:
+
+    items_future = nomenclatures_future = None
+    if load_521:
+        logger.info(f"Fichier Excel : {file_name_521}")
+        sheet_futures = [
+            executor.submit(_read_sheet, profiler, data_path, file_name_521, sheet_name, ARTICLE_SHEET_COLUMNS)
+            for sheet_name in sheet_names_521
+        ]
+        items_future = executor.submit(_build_items, profiler, sheet_futures)
+    if load_531:
+        logger.info(f"Fichier Excel : {file_name_531}")
+        nomenclature_future = executor.submit(
+            _read_sheet, profiler, data_path, file_name_531, sheet_name_531, NOMENCLATURE_SHEET_COLUMNS
+        )
+        nomenclatures_future = executor.submit(_build_nomenclatures, profiler, nomenclature_future)
+    return items_future, nomenclatures_future
+
+
+def _source_executor():
+    # Un thread par feuille et un par export à transformer
+    return ThreadPoolExecutor(max_workers=len(sheet_names_521) + 3, thread_name_prefix="sources")
+
+
+def _check_references(profiler, article_codes, manufacturer_df, nomenclature_df, policy, report_path=None):
+    """Contrôle des références avant chargement, mesuré comme une étape ; le
+    rapport détaillé est enregistré dans report_path"""
+    rows_in = sum(df.height for df in (manufacturer_df, nomenclature_df) if df is not None)
+    with profiler.stage("contrôle références", rows_in=rows_in) as stage:
+        manufacturer_df, nomenclature_df, report = validate_references(
+            article_codes, manufacturer_df, nomenclature_df, policy
+        )
+        stage["lignes_sortie"] = rows_in - sum(report.removed.values())
+        stage["anomalies"] = report.counts()
+    logger.info(f"Contrôle des références :\n{report.format()}")
+    if report_path is not None:
+        report_path.parent.mkdir(exist_ok=True)
+        report.write_json(report_path)
+    return manufacturer_df, nomenclature_df
+
+
+def _compute_graph(profiler, nomenclature_df):
+    """Niveaux, hauteurs et descendants des articles des nomenclatures (cycles
+    signalés), puis fermeture transitive dans les limites de taille
+
+    Returns:
+        tuple: (table nomenclaturelevel, table nomenclature_closure)
+    """
+    with profiler.stage("graphe nomenclatures", rows_in=nomenclature_df.height) as stage:
+        levels_df, cycles = nomenclature_levels(nomenclature_df)
+        stage["lignes_sortie"] = levels_df.height
+        stage["cycles"] = len(cycles)
+    logger.info(
+        f"Graphe des nomenclatures : {levels_df.height} articles, {levels_df['niveau'].max() or 0} niveaux "
+        f"sous les articles de tête, {len(cycles)} cycles"
+    )
+    with profiler.stage("fermeture nomenclatures", rows_in=nomenclature_df.height) as stage:
+        closure_df, levels_df = nomenclature_closure(nomenclature_df, levels_df, closure_max_descendants, closure_max_rows)
+        stage["lignes_sortie"] = closure_df.height
+    logger.info(f"Fermeture des nomenclatures : {closure_df.height} couples ancêtre-descendant")
+    return levels_df, closure_df
+
+
+def _read_nomenclature_lines(session) -> pl.DataFrame:
+    """Lignes de nomenclature déjà en base (reprise d'une construction)"""
+    rows = session.exec(select(Nomenclature.code_article_parent, Nomenclature.code_article_fils, Nomenclature.quantite)).all()
+    return pl.DataFrame(rows, schema=NOMENCLATURE_SCHEMA, orient="row")
+
+
+def _database_size(session) -> int:
+    """Taille en octets de la base et de son fichier d'images (pages allouées)"""
+    connection = session.connection()
+    schemas = connection.exec_driver_sql("SELECT name FROM pragma_database_list").scalars().all()
+    size = 0
+    for schema in ("main", "images"):
+        if schema in schemas:
+            page_count = connection.exec_driver_sql(f"PRAGMA {schema}.page_count").scalar()
+            page_size = connection.exec_driver_sql(f"PRAGMA {schema}.page_size").scalar()
+            size += page_count * page_size
+    return size
+
+
+def _insert_stage(profiler, session, stages, model, get_df, fingerprint) -> int:
+    """Insertion en masse dans la table du modèle, mesurée comme une étape.
+
+    L'étape est ignorée si elle a déjà été terminée avec les mêmes données
+    d'entrée (reprise d'une construction interrompue) ; sinon la table est
+    remplie et l'étape enregistrée dans la même transaction.
+
+    Returns:
+        int: nombre de lignes de la table
+    """
+    name = model.__tablename__
+    if is_completed(stages, name, fingerprint):
+        logger.info(f"Étape {name} déjà terminée ({stages[name].lignes} lignes), reprise à l'étape suivante")
+        return stages[name].lignes
+    df = get_df()
+    with profiler.stage(f"écriture {name}", rows_in=df.height) as stage:
+        size_before = _database_size(session)
+        reset_stage(session, stages, name, model)
+        if df.height > 0:
+            session.execute(insert(model), df.to_dicts())
+        mark_completed(session, name, fingerprint, df.height)
+        session.commit()
+        stage["lignes_sortie"] = df.height
+        stage["octets_ecrits"] = _database_size(session) - size_before
+    return df.height
+
+
+def import_data(engine, previous_db_path=None, profiler=None, policy=integrity_policy, report_path=None):
+    """Importe les données depuis les fichiers Excel.
+
+    Les étapes se chevauchent : les articles sont écrits pendant que la
+    feuille 531 est encore lue ou transformée. Chaque étape est mesurée par
+    le profiler.
+
+    Chaque table est une étape enregistrée dans la table buildstage avec
+    l'empreinte de ses fichiers sources : sur une base partiellement
+    construite, les étapes terminées ne sont pas refaites et les exports
+    dont elles dépendent ne sont pas relus.
+
+    Les fabricants et nomenclatures sont contrôlés par rapport aux articles
+    avant leur chargement (voir validation.py) selon la politique policy.
+
+    Returns:
+        dict: nombre de lignes attendu dans chaque table
+    """
+    profiler = profiler or BuildProfiler()
+    fingerprints = source_fingerprints(policy)
+    with _source_executor() as executor, Session(engine) as session:
+        stages = completed_stages(session)
+        load_manufacturers = not is_completed(stages, "articlemanufacturer", fingerprints["articlemanufacturer"])
+        load_521 = load_manufacturers or not is_completed(stages, "article", fingerprints["article"])
+        load_531 = not is_completed(stages, "nomenclature", fingerprints["nomenclature"])
+        items_future, nomenclatures_future = load_sources(executor, profiler, load_521, load_531)
+        counts = {}
+        checked = {}
+
+        def checked_table(name):
+            # Un seul contrôle pour les deux tables, au premier besoin
+            if not checked:
+                if items_future is not None:
+                    article_codes = items_future.result().items_df.select("code_article")
+                else:
+                    # Articles déjà en base (reprise) : seuls leurs codes sont relus
+                    article_codes = pl.DataFrame(
+                        {"code_article": session.exec(select(Article.code_article)).all()}, schema={"code_article": pl.String}
+                    )
+                checked["articlemanufacturer"], checked["nomenclature"] = _check_references(
+                    profiler, article_codes,
+                    items_future.result().get_manufacturer_lines() if load_manufacturers else None,
+                    nomenclatures_future.result().get_nomenclature_lines() if load_531 else None,
+                    policy, report_path,
+                )
+            return checked[name]
+
         # Import des articles
         logger.info("Import des articles...")
-        
-        # Vérifie les doublons dans le DataFrame
-        duplicate_codes = items.items_df.filter(pl.col("code_article").is_duplicated())
-        if len(duplicate_codes) > 0:
-            logger.warning(f"Codes articles en doublon trouvés :")
-            for row in duplicate_codes.iter_rows(named=True):
-                logger.warning(f"Code article en doublon : {row['code_article']}")
-        
-        # Utilise unique() pour ne garder que les premières occurrences
-        items.items_df = items.items_df.unique(subset=["code_article"], keep="first")
-        
-        articles = {}  # Dictionnaire pour stocker les articles par code
-        seen_codes = set()  # Ensemble pour suivre les codes articles déjà vus
-        for row in items.items_df.iter_rows(named=True):
-            code_article = row["code_article"]
-            if code_article in seen_codes:
-                logger.warning(f"Code article en doublon ignoré : {code_article}")
-                continue
-            seen_codes.add(code_article)
-            
-            article = Article(
-                code_article=row["code_article"],
-                proprietaire_article=row["proprietaire_article"],
-                type_article=row["type_article"],
-                libelle_court_article=row["libelle_court_article"],
-                libelle_long_article=row["libelle_long_article"],
-                description_famille_d_achat=row["description_famille_d_achat"],
-                commentaire_technique=row["commentaire_technique"],
-                commentaire_logistique=row.get("commentaire_logistique"),
-                statut_abrege_article=row["statut_abrege_article"],
-                cycle_de_vie_achat=row["cycle_de_vie_achat"],
-                cycle_de_vie_de_production_pim=row["cycle_de_vie_de_production_pim"],
-                feuille_du_catalogue=row["feuille_du_catalogue"],
-                description_de_la_feuille_du_catalogue=row["description_de_la_feuille_du_catalogue"],
-                famille_d_achat_feuille_du_catalogue=row["famille_d_achat_feuille_du_catalogue"],
-                catalogue_consommable=row["catalogue_consommable"],
-                criticite_pim=row["criticite_pim"],
-                famille_immobilisation=row.get("famille_immobilisation"),
-                categorie_immobilisation=row.get("categorie_immobilisation"),
-                categorie_inv_accounting=row["categorie_inv_accounting"],
-                suivi_par_num_serie_oui_non=row["suivi_par_num_serie_oui_non"] == "OUI",
-                stocksecu_inv_oui_non=row["stocksecu_inv_oui_non"] == "OUI",
-                article_hors_normes=row["article_hors_normes"] == "OUI",
-                peremption=row["peremption"] == "OUI",
-                retour_production=row["retour_production"] == "OUI",
-                is_oc=row["is_oc"],
-                is_ol=row["is_ol"],
-                a_retrofiter=row.get("a_retrofiter") == "OUI",
-                # Champs logistiques
-                affretement=row.get("affretement") == "OUI",
-                fragile=row.get("fragile") == "OUI",
-                poids_article=float(row["poids_article"]) if row.get("poids_article") else None,
-                volume_article=float(row["volume_article"]) if row.get("volume_article") else None,
-                hauteur_article=float(row["hauteur_article"]) if row.get("hauteur_article") else None,
-                longueur_article=float(row["longueur_article"]) if row.get("longueur_article") else None,
-                largeur_article=float(row["largeur_article"]) if row.get("largeur_article") else None,
-                matiere_dangereuse=row.get("matiere_dangereuse") == "OUI",
-                md_code_onu=row.get("md_code_onu"),
-                md_groupe_emballage=row.get("md_groupe_emballage"),
-                md_type_colis=row.get("md_type_colis"),
-                prix_achat_prev=float(row["prix_achat_prev"]) if row["prix_achat_prev"] else None,
-                pump=float(row["pump"]) if row["pump"] else None,
-                prix_eur_catalogue_article=float(row["prix_EUR_catalogue_article"]) if row["prix_EUR_catalogue_article"] else None,
-                compte_cg_achat=row.get("compte_cg_achat"),
-                delai_approvisionnement=int(float(row["delai_approvisionnement"])) if row.get("delai_approvisionnement") else None,
-                delai_de_reparation_contractuel=int(float(row["delai_de_reparation_contractuel"])) if row.get("delai_de_reparation_contractuel") else None,
-                point_de_commande=int(row["point_de_commande"]) if row.get("point_de_commande") else None,
-                quantite_a_commander=int(row["quantite_a_commander"]) if row.get("quantite_a_commander") else None,
-                qte_cde_minimum_point_de_reappro=int(row["qte_cde_minimum_point_de_reappro"]) if row.get("qte_cde_minimum_point_de_reappro") else None,
-                qte_minimum_ordre_de_commande=int(row["qte_minimum_ordre_de_commande"]) if row.get("qte_minimum_ordre_de_commande") else None,
-                qte_maximum_ordre_de_commande=int(row["qte_maximum_ordre_de_commande"]) if row.get("qte_maximum_ordre_de_commande") else None,
-                qte_min_de_l_article=int(row["qte_min_de_l_article"]) if row.get("qte_min_de_l_article") else None,
-                qte_max_de_l_article=int(row["qte_max_de_l_article"]) if row.get("qte_max_de_l_article") else None,
-                qte_cde_maximum_quantite_d_ordre_de_commande=int(row["qte_cde_maximum_quantite_d_ordre_de_commande"]) if row.get("qte_cde_maximum_quantite_d_ordre_de_commande") else None,
-                lieu_de_reparation_pim=row["lieu_de_reparation_pim"],
-                description_lieu_de_reparation=row["description_lieu_de_reparation"],
-                rma=row["rma"],
-                role_responsable_et_equipement=row["role_responsable_et_equipement"],
-                mnemonique=row["mnemonique"],
-                date_creation_article=row.get("date_creation_article"),
-                nom_createur_article=row.get("nom_createur_article"),
-                date_derniere_modif_article=row.get("date_derniere_modif_article"),
-                auteur_derniere_modif_article=row.get("auteur_derniere_modif_article")
-            )
-            session.add(article)
-            articles[row["code_article"]] = article
-        
-        # Commit pour obtenir les IDs des articles
-        session.commit()
-        logger.info(f"{len(articles)} articles importés")
+        # items_df est déjà au schéma de la table article : insertion en masse
+        counts["article"] = _insert_stage(
+            profiler, session, stages, Article, lambda: items_future.result().items_df, fingerprints["article"]
+        )
+        logger.info(f"{counts['article']} articles importés")
         
         # Import des fabricants
         logger.info("Import des fabricants...")
-        manufacturers_dict = {}  # Dictionnaire pour stocker les références fabricant par code article
-        for row in items.manufacturer_df.iter_rows(named=True):
-            if row["nom_fabricant"] and row["code_article"]:  # Ne crée que les associations avec un nom et code article non nuls
-                article_manufacturer = ArticleManufacturer(
-                    code_article=row["code_article"],
-                    nom_fabricant=row["nom_fabricant"],
-                    reference_article_fabricant=row["reference_article_fabricant"]
-                )
-                session.add(article_manufacturer)
-                if row["code_article"] not in manufacturers_dict:
-                    manufacturers_dict[row["code_article"]] = []
-                manufacturers_dict[row["code_article"]].append(article_manufacturer)
-        
-        # Commit pour sauvegarder les associations article-fabricant
-        session.commit()
-        logger.info(f"{len(manufacturers_dict)} articles avec fabricants importés")
+        counts["articlemanufacturer"] = _insert_stage(
+            profiler, session, stages, ArticleManufacturer,
+            lambda: checked_table("articlemanufacturer"), fingerprints["articlemanufacturer"]
+        )
+        logger.info(f"{counts['articlemanufacturer']} associations article-fabricant importées")
         
         # Import des nomenclatures
         logger.info("Import des nomenclatures...")
-        nomenclatures = Nomenclatures(str(data_path), "531 - Nomenclature Equipement.xlsx", "Nomenclature Fils")
-        nomenclatures_count = 0
-        
-        for row in nomenclatures.df.filter(
-            (pl.col("art_et_art_fils_eqpt_quantite").is_not_null()) 
-            & (pl.col("article") != pl.col("article_eqpt_article_fils"))
-            & (pl.col("art_et_art_fils_eqpt_quantite") > 0)
-        ).iter_rows(named=True):
-            nomenclature = Nomenclature(
-                code_article_parent=row["article"],
-                code_article_fils=row["article_eqpt_article_fils"],
-                quantite=float(row["art_et_art_fils_eqpt_quantite"])
+        counts["nomenclature"] = _insert_stage(
+            profiler, session, stages, Nomenclature,
+            lambda: checked_table("nomenclature"), fingerprints["nomenclature"]
+        )
+        logger.info(f"{counts['nomenclature']} nomenclatures créées")
+
+        # Niveaux des articles dans le graphe des nomenclatures et fermeture transitive
+        graph = {}
+
+        def graph_table(name):
+            if not graph:
+                graph["nomenclaturelevel"], graph["nomenclature_closure"] = _compute_graph(
+                    profiler, checked_table("nomenclature") if load_531 else _read_nomenclature_lines(session)
+                )
+            return graph[name]
+
+        for model in (NomenclatureLevel, NomenclatureClosure):
+            name = model.__tablename__
+            counts[name] = _insert_stage(
+                profiler, session, stages, model, lambda name=name: graph_table(name), fingerprints[name]
             )
-            session.add(nomenclature)
-            nomenclatures_count += 1
-        
-        session.commit()
-        logger.info(f"{nomenclatures_count} nomenclatures créées")
 
         # import des photos
-        logger.info("Import des images...")
-        photo_count = 0
-        extensions_photo = {"jpeg", "jpg", "png"}
-        pattern_code_art = r"[A-Z]{3}\d{4}\d{2}"
-
-        liste_files = os.listdir(folder_photo)
-        liste_photos = [file for file in liste_files if os.path.isfile(os.path.join(folder_photo, file)) and file.lower().split(".")[1] in extensions_photo]
-
-        for photo in liste_photos:
-            with open(os.path.join(folder_photo, photo), "rb") as f:
-                response = re.search(pattern_code_art, photo)
-                if response:
-                    code_article = photo[response.start():response.end()]
-                    image_bytes = f.read()
-            if response:
-                image = Image(code_article=code_article, image=resize_image(image_bytes))
-                session.add(image)
-                photo_count += 1
+        counts["image"] = import_photos(session, folder_photo, previous_db_path, profiler=profiler)
+        counts["imageminiature"] = counts["image"]
+
+    return counts
+
+
+def refresh_data(engine, profiler=None, policy=integrity_policy, report_path=None):
+    """Rafraîchit une base existante : seules les lignes modifiées des exports
+    et les photos nouvelles, modifiées ou supprimées sont écrites
+
+    Returns:
+        dict: nombre de lignes attendu dans chaque table
+    """
+    profiler = profiler or BuildProfiler()
+    fingerprints = source_fingerprints(policy)
+    with _source_executor() as executor:
+        items_future, nomenclatures_future = load_sources(executor, profiler)
+        items, nomenclatures = items_future.result(), nomenclatures_future.result()
+    manufacturer_df, nomenclature_df = _check_references(
+        profiler, items.items_df.select("code_article"), items.get_manufacturer_lines(),
+        nomenclatures.get_nomenclature_lines(), policy, report_path,
+    )
+    level_df, closure_df = _compute_graph(profiler, nomenclature_df)
+    expected_counts = {
+        "article": items.items_df.height,
+        "articlemanufacturer": manufacturer_df.height,
+        "nomenclature": nomenclature_df.height,
+        "nomenclaturelevel": level_df.height,
+        "nomenclature_closure": closure_df.height,
+    }
+    rows_in = sum(expected_counts.values())
+    with profiler.stage("rafraîchissement tables", rows_in=rows_in) as stage:
+        with Session(engine) as session:
+            size_before = _database_size(session)
+        counts = refresh_database(engine, items.items_df, manufacturer_df, nomenclature_df, level_df, closure_df)
+        with Session(engine) as session:
+            # Les étapes de la base rafraîchie correspondent désormais aux sources actuelles
+            for name, lignes in expected_counts.items():
+                mark_completed(session, name, fingerprints[name], lignes)
+            session.commit()
+            stage["octets_ecrits"] = _database_size(session) - size_before
+        # Lignes écrites : insertions, mises à jour et suppressions
+        stage["lignes_sortie"] = sum(sum(table.values()) for table in counts.values())
+    logger.info(f"Base de données rafraîchie : {counts}")
+    with Session(engine) as session:
+        expected_counts["image"] = import_photos(session, folder_photo, profiler=profiler)
+    expected_counts["imageminiature"] = expected_counts["image"]
+    return expected_counts
+
+
+def _read_manifest(session, schema="main") -> dict[str, dict]:
+    """Lit le manifeste des photos de la base courante ou de la base précédente attachée"""
+    if not _has_table(session.connection(), schema, "photomanifest"):
+        return {}
+    rows = session.connection().exec_driver_sql(
+        f"SELECT nom_fichier, taille, date_modification, empreinte, encodage, image_id FROM {schema}.photomanifest"
+    ).mappings().all()
+    return {row["nom_fichier"]: dict(row) for row in rows}
+
+
+def _delete_obsolete_photos(session, names):
+    """Supprime du manifeste les photos supprimées ou modifiées ; leurs images
+    ne sont supprimées qu'une fois sans référence (voir _update_image_references)"""
+    if names:
+        session.execute(delete(PhotoManifest).where(PhotoManifest.nom_fichier.in_(names)))
+
+
+def _attach_previous_images(session, previous_db_path) -> bool:
+    """Attache le fichier des images de la base précédente attachée.
+
+    Returns:
+        bool: False si la base précédente n'a pas de fichier d'images ou s'il est
+        d'un format antérieur (images non dédupliquées) : ses photos sont alors retraitées
+    """
+    previous_images_path = images_path(previous_db_path)
+    if not previous_images_path.exists():
+        return False
+    connection = session.connection()
+    connection.exec_driver_sql("ATTACH DATABASE ? AS precedente_images", (read_only_uri(previous_images_path),))
+    return (
+        _has_column(connection, "precedente_images", "image", "empreinte")
+        and _has_column(connection, "precedente", "photomanifest", "encodage")
+    )
+
+
+def _copy_previous_images(session, unchanged, encoding):
+    """Recopie telles quelles (sans décodage) les images et miniatures des photos
+    inchangées depuis la base précédente, en conservant leurs identifiants
+
+    Returns:
+        int: nombre d'images recopiées
+    """
+    connection = session.connection()
+    connection.exec_driver_sql("CREATE TEMP TABLE images_conservees (image_id INTEGER PRIMARY KEY)")
+    connection.exec_driver_sql(
+        "INSERT OR IGNORE INTO images_conservees (image_id) VALUES (?)",
+        [(photo["image_id"],) for photo in unchanged],
+    )
+    copied = connection.exec_driver_sql(
+        "INSERT INTO images.image (id, empreinte, nb_references, image) "
+        "SELECT i.id, i.empreinte, i.nb_references, i.image FROM precedente_images.image i "
+        "JOIN images_conservees c ON c.image_id = i.id"
+    ).rowcount
+    connection.exec_driver_sql(
+        "INSERT INTO imageminiature (image_id, miniature) "
+        "SELECT m.image_id, m.miniature FROM precedente.imageminiature m "
+        "JOIN images_conservees c ON c.image_id = m.image_id"
+    )
+    connection.exec_driver_sql("DROP TABLE images_conservees")
+    _insert_manifest(session, unchanged, encoding)
+    return copied
+
+
+def _insert_manifest(session, photos, encoding):
+    if photos:
+        session.execute(insert(PhotoManifest), [
+            {**{key: photo[key] for key in ("nom_fichier", "code_article", "taille", "date_modification", "empreinte", "image_id")},
+             "encodage": encoding}
+            for photo in photos
+        ])
+
+
+def _update_image_references(session) -> int:
+    """Recalcule à partir du manifeste le nombre de références de chaque image
+    et les liens article-image, puis supprime les images qui ne sont plus
+    utilisées par aucune photo
+
+    Returns:
+        int: nombre d'images de la base
+    """
+    connection = session.connection()
+    connection.exec_driver_sql(
+        "UPDATE images.image SET nb_references = "
+        "(SELECT COUNT(*) FROM photomanifest p WHERE p.image_id = images.image.id)"
+    )
+    connection.exec_driver_sql(
+        "DELETE FROM imageminiature WHERE image_id IN (SELECT id FROM images.image WHERE nb_references = 0)"
+    )
+    deleted = connection.exec_driver_sql("DELETE FROM images.image WHERE nb_references = 0").rowcount
+    connection.exec_driver_sql("DELETE FROM articleimage")
+    connection.exec_driver_sql(
+        "INSERT INTO articleimage (code_article, image_id) SELECT DISTINCT code_article, image_id FROM photomanifest"
+    )
+    if deleted:
+        logger.info(f"{deleted} images sans référence supprimées")
+    return connection.exec_driver_sql("SELECT COUNT(DISTINCT image_id) FROM photomanifest").scalar()
+
+
+def import_photos(session, folder_photo, previous_db_path=None, max_workers=photo_workers, batch_size=photo_batch_size,
+                  profiler=None, encoder=image_encoder):
+    """Importe les photos du dossier.
+
+    Si une base précédente est fournie, son manifeste des photos permet de
+    recopier les images inchangées et de ne redimensionner que les photos
+    nouvelles ou modifiées. Le redimensionnement se fait dans un pool de
+    processus, avec insertion et commit par lots au fil des résultats : une
+    construction interrompue reprend sans retraiter les photos déjà insérées.
+    Chaque image est accompagnée de sa miniature (table imageminiature).
+
+    Les images sont dédupliquées : une photo identique à une autre (même
+    contenu sous un autre nom ou pour un autre article) n'est pas
+    redimensionnée, et deux photos dont les images redimensionnées ont la même
+    empreinte partagent une seule image. La table articleimage relie chaque
+    article à ses images.
+
+    Les images et miniatures sont encodées selon encoder (format JPEG ou WEBP,
+    qualité, taille cible : voir photos.encode_image) ; les photos encodées
+    autrement lors d'une construction précédente sont retraitées.
+
+    Returns:
+        int: nombre d'images de la base
+    """
+    profiler = profiler or BuildProfiler()
+    encoder = {**DEFAULT_ENCODER, **(encoder or {})}
+    encoding = encoding_label(**encoder)
+    logger.info(f"Import des images (encodage {encoding})...")
+    with profiler.stage("parcours photos") as stage:
+        photos = list_photos(folder_photo)
+        fingerprint = f"{listing_fingerprint(photos)}|{encoding}"
+        stages = completed_stages(session)
+        stage["lignes_sortie"] = len(photos)
+    logger.info(f"{len(photos)} photos trouvées en {stage['duree']:.1f} s")
+    if is_completed(stages, "image", fingerprint):
+        logger.info(f"Étape image déjà terminée ({stages['image'].lignes} images), dossier photos inchangé")
+        return stages["image"].lignes
+
+    attached = previous_db_path is not None and os.path.exists(previous_db_path)
+    if attached:
+        # Reprise : les photos déjà insérées lors d'une exécution interrompue sont conservées
+        resumed_manifest = _read_manifest(session)
+        if resumed_manifest:
+            resumed, photos, obsolete = compare_with_manifest(folder_photo, photos, resumed_manifest, encoding)
+            _delete_obsolete_photos(session, obsolete + [
+                photo["nom_fichier"] for photo in photos if photo["nom_fichier"] in resumed_manifest
+            ])
+            session.commit()
+            logger.info(f"Reprise de l'import des photos : {len(resumed)} photos déjà importées")
+        session.commit()
+        session.connection().exec_driver_sql("ATTACH DATABASE ? AS precedente", (read_only_uri(previous_db_path),))
+        manifest = _read_manifest(session, "precedente") if _attach_previous_images(session, previous_db_path) else {}
+    else:
+        # Rafraîchissement en place : le manifeste est celui de la base elle-même
+        manifest = _read_manifest(session)
+    unchanged, to_process, deleted = compare_with_manifest(folder_photo, photos, manifest, encoding)
+    logger.info(f"Photos inchangées : {len(unchanged)}, nouvelles ou modifiées : {len(to_process)}, supprimées : {len(deleted)}")
+
+    if not attached:
+        _delete_obsolete_photos(session, deleted + [photo["nom_fichier"] for photo in to_process if photo["nom_fichier"] in manifest])
+    elif unchanged:
+        with profiler.stage("copie images", rows_in=len(unchanged)) as stage:
+            size_before = _database_size(session)
+            copied_count = _copy_previous_images(session, unchanged, encoding)
+            session.commit()
+            stage["lignes_sortie"] = copied_count
+            stage["octets_ecrits"] = _database_size(session) - size_before
+        logger.info(f"{copied_count} images recopiées depuis la base précédente en {stage['duree']:.1f} s")
+    if attached:
+        session.commit()
+        connection = session.connection()
+        schemas = connection.exec_driver_sql("SELECT name FROM pragma_database_list").scalars().all()
+        for schema in ("precedente_images", "precedente"):
+            if schema in schemas:
+                connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+
+    # Photos identiques à une photo déjà importée ou en double entre elles : non redimensionnées
+    with profiler.stage("dédoublonnage photos", rows_in=len(to_process)) as stage:
+        known = {
+            (photo["taille"], photo["empreinte"]): photo["image_id"] for photo in _read_manifest(session).values()
+        }
+        to_process, linked, duplicates = deduplicate_photos(folder_photo, to_process, known)
+        _insert_manifest(session, linked, encoding)
         session.commit()
-        logger.info(f"{photo_count} images importées")
+        stage["lignes_sortie"] = len(to_process)
+    duplicate_count = len(linked) + sum(len(photos) for photos in duplicates.values())
+    logger.info(f"{duplicate_count} photos en double non redimensionnées")
 
+    image_ids = dict(session.exec(select(Image.empreinte, Image.id)).all())
+    next_image_id = max(image_ids.values(), default=0) + 1
+    photo_count = shared_count = 0
+    octets_lus = octets_ecrits = 0
+    duree_lecture = duree_redimensionnement = duree_insertion = 0.0
+    batch = []
 
-def main():
-    """Point d'entrée principal"""
+    def flush(batch):
+        t1 = perf_counter()
+        new_images = [result for result in batch if result["nouvelle_image"]]
+        if new_images:
+            session.execute(insert(Image), [
+                {"id": result["image_id"], "empreinte": result["empreinte_image"], "image": result["image"]}
+                for result in new_images
+            ])
+            session.execute(insert(ImageMiniature), [
+                {"image_id": result["image_id"], "miniature": result["miniature"]} for result in new_images
+            ])
+        # Les doublons d'une photo sont enregistrés avec elle : une reprise ne les perd pas
+        _insert_manifest(session, batch + [
+            {**photo, "image_id": result["image_id"]}
+            for result in batch for photo in duplicates.get(result["nom_fichier"], [])
+        ], encoding)
+        session.commit()
+        return perf_counter() - t1
+
+    with profiler.stage("redimensionnement photos", rows_in=len(to_process)) as stage:
+        size_before = _database_size(session)
+        for result in resize_photos(folder_photo, to_process, max_workers=max_workers, encoder=encoder):
+            octets_lus += result["octets_lus"]
+            duree_lecture += result["duree_lecture"]
+            duree_redimensionnement += result["duree_redimensionnement"]
+            # Image redimensionnée identique à une image existante : elle est partagée
+            result["nouvelle_image"] = result["empreinte_image"] not in image_ids
+            if result["nouvelle_image"]:
+                image_ids[result["empreinte_image"]] = next_image_id
+                next_image_id += 1
+                octets_ecrits += len(result["image"])
+            else:
+                shared_count += 1
+            result["image_id"] = image_ids[result["empreinte_image"]]
+            batch.append(result)
+            if len(batch) >= batch_size:
+                duree_insertion += flush(batch)
+                photo_count += len(batch)
+                batch = []
+        if batch:
+            duree_insertion += flush(batch)
+            photo_count += len(batch)
+        stage["lignes_sortie"] = photo_count
+    with profiler.stage("commit photos", rows_in=photo_count) as commit_stage:
+        image_count = _update_image_references(session)
+        mark_completed(session, "image", fingerprint, image_count)
+        session.commit()
+        commit_stage["octets_ecrits"] = _database_size(session) - size_before
+    duree_totale = stage["duree"] + commit_stage["duree"]
+
+    logger.info(f"{photo_count} images traitées en {duree_totale:.1f} s ({_rate(photo_count, duree_totale)} images/s)")
+    logger.info(f"{shared_count} images identiques à une image existante après redimensionnement, {image_count} images en base")
+    logger.info(f"Lecture : {octets_lus / 1e6:.1f} Mo en {duree_lecture:.1f} s cumulées ({_rate(octets_lus / 1e6, duree_lecture)} Mo/s par processus)")
+    logger.info(f"Redimensionnement : {duree_redimensionnement:.1f} s cumulées ({_rate(photo_count, duree_redimensionnement)} images/s par processus)")
+    logger.info(f"Insertion : {octets_ecrits / 1e6:.1f} Mo en {duree_insertion:.1f} s ({_rate(photo_count, duree_insertion)} images/s)")
+    return image_count
+
+
+def _rate(quantity, duration):
+    return f"{quantity / duration:.1f}" if duration > 0 else "-"
+
+
+def _write_profile(profiler, folder, version):
+    """Enregistre le profil de la construction en JSON et journalise son résumé"""
+    profile_folder = folder / "profils"
+    profile_folder.mkdir(exist_ok=True)
+    profile_path = profile_folder / f"profil_{version}.json"
+    profiler.write_json(profile_path)
+    logger.info(f"Profil de la construction ({profile_path}) :\n{profiler.format()}")
+
+
+def main(argv=None):
+    """Point d'entrée principal
+
+    La base est construite dans un fichier temporaire, validée, puis publiée
+    atomiquement sous un nom versionné (voir publication.py) : les clients
+    connectés continuent de lire la version précédente jusqu'à leur prochaine
+    requête, sans jamais voir une base en cours de construction.
+
+    Le profil de chaque étape (durée, CPU, mémoire, lignes, octets écrits) est
+    enregistré dans profils/profil_<version>.json à côté des bases publiées,
+    le rapport du contrôle des références dans controles/controle_<version>.json.
+
+    Une construction complète interrompue (erreur sur le partage des photos,
+    arrêt du poste...) est conservée et reprise à la première étape non
+    terminée lors de l'exécution suivante.
+    """
+    parser = argparse.ArgumentParser(description="Construction de la base de données des articles")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Rafraîchit une copie de la base publiée au lieu de la reconstruire")
+    parser.add_argument("--sans-reprise", action="store_true",
+                        help="Abandonne une construction interrompue au lieu de la reprendre")
+    parser.add_argument("--politique-integrite", choices=INTEGRITY_POLICIES, default=integrity_policy,
+                        help="Traitement des références orphelines, doublons et boucles avant chargement")
+    args = parser.parse_args(argv)
+
+    folder = get_database_folder()
+    folder.mkdir(parents=True, exist_ok=True)
+    # La base publiée sert de base précédente : les images inchangées y sont
+    # recopiées sans être retraitées
+    previous_db_path = current_snapshot(folder)
+    version = new_version()
+    build_path = folder / (snapshot_name(version) + ".tmp")
+    resumable = not args.incremental
+    if resumable and not args.sans_reprise:
+        unfinished = unfinished_build(folder)
+        if unfinished is not None:
+            logger.info(f"Reprise de la construction interrompue {unfinished}")
+            build_path = unfinished
+    profiler = BuildProfiler()
+    report_path = folder / "controles" / f"controle_{version}.json"
     try:
-        # Crée la base de données
-        engine = create_database()
-        
-        # Importe les données
-        import_data(engine)
-        
+        if args.incremental:
+            if previous_db_path is None:
+                raise FileNotFoundError(f"Aucune base publiée dans {folder}")
+            logger.info(f"Copie de la base publiée {previous_db_path}")
+            with profiler.stage("copie base publiée") as stage:
+                copy_snapshot(previous_db_path, build_path)
+                stage["octets_ecrits"] = build_path.stat().st_size
+                if images_path(previous_db_path).exists():
+                    copy_snapshot(images_path(previous_db_path), images_path(build_path))
+                    stage["octets_ecrits"] += images_path(build_path).stat().st_size
+            engine = create_database(build_path)
+            expected_counts = refresh_data(engine, profiler, args.politique_integrite, report_path)
+        else:
+            # Crée la base de données et importe les données
+            engine = create_database(build_path)
+            expected_counts = import_data(engine, previous_db_path, profiler, args.politique_integrite, report_path)
+        engine.dispose()
+
+        with profiler.stage("validation", rows_in=sum(expected_counts.values())):
+            counts = validate_database(build_path, expected_counts)
+        with profiler.stage("publication"):
+            publish(build_path, folder, version, counts)
         logger.info("Base de données créée et données importées avec succès")
-        
+
+    except PublicationError as e:
+        # Une construction invalide n'est ni publiée ni reprise
+        logger.error(f"Base de données invalide, non publiée : {str(e)}")
+        resumable = False
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la création de la base de données : {str(e)}")
+        if resumable:
+            logger.info(f"Construction conservée pour reprise : {build_path}")
         raise
     finally:
         # Ferme toutes les connexions
         if 'engine' in locals():
             engine.dispose()
+        # Une construction inachevée n'est jamais publiée
+        if build_path.exists() and not resumable:
+            build_path.unlink()
+            images_path(build_path).unlink(missing_ok=True)
+        _write_profile(profiler, folder, version)
 
 
 if __name__ == "__main__":
@@ -1,84 +1,167 @@
 from .load_file import get_execution_time, read_excel
+from .schemas import (
+    ARTICLE_SCHEMA, OUI_NON_COLUMNS, CATALOGUE_FLAG_COLUMNS, MANUFACTURER_SCHEMA, NOMENCLATURE_SCHEMA,
+    RENAMED_COLUMNS, ARTICLE_SHEET_COLUMNS, NOMENCLATURE_SHEET_COLUMNS
+)
 import polars as pl
-
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def _coerce_column(name: str, target: pl.DataType, source: pl.DataType | None) -> pl.Expr:
+    """
+    Expression convertissant la colonne name de son type source vers le type cible
+    """
+    if source is None:
+        default = False if target == pl.Boolean else None
+        return pl.lit(default, dtype=target).alias(name)
+    column = pl.col(name)
+    if name in OUI_NON_COLUMNS:
+        if source == pl.Boolean:
+            return column.fill_null(False)
+        return (column.cast(pl.String) == "OUI").fill_null(False)
+    if target == pl.Int64:
+        return column.cast(pl.Float64, strict=False).cast(pl.Int64, strict=False)
+    if isinstance(target, pl.Datetime):
+        if source == pl.String:
+            return column.str.to_datetime(strict=False).cast(target)
+        return column.cast(target, strict=False)
+    return column.cast(target, strict=False)
+
+
+def coerce_to_schema(source_schema: pl.Schema, target_schema: dict, exclude=()) -> list[pl.Expr]:
+    """
+    Liste d'expressions Polars convertissant un DataFrame de schéma source_schema
+    vers target_schema, sans passer par du Python ligne à ligne
+    """
+    return [
+        _coerce_column(name, dtype, source_schema.get(name))
+        for name, dtype in target_schema.items()
+        if name not in exclude
+    ]
 
 
 class Items():
     
     _MANUFACTURER_COLUMN_NAMES = ["code_article", "nom_fabricant", "reference_article_fabricant"]
+    _RENAMED_COLUMNS = RENAMED_COLUMNS
     @get_execution_time
     def __init__(self, folder_path: str, file_name: str, sheet_names: list[str]):
         """
         Initialisation de la classe Items.
 
-        Effectue les opérations suivantes :
-        - Lit les feuilles du fichier Excel dans des DataFrames Polars
-        - Identifie les articles OC et OL
-        - Crée la table des fabricants
-        - Crée le dictionnaire des articles et de leurs fabricants
-        - Supprime les colonnes fabricants
-        - Supprime les doublons
-        - Fusionne les DataFrames
-        - Supprime les colonnes dupliquées
+        Lit les feuilles du fichier Excel dans des DataFrames Polars (seules les
+        colonnes de ARTICLE_SHEET_COLUMNS sont lues, voir read_excel) puis construit
+        un plan LazyFrame unique qui :
+        - Ne sélectionne que les colonnes utiles au modèle Article
         - Renomme des colonnes spécifiques
+        - Supprime les doublons de code article (une seule fois par feuille)
+        - Fusionne la feuille principale avec les feuilles complémentaires (TRANSPORT)
+        - Convertit les colonnes selon le schéma de la table article et identifie les articles OC et OL
+        - Crée la table des fabricants
+
+        Les plans sont exécutés en une seule fois avec pl.collect_all.
         """
-        self.dfs = []
+        dfs = []
         for sheet_name in sheet_names:
-            df = read_excel(folder_path, file_name, sheet_name)
-            print("Colonnes disponibles:", df.columns)  # Debug
-            self.dfs.append(df)
-        self.items_df = self.dfs[0]
-        self._create_manufacturer_table()
-        self._remove_manufacturer_columns()
-        self._remove_duplicate_rows()
-        self._merge_dataframes()
-        self._remove_duplicate_columns()
-        self._rename_specific_columns()
-        self._oc_ol_identifier()
+            df = read_excel(folder_path, file_name, sheet_name, columns=ARTICLE_SHEET_COLUMNS)
+            logger.debug(f"Colonnes disponibles dans {sheet_name} : {df.columns}")
+            dfs.append(df)
+        self._load(dfs)
 
 
-    def _create_manufacturer_table(self):
+    @classmethod
+    def from_dataframes(cls, dfs: list[pl.DataFrame]) -> "Items":
         """
-        Crée une table des fabricants à partir des colonnes nom_fabricant et reference_article_fabricant
+        Construit les articles depuis des feuilles déjà chargées (en-têtes normalisés),
+        la feuille principale en premier
         """
-        cols = ["code_article", "nom_fabricant", "reference_article_fabricant"]
-        self.manufacturer_df = self.items_df.select(cols)
+        items = cls.__new__(cls)
+        items._load(dfs)
+        return items
 
 
-    def _remove_manufacturer_columns(self):
-        """
-        Supprime les colonnes nom_fabricant et reference_article_fabricant
-        """
-        self.items_df = self.items_df.drop(["nom_fabricant", "reference_article_fabricant"])
+    def _load(self, dfs: list[pl.DataFrame]):
+        self.dfs = dfs
+        items_plan = self._items_plan()
+        manufacturer_plan = self._manufacturer_plan()
+        duplicate_codes_plan = self._duplicate_codes_plan()
+        logger.info(f"Plan d'exécution de la table article :\n{items_plan.explain()}")
 
+        self.items_df, self.manufacturer_df, duplicate_codes_df = pl.collect_all(
+            [items_plan, manufacturer_plan, duplicate_codes_plan]
+        )
+        self.duplicate_codes = duplicate_codes_df["code_article"].to_list()
 
-    def _remove_duplicate_columns(self):
-        """
-        Supprime les colonnes dupliquées provenant de la jointure.
 
-        La jointure avec la table des fabricants crée des colonnes dupliquées
-        (par exemple, "nom_fabricant_right" et "nom_fabricant_left"). Cette
-        méthode supprime ces colonnes dupliquées.
+    def get_manufacturer_lines(self) -> pl.DataFrame:
         """
-        self.items_df = self.items_df.drop(pl.col("^.*_right$"))
+        Associations article-fabricant à importer : nom du fabricant et code article renseignés
+        """
+        return self.manufacturer_df.filter(
+            pl.col("nom_fabricant").is_not_null()
+            & (pl.col("nom_fabricant") != "")
+            & pl.col("code_article").is_not_null()
+            & (pl.col("code_article") != "")
+        )
 
 
-    def _remove_duplicate_rows(self):
-        self.items_df = self.items_df.unique()
-        self.dfs[1] = self.dfs[1].unique()
-        self.manufacturer_df = self.manufacturer_df.unique()
+    def _sheet_plan(self, df: pl.DataFrame, exclude: set[str] = frozenset()) -> pl.LazyFrame:
+        """
+        Projette une feuille sur les seules colonnes de la table article
+        (après renommage), hormis celles de exclude.
+        """
+        columns = []
+        renames = {}
+        for column in df.columns:
+            target = self._RENAMED_COLUMNS.get(column, column)
+            if target in ARTICLE_SCHEMA and (target == "code_article" or target not in exclude):
+                columns.append(column)
+                if target != column:
+                    renames[column] = target
+        return df.lazy().select(columns).rename(renames)
+
+
+    def _items_plan(self) -> pl.LazyFrame:
+        """
+        Plan de construction de la table article : la première feuille est
+        dédoublonnée sur le code article puis complétée par les autres feuilles
+        (jointure à gauche), sans dupliquer les colonnes déjà présentes.
+        """
+        plan = self._sheet_plan(self.dfs[0]).unique(subset=["code_article"], keep="first", maintain_order=True)
+        for df in self.dfs[1:]:
+            other = (
+                self._sheet_plan(df, exclude=set(plan.collect_schema().names()))
+                .unique(subset=["code_article"], keep="first", maintain_order=True)
+            )
+            plan = plan.join(other, how="left", on="code_article") # dataframe with the dimensions of the items
+        return self._apply_article_schema(plan)
 
 
-    def _merge_dataframes(self):
+    def _manufacturer_plan(self) -> pl.LazyFrame:
         """
-        Merge the dataframe containing the items dimensions with the main dataframe.
+        Plan de la table des fabricants à partir des colonnes nom_fabricant et reference_article_fabricant
+        """
+        plan = self.dfs[0].lazy().select(self._MANUFACTURER_COLUMN_NAMES).unique(maintain_order=True)
+        return plan.select(coerce_to_schema(plan.collect_schema(), MANUFACTURER_SCHEMA))
 
-        This method merge the dataframe containing the items dimensions with the main dataframe
-        on the "code_article" column. After the merge, the dataframe containing the items dimensions
-        is deleted.
 
+    def _duplicate_codes_plan(self) -> pl.LazyFrame:
+        """
+        Plan listant les codes articles présents plusieurs fois avec des données
+        différentes dans la feuille principale (hors colonnes fabricants)
         """
-        self.items_df = self.items_df.join(self.dfs[1], how="left", on="code_article") # dataframe with the dimensions of the items
+        return (
+            self._sheet_plan(self.dfs[0])
+            .unique()
+            .group_by("code_article")
+            .len()
+            .filter(pl.col("len") > 1)
+            .select("code_article")
+            .sort("code_article")
+        )
 
 
     def _to_excel(self, file_name_excel):
@@ -95,31 +178,26 @@ class Items():
         """
         self.items_df.write_excel(file_name_excel)
 
-    def _rename_specific_columns(self):
-        dict_columns_name = {"proprietaire_article_champs_calcule": "proprietaire_article", 
-                             "pump_champs_calcule": "pump"}
-        self.items_df = self.items_df.rename(dict_columns_name)
-
-
-    def _oc_ol_identifier(self):
-        """
-        Identifie les articles OC et OL
-        """
-        self.items_df = (
-            self.items_df
-            .with_columns(
-                pl.col("feuille_du_catalogue")
-                .map_elements(
-                    lambda x: True if x == "EMI.AM.OC" else False, return_dtype=pl.Boolean
-                    )
-                .alias("is_oc"),
-                pl.col("feuille_du_catalogue")
-                .map_elements(
-                    lambda x: True if x == "EMI.AM.OL" else False, return_dtype=pl.Boolean
-                    )
-                .alias("is_ol")
-                )
-            )
+    def _oc_ol_identifier(self) -> list[pl.Expr]:
+        """
+        Identifie les articles OC et OL à partir de la feuille du catalogue
+        """
+        return [
+            (pl.col("feuille_du_catalogue") == feuille).fill_null(False).alias(column)
+            for column, feuille in CATALOGUE_FLAG_COLUMNS.items()
+        ]
+
+
+    def _apply_article_schema(self, plan: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Convertit le plan au schéma de la table article en une seule passe :
+        conversions numériques, OUI/NON en booléens, dates et indicateurs OC/OL.
+        Les colonnes absentes du fichier sont créées à null (False pour les booléens).
+        """
+        return plan.select(
+            coerce_to_schema(plan.collect_schema(), ARTICLE_SCHEMA, exclude=CATALOGUE_FLAG_COLUMNS)
+            + self._oc_ol_identifier()
+        ).select(list(ARTICLE_SCHEMA))
 
 
     def _making_dictionnary(self):
@@ -137,11 +215,50 @@ class Items():
                 self.items_dictionnary[item]["fabricants"] = self.items_manufacturer_dictionnary[item]
 
 
+# Ligne de nomenclature de quantité renseignée et positive
+VALID_NOMENCLATURE_QUANTITY = (
+    pl.col("art_et_art_fils_eqpt_quantite").is_not_null()
+    & (pl.col("art_et_art_fils_eqpt_quantite") > 0)
+)
+# Ligne de nomenclature exploitable : quantité valide, article fils différent du parent
+VALID_NOMENCLATURE_LINE = VALID_NOMENCLATURE_QUANTITY & (pl.col("article") != pl.col("article_eqpt_article_fils"))
+
+
 class Nomenclatures():
     
     def __init__(self, folder_path, file_name, sheet_name):
-        self.df = read_excel(folder_path, file_name, sheet_name)
+        self._load(read_excel(folder_path, file_name, sheet_name, columns=NOMENCLATURE_SHEET_COLUMNS))
+
+
+    @classmethod
+    def from_dataframe(cls, df: pl.DataFrame) -> "Nomenclatures":
+        """
+        Construit les nomenclatures depuis un DataFrame déjà chargé
+        (colonnes article, article_eqpt_article_fils, art_et_art_fils_eqpt_quantite)
+        """
+        nomenclatures = cls.__new__(cls)
+        nomenclatures._load(df)
+        return nomenclatures
+
+
+    @classmethod
+    def from_lines(cls, lines) -> "Nomenclatures":
+        """
+        Construit les nomenclatures depuis des lignes (code_article_parent,
+        code_article_fils, quantite), par exemple lues dans la table nomenclature
+        """
+        df = pl.DataFrame(
+            [tuple(line) for line in lines],
+            schema={"article": pl.String, "article_eqpt_article_fils": pl.String, "art_et_art_fils_eqpt_quantite": pl.Float64},
+            orient="row",
+        )
+        return cls.from_dataframe(df)
+
+
+    def _load(self, df: pl.DataFrame):
+        self.df = df
         self.nomenclature_dictionnary =  self._making_nomenclature_dictionnary()
+        self._subtrees = {}
 
 
     def _get_list_items_with_nomenclature(self, df: pl.DataFrame) -> list[str]:
@@ -150,20 +267,11 @@ class Nomenclatures():
         an item with at least one child item
         """
         list_items_with_nomenclature = (
-            
-            df.filter(
-            (pl.col("art_et_art_fils_eqpt_quantite").is_not_null()) 
-            & (pl.col("article") != pl.col("article_eqpt_article_fils"))
-            & (pl.col("art_et_art_fils_eqpt_quantite") > 0)
-                )
-                .group_by("article")
-                .agg(
-                    pl.col("article_eqpt_article_fils").count()
-                    )
-                    .select(pl.col("article"))
-                    .to_series()
-                    .to_list()
-                    )
+            df.filter(VALID_NOMENCLATURE_LINE)
+            .select(pl.col("article").unique())
+            .to_series()
+            .to_list()
+        )
         
         return sorted(list_items_with_nomenclature)
 
@@ -173,44 +281,158 @@ class Nomenclatures():
         Making a dictionnary with as key the 'father' article and in value
         a list of dictionnary with in key the 'son' article and in value
         the quantity.
+
+        Built in a single group_by pass over the valid lines; the children keep
+        the order of the sheet and the parents are sorted.
         """
-        nomenclature_dictionnary = {}
-        list_items_with_nomenclature = self._get_list_items_with_nomenclature(self.df)
-        for item in list_items_with_nomenclature:
-            nomenclature_dictionnary[item] = []
-            df_item = (
-                self.df.filter(
-                    (pl.col("article") == item) 
-                    & ((pl.col("art_et_art_fils_eqpt_quantite").is_not_null()) 
-                       & (pl.col("art_et_art_fils_eqpt_quantite") > 0)))
-                       .iter_rows(named=True)
-                       )
-            for row in df_item:
-                nomenclature_dictionnary[item].append({"code_article": row["article_eqpt_article_fils"], "quantite": row["art_et_art_fils_eqpt_quantite"]})
+        df_grouped = (
+            self.df.filter(VALID_NOMENCLATURE_LINE)
+            .group_by("article", maintain_order=True)
+            .agg(
+                pl.struct(
+                    pl.col("article_eqpt_article_fils").alias("code_article"),
+                    pl.col("art_et_art_fils_eqpt_quantite").alias("quantite"),
+                ).alias("article_fils")
+            )
+            .sort("article")
+        )
 
-        return nomenclature_dictionnary
+        return dict(zip(df_grouped["article"].to_list(), df_grouped["article_fils"].to_list()))
 
 
-    def get_item_nomenclature(self, item_code: str, item_parent: str=None, multiplying_factor: int=1, counter: int=None) -> dict:
+    def get_nomenclature_lines(self) -> pl.DataFrame:
+        """
+        Lignes de nomenclature de quantité valide au schéma de la table nomenclature
+        (code_article_parent, code_article_fils, quantite). Les boucles d'un
+        article sur lui-même sont conservées : elles sont signalées, puis
+        écartées selon la politique, par le contrôle des références (validate_references).
+        """
+        return self.df.filter(VALID_NOMENCLATURE_QUANTITY).select(
+            pl.col("article").cast(pl.String).alias("code_article_parent"),
+            pl.col("article_eqpt_article_fils").cast(pl.String).alias("code_article_fils"),
+            pl.col("art_et_art_fils_eqpt_quantite").cast(pl.Float64).alias("quantite"),
+        ).select(list(NOMENCLATURE_SCHEMA))
+
+
+    def _unit_subtree(self, item_code: str, path: list[str]) -> "_NomenclatureNode":
+        """
+        Sous-arbre unitaire (quantité 1) de l'article, construit une seule fois
+        par article distinct : les sous-ensembles communs sont partagés.
+        path est la branche en cours d'exploration, pour détecter les cycles.
+        """
+        node = self._subtrees.get(item_code)
+        if node is not None:
+            return node
+        if item_code in path:
+            raise NomenclatureCycleError(path[path.index(item_code):] + [item_code])
+        path.append(item_code)
+        children = [
+            (child["quantite"], self._unit_subtree(child["code_article"], path))
+            for child in self.nomenclature_dictionnary.get(item_code, [])
+        ]
+        path.pop()
+        node = _NomenclatureNode(item_code, children)
+        self._subtrees[item_code] = node
+        return node
+
+
+    def _get_subtree(self, item_code: str) -> "_NomenclatureNode":
+        return self._unit_subtree(item_code, [])
+
+
+    def _get_quantity_in_parent(self, item_code: str, item_parent: str) -> float:
+        quantities = {child["code_article"]: child["quantite"] for child in self.nomenclature_dictionnary.get(item_parent, [])}
+        if item_code not in quantities:
+            raise ValueError(f"L'article {item_code} n'est pas un article fils de {item_parent}")
+        return quantities[item_code]
+
+
+    def get_item_nomenclature(self, item_code: str, item_parent: str=None, multiplying_factor: int=1) -> dict:
         """
         return a dictionnary representing the hierarchy or nomenclature of the item
-        
+
+        The unit subtree of every distinct sub-assembly is expanded once and
+        shared; quantities are only multiplied when the dictionnary is produced.
+        Raises NomenclatureCycleError if the nomenclature contains a cycle.
         """
-        if counter is None:
-            counter = 0
-        counter += 1
-        if counter > 10:
-            return {}
-        nomenclature = {}
-        nomenclature["code_article"] = item_code
+        quantite = multiplying_factor
         if item_parent is not None:
-            for row in self.nomenclature_dictionnary[item_parent]:
-                if row["code_article"] == item_code:
-                    nomenclature["quantite"] = row["quantite"] * multiplying_factor
-        else:
-            nomenclature["quantite"] = 1 * multiplying_factor
-        if item_code in self.nomenclature_dictionnary:
-            nomenclature["article_fils"] = []
-            for code_article_fils in self.nomenclature_dictionnary[item_code]:
-                nomenclature["article_fils"].append(self.get_item_nomenclature(code_article_fils["code_article"], item_code, nomenclature["quantite"], counter))
+            quantite = self._get_quantity_in_parent(item_code, item_parent) * multiplying_factor
+        return self._get_subtree(item_code).to_dict(quantite)
+
+
+    def get_item_nomenclature_table(self, item_code: str, multiplying_factor: int=1) -> pl.DataFrame:
+        """
+        return the nomenclature of the item as a flat table with one line per path:
+        chemin (codes from the root separated by '/'), niveau (0 for the root),
+        code_article and quantite_cumulee
+        """
+        chemins, niveaux, codes, quantites = [], [], [], []
+        stack = [(self._get_subtree(item_code), item_code, 0, multiplying_factor)]
+        while stack:
+            node, chemin, niveau, quantite = stack.pop()
+            chemins.append(chemin)
+            niveaux.append(niveau)
+            codes.append(node.code)
+            quantites.append(quantite)
+            for child_quantite, child in reversed(node.children):
+                stack.append((child, f"{chemin}/{child.code}", niveau + 1, quantite * child_quantite))
+        return pl.DataFrame(
+            {"chemin": chemins, "niveau": niveaux, "code_article": codes, "quantite_cumulee": quantites},
+            schema={"chemin": pl.String, "niveau": pl.Int64, "code_article": pl.String, "quantite_cumulee": pl.Float64},
+        )
+
+
+    def get_item_total_quantities(self, item_code: str, multiplying_factor: int=1) -> dict[str, float]:
+        """
+        return the total quantity of every article contained in the nomenclature
+        of the item (the item itself included), in time linear in the number of
+        distinct articles: quantities are propagated once per article in
+        topological order instead of once per path
+        """
+        root = self._get_subtree(item_code)
+        order = []
+        visited = set()
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+                continue
+            if node.code in visited:
+                continue
+            visited.add(node.code)
+            stack.append((node, True))
+            for _, child in node.children:
+                if child.code not in visited:
+                    stack.append((child, False))
+        totals = {root.code: multiplying_factor}
+        for node in reversed(order):
+            for child_quantite, child in node.children:
+                totals[child.code] = totals.get(child.code, 0) + totals[node.code] * child_quantite
+        return totals
+
+
+class NomenclatureCycleError(Exception):
+    """Levée quand la nomenclature d'un article contient un cycle"""
+
+    def __init__(self, cycle: list[str]):
+        self.cycle = cycle
+        super().__init__(f"Cycle détecté dans la nomenclature : {' -> '.join(cycle)}")
+
+
+class _NomenclatureNode():
+    """Sous-arbre unitaire d'un article, partagé entre tous ses parents"""
+
+    __slots__ = ("code", "children")
+
+    def __init__(self, code: str, children: list[tuple[float, "_NomenclatureNode"]]):
+        self.code = code
+        self.children = children
+
+
+    def to_dict(self, quantite: float) -> dict:
+        nomenclature = {"code_article": self.code, "quantite": quantite}
+        if self.children:
+            nomenclature["article_fils"] = [child.to_dict(quantite * child_quantite) for child_quantite, child in self.children]
         return nomenclature
@@ -1,10 +1,23 @@
 import os
+import re
+import json
+import hashlib
+import logging
 import unidecode
+import fastexcel
 import polars as pl
+from pathlib import Path
 from time import perf_counter
 from string import punctuation
-import re
+from creation_base_donnees.constants import folder_cache_excel
+from creation_base_donnees.schemas import ColumnSpec
+
 
+logger = logging.getLogger(__name__)
+
+# À incrémenter quand la lecture ou la normalisation des en-têtes change :
+# les feuilles déjà en cache sont alors relues
+CACHE_VERSION = 3
 
 
 def get_execution_time(func):
@@ -63,14 +76,157 @@ def transform_columns_name(dataframe: pl.DataFrame) -> pl.DataFrame:
     return dataframe
 
 
-def read_excel(folder_path: str, file_name: str, sheet_name: str=None) -> pl.DataFrame:
+def file_fingerprint(file_path: str, *parameters) -> str:
+    """
+    Empreinte d'un fichier source à partir de sa taille et de sa date de
+    modification (sans lire son contenu), et des paramètres de lecture
+    """
+    stat = os.stat(file_path)
+    return hashlib.sha1(f"{stat.st_size}|{stat.st_mtime_ns}|{parameters!r}".encode()).hexdigest()
+
+
+def get_cache_folder() -> Path:
+    """Dossier du cache des feuilles Excel, relatif à la racine du projet"""
+    return Path(__file__).parent.parent.absolute() / folder_cache_excel
+
+
+def _cache_path(file_path: str, sheet_name: str | None, cache_folder: Path,
+                columns: list[ColumnSpec] | None = None) -> tuple[Path, str]:
+    """
+    Chemin du cache d'une feuille et préfixe commun à toutes les versions du
+    cache de cette feuille. La clé combine le chemin du fichier, sa taille,
+    sa date de modification, la feuille, les colonnes lues et CACHE_VERSION.
+    """
+    sheet_key = sheet_name or ""
+    prefix = hashlib.sha1(f"{os.path.abspath(file_path)}|{sheet_key}".encode()).hexdigest()[:16]
+    fingerprint = file_fingerprint(file_path, CACHE_VERSION, columns)[:16]
+    name = f"{transform_string(Path(file_path).stem)}__{transform_string(sheet_key)}__{prefix}"
+    return cache_folder / f"{name}__{fingerprint}.parquet", name
+
+
+def _write_cache(df: pl.DataFrame, cache_file: Path, name: str):
+    """Écrit la feuille en cache (écriture atomique) et supprime ses versions périmées"""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+        df.write_parquet(tmp_file)
+        os.replace(tmp_file, cache_file)
+        for stale_file in cache_file.parent.glob(f"{name}__*.parquet"):
+            if stale_file != cache_file:
+                stale_file.unlink()
+    except OSError as e:
+        # Le cache n'est qu'une optimisation : un échec d'écriture n'empêche pas la lecture
+        logger.warning(f"Impossible d'écrire le cache {cache_file} : {str(e)}")
+
+
+def _engine_dtype(dtype: pl.DataType) -> str:
+    """
+    Type demandé au moteur Excel : les nombres en flottant, le reste en texte.
+    Les dates sont lues en texte puis converties, qu'elles soient saisies
+    comme dates ou comme texte dans le classeur.
+    """
+    return "float" if dtype in (pl.Float64, pl.Int64) else "string"
+
+
+def _cast_to_spec(name: str, dtype: pl.DataType, read_dtype: pl.DataType) -> pl.Expr:
+    """Conversion d'une colonne lue par le moteur Excel (type read_dtype) vers le type de sa spécification"""
+    column = pl.col(name)
+    if dtype == pl.String and read_dtype == pl.Float64:
+        # Type deviné par le moteur : un code saisi en nombre (123456) reste écrit sans décimale
+        return pl.when(column == column.round()).then(
+            column.cast(pl.Int64, strict=False).cast(pl.String)
+        ).otherwise(column.cast(pl.String)).alias(name)
+    if dtype == pl.Int64:
+        return column.cast(pl.Float64, strict=False).cast(pl.Int64, strict=False)
+    if isinstance(dtype, pl.Datetime) and not read_dtype.is_temporal():
+        return pl.when(column.cast(pl.String).is_not_null()).then(
+            column.cast(pl.String).str.to_datetime(strict=False)
+        ).cast(dtype).alias(name)
+    return column.cast(dtype, strict=False)
+
+
+def _read_columns(file_path: str, sheet_name: str | None, columns: list[ColumnSpec],
+                  known_headers: list[str] | None = None) -> tuple[pl.DataFrame, list[str]]:
+    """
+    Lit uniquement les colonnes spécifiées de la feuille. Leur en-tête est
+    retrouvé dans la ligne d'en-tête du classeur (en-tête exact ou normalisé).
+
+    Le type des colonnes dont l'en-tête est connu (known_headers, retenus lors
+    d'une lecture précédente de la feuille) est imposé au moteur Excel : pas
+    d'inférence, un code article numérique reste un texte. Les autres ont leur
+    type deviné ; si une colonne numérique contenant du texte a ainsi été lue
+    en texte, avec perte de précision, la feuille est relue une seconde fois
+    avec tous les types imposés.
+
+    Returns:
+        tuple: colonnes lues et en-têtes des colonnes lues
+    """
+    by_source = {spec.source: spec for spec in columns if spec.source is not None}
+    by_name = {spec.name: spec for spec in columns if spec.source is None}
+
+    def resolve(header: str) -> ColumnSpec | None:
+        return by_source.get(header) or by_name.get(transform_string(header))
+
+    def engine_dtypes(headers: list[str]) -> dict[str, str]:
+        return {header: _engine_dtype(spec.dtype) for header in headers if (spec := resolve(header)) is not None}
+
+    reader = fastexcel.read_excel(file_path)
+    sheet_id = sheet_name if sheet_name else 0
+    sheet = reader.load_sheet(
+        sheet_id, use_columns=lambda column: resolve(column.name) is not None,
+        dtypes=engine_dtypes(known_headers or []) or None, schema_sample_rows=None,
+    )
+    dtypes = engine_dtypes([column.name for column in sheet.selected_columns])
+    if any(column.dtype == "string" and dtypes[column.name] == "float" for column in sheet.selected_columns):
+        logger.info(f"Nouvelles colonnes numériques dans la feuille {sheet_name or '(première)'}, relecture avec leur type")
+        del sheet
+        sheet = reader.load_sheet(sheet_id, use_columns=list(dtypes), dtypes=dtypes)
+    df = sheet.to_polars()
+
+    specs = [resolve(header) for header in df.columns]
+    df.columns = [spec.name for spec in specs]
+    missing = [spec.name for spec in columns if spec.name not in df.columns]
+    if missing:
+        logger.debug(f"Colonnes absentes de la feuille {sheet_name or '(première)'} : {missing}")
+    return df.select([_cast_to_spec(spec.name, spec.dtype, df.schema[spec.name]) for spec in specs]), list(dtypes)
+
+
+def _read_known_headers(headers_file: Path) -> list[str] | None:
+    try:
+        with open(headers_file, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_known_headers(headers: list[str], headers_file: Path):
+    """Retient les en-têtes des colonnes lues dans la feuille (écriture atomique)"""
+    try:
+        headers_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = headers_file.with_name(headers_file.name + ".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(headers, f, ensure_ascii=False)
+        os.replace(tmp_file, headers_file)
+    except OSError as e:
+        logger.warning(f"Impossible d'écrire {headers_file} : {str(e)}")
+
+
+def read_excel(folder_path: str, file_name: str, sheet_name: str=None, use_cache: bool=True,
+               columns: list[ColumnSpec]=None) -> pl.DataFrame:
     '''
     Lit un fichier Excel dans un DataFrame Polars.
 
+    La feuille lue, en-têtes normalisés, est conservée en cache au format
+    Parquet : tant que le fichier Excel n'est pas modifié (même taille et même
+    date de modification), les lectures suivantes se font depuis le cache.
+
     Args:
         folder_path (str): Chemin du dossier contenant le fichier Excel
         file_name (str): Nom du fichier Excel
         sheet_name (str, optional): Nom de la feuille à lire. Si None, lit la première feuille.
+        use_cache (bool, optional): Utilise le cache Parquet des feuilles déjà lues
+        columns (list[ColumnSpec], optional): Colonnes à lire et leur type. Si None,
+            lit toutes les colonnes et laisse le moteur Excel déterminer leur type.
 
     Returns:
         pl.DataFrame: DataFrame contenant les données de la feuille Excel
@@ -81,15 +237,37 @@ def read_excel(folder_path: str, file_name: str, sheet_name: str=None) -> pl.Dat
     file_path = os.path.join(folder_path, file_name)
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Le fichier {file_path} n'existe pas")
+
+    if use_cache:
+        cache_file, cache_name = _cache_path(file_path, sheet_name, get_cache_folder(), columns)
+        if cache_file.exists():
+            try:
+                df = pl.read_parquet(cache_file)
+                logger.info(f"Feuille {sheet_name or '(première)'} de {file_name} lue depuis le cache")
+                return df
+            except Exception as e:
+                logger.warning(f"Cache {cache_file} illisible, relecture du fichier Excel : {str(e)}")
     
     try:
-        if sheet_name:
+        if columns is not None:
+            # En-têtes retenus pour toutes les versions du fichier : la feuille
+            # d'un nouveau fichier n'est alors analysée qu'une fois
+            headers_file = cache_file.with_name(f"{cache_name}__entetes.json") if use_cache else None
+            known_headers = _read_known_headers(headers_file) if use_cache else None
+            df, headers = _read_columns(file_path, sheet_name, columns, known_headers)
+            if use_cache and headers != known_headers:
+                _write_known_headers(headers, headers_file)
+        elif sheet_name:
             df = pl.read_excel(file_path, sheet_name=sheet_name)
         else:
             df = pl.read_excel(file_path)
     except Exception as e:
         raise Exception(f"Erreur lors de la lecture du fichier Excel: {str(e)}")
 
-    df = transform_columns_name(df)
+    if columns is None:
+        df = transform_columns_name(df)
+
+    if use_cache:
+        _write_cache(df, cache_file, cache_name)
 
     return df
@@ -106,12 +106,84 @@ class Article(SQLModel, table=True):
 class Nomenclature(SQLModel, table=True):
     id : int = Field(default=None, primary_key=True)
     """Modèle pour les nomenclatures d'articles"""
-    code_article_parent: str = Field(foreign_key="article.code_article")
-    code_article_fils: str = Field(foreign_key="article.code_article")
+    code_article_parent: str = Field(foreign_key="article.code_article", index=True)
+    code_article_fils: str = Field(foreign_key="article.code_article", index=True)
     quantite: float
 
 
+class NomenclatureLevel(SQLModel, table=True):
+    """Position de chaque article des nomenclatures dans leur graphe, calculée à la construction :
+    - niveau : code de plus bas niveau (profondeur maximale sous un article de tête, 0 pour une tête)
+    - hauteur : nombre maximal de niveaux sous l'article, None si un cycle est atteint (arbre infini)
+    - nb_descendants : nombre d'articles distincts contenus à tous les niveaux
+    - cycle : numéro de la composante fortement connexe (cycle) de l'article, None hors cycle
+    - fermeture_materialisee : les descendants de l'article sont dans nomenclature_closure
+      (False au-delà des limites de taille de la fermeture)"""
+    code_article: str = Field(primary_key=True, foreign_key="article.code_article")
+    niveau: int
+    hauteur: Optional[int] = None
+    nb_descendants: int
+    cycle: Optional[int] = Field(default=None, index=True)
+    fermeture_materialisee: bool = Field(default=True, index=True)
+
+
+class NomenclatureClosure(SQLModel, table=True):
+    """Fermeture transitive des nomenclatures : une ligne par article contenu
+    (descendant), à tous les niveaux, dans un article (ancestor).
+    - min_depth : nombre minimal de niveaux entre les deux articles
+    - cumulative_quantity : quantité totale du descendant dans l'ancêtre, tous chemins confondus
+    - path_count : nombre de chemins de l'ancêtre au descendant
+    Quantité et nombre de chemins sont None si un cycle est atteint depuis l'ancêtre."""
+    __tablename__ = "nomenclature_closure"
+    ancestor: str = Field(primary_key=True, foreign_key="article.code_article")
+    descendant: str = Field(primary_key=True, foreign_key="article.code_article", index=True)
+    min_depth: int
+    cumulative_quantity: Optional[float] = None
+    path_count: Optional[int] = None
+
+
 class Image(SQLModel, table=True):
+    """Image redimensionnée, stockée une seule fois : les photos identiques
+    (même empreinte du contenu redimensionné) partagent la même image"""
     id: int | None = Field(default=None, primary_key=True)
-    code_article: str = Field(foreign_key="article.code_article")
-    image: bytes = Field(sa_column=Column(LargeBinary))
\ No newline at end of file
+    empreinte: str = Field(unique=True)
+    # Nombre de photos du dossier qui utilisent l'image
+    nb_references: int = 1
+    image: bytes = Field(sa_column=Column(LargeBinary))
+
+
+class ArticleImage(SQLModel, table=True):
+    """Table d'association entre Article et Image"""
+    code_article: str = Field(primary_key=True, foreign_key="article.code_article")
+    image_id: int = Field(primary_key=True, foreign_key="image.id", index=True)
+
+
+class ImageMiniature(SQLModel, table=True):
+    """Miniature de chaque image, dans sa propre table : la liste des images
+    d'un article se lit sans charger les images en taille réelle"""
+    image_id: int = Field(primary_key=True, foreign_key="image.id")
+    miniature: bytes = Field(sa_column=Column(LargeBinary))
+
+
+class PhotoManifest(SQLModel, table=True):
+    """Manifeste des photos importées : une ligne par fichier du dossier photos,
+    pour ne retraiter que les photos nouvelles ou modifiées lors d'une reconstruction"""
+    nom_fichier: str = Field(primary_key=True)
+    code_article: str
+    taille: int
+    date_modification: float
+    empreinte: str
+    # Encodage de l'image (voir photos.encoding_label)
+    encodage: str
+    image_id: int = Field(foreign_key="image.id", index=True)
+
+
+
+class BuildStage(SQLModel, table=True):
+    """Étapes terminées de la construction de la base : une construction
+    interrompue reprend à la première étape non terminée. L'empreinte des
+    données d'entrée permet de refaire une étape dont les sources ont changé."""
+    etape: str = Field(primary_key=True)
+    empreinte: str
+    lignes: int
+    termine_le: datetime
@@ -0,0 +1,312 @@
+import logging
+import polars as pl
+from creation_base_donnees.schemas import NOMENCLATURE_LEVEL_SCHEMA, NOMENCLATURE_CLOSURE_SCHEMA
+
+
+logger = logging.getLogger(__name__)
+
+
+def _adjacency(nomenclature_df: pl.DataFrame) -> tuple[list[str], list[list[int]]]:
+    """Articles du graphe (triés) et, pour chacun, les indices de ses articles fils distincts"""
+    codes = (
+        pl.concat([nomenclature_df["code_article_parent"], nomenclature_df["code_article_fils"]])
+        .unique()
+        .sort()
+        .to_list()
+    )
+    index = {code: i for i, code in enumerate(codes)}
+    children = [[] for _ in codes]
+    edges = nomenclature_df.select("code_article_parent", "code_article_fils").unique(maintain_order=True)
+    for parent, child in edges.iter_rows():
+        children[index[parent]].append(index[child])
+    return codes, children
+
+
+def strongly_connected_components(children: list[list[int]]) -> list[list[int]]:
+    """
+    Composantes fortement connexes d'un graphe orienté (algorithme de Tarjan,
+    itératif pour ne pas dépendre de la limite de récursion de Python).
+
+    Les composantes sont produites dans l'ordre topologique inverse : toute
+    arête va d'une composante vers une composante produite avant elle.
+    """
+    count = len(children)
+    order = [-1] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    stack = []
+    components = []
+    counter = 0
+    for root in range(count):
+        if order[root] != -1:
+            continue
+        order[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            node, position = work[-1]
+            if position < len(children[node]):
+                work[-1] = (node, position + 1)
+                child = children[node][position]
+                if order[child] == -1:
+                    order[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, 0))
+                elif on_stack[child]:
+                    lowlink[node] = min(lowlink[node], order[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == order[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+# Taille (en bits) d'une entrée d'ensemble Python, pointeur et empreinte compris :
+# au-delà de len(codes) // _SET_ENTRY_BITS éléments, un ensemble de bits sur
+# tous les articles est plus compact qu'un ensemble
+_SET_ENTRY_BITS = 256
+_MIN_DENSE_SIZE = 64
+
+
+class _Descendants:
+    """
+    Descendants d'une composante : un ensemble d'indices tant qu'ils sont peu
+    nombreux (nomenclatures réelles, creuses), un entier utilisé comme ensemble
+    de bits au-delà de dense_size (graphes denses, où les ensembles pèseraient
+    plus lourd que len(codes) bits par composante).
+    """
+
+    __slots__ = ("dense_size", "members", "bits")
+
+    def __init__(self, dense_size: int):
+        self.dense_size = dense_size
+        self.members = set()
+        self.bits = None
+
+    def add(self, members: list[int]):
+        if self.bits is None:
+            self.members.update(members)
+            self._densify_if_large()
+        elif len(members) == 1:
+            self.bits |= 1 << members[0]
+        else:
+            self.bits |= _to_bits(members)
+
+    def update(self, other: "_Descendants", owned: bool = False):
+        """Ajoute les descendants de other ; avec owned, other n'est plus lu et peut être repris"""
+        if self.bits is None and other.bits is None:
+            if owned and len(other.members) > len(self.members):
+                self.members, other.members = other.members, self.members
+            self.members |= other.members
+            self._densify_if_large()
+            return
+        if self.bits is None:
+            self.bits, self.members = _to_bits(self.members), None
+        self.bits |= other.bits if other.bits is not None else _to_bits(other.members)
+
+    def _densify_if_large(self):
+        if len(self.members) > self.dense_size:
+            self.bits, self.members = _to_bits(self.members), None
+
+    def __len__(self) -> int:
+        return len(self.members) if self.bits is None else self.bits.bit_count()
+
+
+def _to_bits(members) -> int:
+    """Ensemble de bits des indices members, construit octet par octet"""
+    if not members:
+        return 0
+    bitmap = bytearray(max(members) // 8 + 1)
+    for member in members:
+        bitmap[member >> 3] |= 1 << (member & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+def nomenclature_levels(nomenclature_df: pl.DataFrame) -> tuple[pl.DataFrame, list[list[str]]]:
+    """
+    Parcours topologique du graphe des nomenclatures (arêtes parent -> fils).
+
+    Les cycles sont réduits à leur composante fortement connexe, puis le
+    graphe des composantes, sans cycle, est parcouru une fois dans chaque
+    sens pour calculer le niveau, la hauteur et le nombre de descendants de
+    chaque article (voir NomenclatureLevel). Les descendants d'une composante
+    ne sont conservés que jusqu'à leur lecture par tous ses parents (voir
+    _Descendants).
+
+    Returns:
+        tuple: (table au schéma NOMENCLATURE_LEVEL_SCHEMA, liste des cycles
+        triés, chacun sous forme de liste de codes articles triés)
+    """
+    codes, children = _adjacency(nomenclature_df)
+    components = strongly_connected_components(children)
+    component_of = [0] * len(codes)
+    for c, members in enumerate(components):
+        for member in members:
+            component_of[member] = c
+    successors = [
+        {component_of[child] for member in members for child in children[member]} - {c}
+        for c, members in enumerate(components)
+    ]
+    cyclic = [
+        len(members) > 1 or members[0] in children[members[0]]
+        for members in components
+    ]
+    unread = [0] * len(components)
+    for c in range(len(components)):
+        for successor in successors[c]:
+            unread[successor] += 1
+
+    # Des feuilles vers les têtes : hauteur, cycle atteint et descendants
+    height = [0] * len(components)
+    reaches_cycle = list(cyclic)
+    descendants = [None] * len(components)
+    descendant_count = [0] * len(components)
+    dense_size = max(_MIN_DENSE_SIZE, len(codes) // _SET_ENTRY_BITS)
+    for c in range(len(components)):
+        reached = _Descendants(dense_size)
+        for successor in successors[c]:
+            height[c] = max(height[c], height[successor] + 1)
+            reaches_cycle[c] = reaches_cycle[c] or reaches_cycle[successor]
+            unread[successor] -= 1
+            # Le dernier parent reprend les descendants du fils au lieu de les copier
+            reached.update(descendants[successor], owned=not unread[successor])
+            reached.add(components[successor])
+            if not unread[successor]:
+                descendants[successor] = None
+        if cyclic[c]:
+            reached.add(components[c])
+        # Un article d'un cycle se contient lui-même : il n'est pas compté
+        descendant_count[c] = len(reached) - cyclic[c]
+        if unread[c]:
+            descendants[c] = reached
+
+    # Des têtes vers les feuilles : code de plus bas niveau
+    level = [0] * len(components)
+    for c in reversed(range(len(components))):
+        for successor in successors[c]:
+            level[successor] = max(level[successor], level[c] + 1)
+
+    cycles = sorted(sorted(codes[member] for member in members) for c, members in enumerate(components) if cyclic[c])
+    cycle_number = {code: number for number, cycle in enumerate(cycles, start=1) for code in cycle}
+    for cycle in cycles:
+        logger.warning(f"Cycle dans les nomenclatures entre les articles : {', '.join(cycle)}")
+
+    levels_df = pl.DataFrame({
+        "code_article": codes,
+        "niveau": [level[component_of[i]] for i in range(len(codes))],
+        "hauteur": [None if reaches_cycle[component_of[i]] else height[component_of[i]] for i in range(len(codes))],
+        "nb_descendants": [descendant_count[component_of[i]] for i in range(len(codes))],
+        "cycle": [cycle_number.get(code) for code in codes],
+        "fermeture_materialisee": [True] * len(codes),
+    }, schema=NOMENCLATURE_LEVEL_SCHEMA)
+    return levels_df, cycles
+
+
+def _closure_guard(levels_df: pl.DataFrame, max_descendants: int, max_rows: int) -> pl.DataFrame:
+    """
+    Limites de taille de la fermeture : les articles de plus de max_descendants
+    descendants ne sont pas matérialisés, puis les plus gros jusqu'à ce que le
+    total tienne dans max_rows lignes. Hors cycles, un article a plus de
+    descendants que chacun de ses fils : les ancêtres d'un article écarté sont
+    aussi écartés, la fermeture des articles conservés est donc complète.
+    """
+    by_size = levels_df.sort("nb_descendants", descending=True)
+    rows_if_kept = by_size["nb_descendants"].reverse().cum_sum().reverse()
+    return by_size.with_columns(
+        ((pl.col("nb_descendants") <= max_descendants) & (rows_if_kept <= max_rows)).alias("fermeture_materialisee")
+    ).select(levels_df.columns).sort("code_article")
+
+
+def nomenclature_closure(nomenclature_df: pl.DataFrame, levels_df: pl.DataFrame, max_descendants: int,
+                         max_rows: int) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Fermeture transitive des nomenclatures, au schéma NOMENCLATURE_CLOSURE_SCHEMA.
+
+    Hors cycles, elle est calculée par hauteur croissante : la fermeture d'un
+    article est celle de ses fils décalée d'un niveau et multipliée par la
+    quantité du lien, regroupée par descendant (profondeur minimale, somme des
+    quantités et des chemins). Les articles qui atteignent un cycle n'ont
+    qu'une profondeur minimale, par parcours en largeur. Comme dans
+    nb_descendants, un article d'un cycle n'est pas son propre descendant.
+
+    Args:
+        levels_df: table de nomenclature_levels
+        max_descendants, max_rows: limites de taille (voir _closure_guard)
+
+    Returns:
+        tuple: (fermeture, levels_df avec fermeture_materialisee renseignée)
+    """
+    levels_df = _closure_guard(levels_df, max_descendants, max_rows)
+    skipped = levels_df.filter(~pl.col("fermeture_materialisee") & (pl.col("nb_descendants") > 0))
+    if skipped.height:
+        logger.warning(
+            f"Fermeture des nomenclatures non matérialisée pour {skipped.height} articles "
+            f"(jusqu'à {skipped['nb_descendants'].max()} descendants) : {', '.join(skipped['code_article'].head(20))}"
+        )
+    materialized = levels_df.filter(pl.col("fermeture_materialisee") & (pl.col("nb_descendants") > 0))
+    edges = (
+        nomenclature_df.group_by("code_article_parent", "code_article_fils")
+        .agg(pl.col("quantite").sum(), pl.len().cast(pl.Int64).alias("path_count"))
+        .rename({"code_article_parent": "ancestor", "code_article_fils": "descendant"})
+    )
+
+    frames = []
+    acyclic = materialized.filter(pl.col("hauteur").is_not_null())
+    closure = pl.DataFrame(schema=NOMENCLATURE_CLOSURE_SCHEMA)
+    for _, ancestors in acyclic.sort("hauteur").group_by("hauteur", maintain_order=True):
+        level_edges = edges.join(ancestors.select(pl.col("code_article").alias("ancestor")), on="ancestor", how="semi")
+        direct = level_edges.select(
+            "ancestor", "descendant", pl.lit(1, dtype=pl.Int64).alias("min_depth"),
+            pl.col("quantite").alias("cumulative_quantity"), "path_count",
+        )
+        indirect = level_edges.join(closure, left_on="descendant", right_on="ancestor", suffix="_fils").select(
+            "ancestor",
+            pl.col("descendant_fils").alias("descendant"),
+            (pl.col("min_depth") + 1).alias("min_depth"),
+            (pl.col("quantite") * pl.col("cumulative_quantity")).alias("cumulative_quantity"),
+            (pl.col("path_count") * pl.col("path_count_fils")).alias("path_count"),
+        )
+        level_closure = pl.concat([direct, indirect]).group_by("ancestor", "descendant").agg(
+            pl.col("min_depth").min(), pl.col("cumulative_quantity").sum(), pl.col("path_count").sum()
+        ).select(list(NOMENCLATURE_CLOSURE_SCHEMA))
+        frames.append(level_closure)
+        closure = pl.concat([closure, level_closure], rechunk=False)
+
+    # Articles qui atteignent un cycle : parcours en largeur, profondeur minimale seulement
+    cyclic = materialized.filter(pl.col("hauteur").is_null()).select(pl.col("code_article").alias("ancestor"))
+    links = edges.select("ancestor", "descendant")
+    frontier = (
+        links.join(cyclic, on="ancestor", how="semi")
+        .filter(pl.col("ancestor") != pl.col("descendant"))
+        .with_columns(pl.lit(1, dtype=pl.Int64).alias("min_depth"))
+    )
+    reached = frontier
+    while frontier.height:
+        frontier = (
+            frontier.join(links, left_on="descendant", right_on="ancestor", suffix="_fils")
+            .select("ancestor", pl.col("descendant_fils").alias("descendant"), (pl.col("min_depth") + 1).alias("min_depth"))
+            .filter(pl.col("ancestor") != pl.col("descendant"))
+            .unique(subset=["ancestor", "descendant"])
+            .join(reached, on=["ancestor", "descendant"], how="anti")
+        )
+        reached = pl.concat([reached, frontier])
+    frames.append(reached.with_columns(
+        pl.lit(None, dtype=pl.Float64).alias("cumulative_quantity"), pl.lit(None, dtype=pl.Int64).alias("path_count")
+    ))
+
+    closure = pl.concat(frames).sort("ancestor", "descendant")
+    return closure, levels_df
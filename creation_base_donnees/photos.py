@@ -0,0 +1,278 @@
+import io
+import os
+import re
+import hashlib
+import logging
+from itertools import chain
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PIL import Image as PILImage
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS_PHOTO = {"jpeg", "jpg", "png"}
+PATTERN_CODE_ARTICLE = r"[A-Z]{3}\d{4}\d{2}"
+THUMBNAIL_SIZE = (128, 128)
+
+
+# Formats d'encodage des images stockées (Pillow)
+IMAGE_FORMATS = ("JPEG", "WEBP")
+DEFAULT_ENCODER = {"format": "JPEG", "quality": 85, "target_bytes": None}
+# Qualité minimale acceptée pour atteindre une taille cible
+MIN_QUALITY = 40
+
+
+def _save(img, format, quality) -> bytes:
+    output = io.BytesIO()
+    if format == "JPEG":
+        img.save(output, format="JPEG", quality=quality, optimize=True)
+    else:
+        img.save(output, format="WEBP", quality=quality, method=4)
+    return output.getvalue()
+
+
+def encode_image(img, format="JPEG", quality=85, target_bytes=None) -> bytes:
+    """Encode une image décodée (PIL) au format et à la qualité demandés.
+
+    Avec une taille cible en octets, la qualité est abaissée par dichotomie
+    jusqu'à la plus haute qualité qui l'atteint, sans descendre sous MIN_QUALITY.
+
+    Raises:
+        ValueError: si le format n'est pas dans IMAGE_FORMATS
+    """
+    if format not in IMAGE_FORMATS:
+        raise ValueError(f"Format d'image inconnu : {format} (attendu : {', '.join(IMAGE_FORMATS)})")
+    data = _save(img, format, quality)
+    if target_bytes is None or len(data) <= target_bytes:
+        return data
+    best, smallest = None, data
+    low, high = MIN_QUALITY, quality - 1
+    while low <= high:
+        middle = (low + high) // 2
+        candidate = _save(img, format, middle)
+        if len(candidate) <= target_bytes:
+            best = candidate
+            low = middle + 1
+        else:
+            smallest = min(smallest, candidate, key=len)
+            high = middle - 1
+    # Cible inatteignable : l'encodage le plus petit obtenu
+    return best if best is not None else smallest
+
+
+def encoding_label(format="JPEG", quality=85, target_bytes=None) -> str:
+    """Description de l'encodage enregistrée dans le manifeste des photos :
+    une photo encodée autrement est retraitée"""
+    label = f"{format} q{quality}"
+    return f"{label} <= {target_bytes} o" if target_bytes is not None else label
+
+
+def resize_image(image_bytes, max_size=(700, 700), format="JPEG", quality=85, target_bytes=None):
+    """Redimensionne une image tout en conservant son ratio d'aspect.
+
+    Args:
+        image_bytes (bytes): L'image en format bytes
+        max_size (tuple): La taille maximale (largeur, hauteur)
+        format (str): Format d'encodage (JPEG ou WEBP)
+        quality (int): Qualité d'encodage
+        target_bytes (int): Taille cible en octets (voir encode_image)
+
+    Returns:
+        bytes: L'image redimensionnée en format bytes
+    """
+    # Ouvre l'image depuis les bytes
+    img = PILImage.open(io.BytesIO(image_bytes))
+
+    # Convertit en RGB si nécessaire (pour les images PNG avec transparence)
+    if img.mode in ('RGBA', 'P'):
+        img = img.convert('RGB')
+
+    # Calcule les nouvelles dimensions en conservant le ratio
+    ratio = min(max_size[0] / img.width, max_size[1] / img.height)
+    if ratio < 1:  # Seulement si l'image est plus grande que max_size
+        new_size = (int(img.width * ratio), int(img.height * ratio))
+        img = img.resize(new_size, PILImage.Resampling.LANCZOS)
+
+    # Convertit l'image redimensionnée en bytes
+    return encode_image(img, format, quality, target_bytes)
+
+
+def make_thumbnail(image_bytes, max_size=THUMBNAIL_SIZE, format="JPEG", quality=85):
+    """Miniature d'une image, générée à partir de l'image déjà redimensionnée"""
+    return resize_image(image_bytes, max_size, format, quality)
+
+
+def list_photos(folder_photo: str) -> list[dict]:
+    """
+    Liste les photos du dossier dont le nom contient un code article.
+    Le parcours se fait avec os.scandir : taille et date de modification
+    sont obtenues sans appel système supplémentaire par fichier.
+
+    Returns:
+        list[dict]: nom_fichier, code_article, taille, date_modification
+    """
+    photos = []
+    with os.scandir(folder_photo) as entries:
+        for entry in entries:
+            extension = os.path.splitext(entry.name)[1].lower().lstrip(".")
+            if extension not in EXTENSIONS_PHOTO or not entry.is_file():
+                continue
+            response = re.search(PATTERN_CODE_ARTICLE, entry.name)
+            if response:
+                stat = entry.stat()
+                photos.append({
+                    "nom_fichier": entry.name,
+                    "code_article": response.group(),
+                    "taille": stat.st_size,
+                    "date_modification": stat.st_mtime,
+                })
+    return photos
+
+
+def listing_fingerprint(photos: list[dict]) -> str:
+    """Empreinte de la liste des photos (noms, tailles et dates de modification)"""
+    listing = sorted((photo["nom_fichier"], photo["taille"], photo["date_modification"]) for photo in photos)
+    return hashlib.sha1(repr(listing).encode()).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def compare_with_manifest(folder_photo: str, photos: list[dict], manifest: dict[str, dict], encoding: str = None):
+    """
+    Compare les photos du dossier au manifeste de la construction précédente.
+
+    Une photo de même taille et date de modification est inchangée. Si seule
+    la date a changé, l'empreinte du contenu est recalculée (sans décodage)
+    pour décider si elle doit être retraitée. Si l'encodage est fourni, une
+    photo encodée autrement (voir encoding_label) est retraitée.
+
+    Returns:
+        tuple: (photos inchangées avec leur entrée du manifeste sous la clé "image_id",
+                photos nouvelles ou modifiées à traiter,
+                noms des fichiers supprimés depuis la construction précédente)
+    """
+    unchanged, to_process = [], []
+    for photo in photos:
+        previous = manifest.get(photo["nom_fichier"])
+        if encoding is not None and previous is not None and previous.get("encodage") != encoding:
+            previous = None
+        if previous is not None and previous["taille"] == photo["taille"]:
+            if previous["date_modification"] == photo["date_modification"]:
+                unchanged.append({**photo, "empreinte": previous["empreinte"], "image_id": previous["image_id"]})
+                continue
+            empreinte = file_digest(os.path.join(folder_photo, photo["nom_fichier"]))
+            if empreinte == previous["empreinte"]:
+                unchanged.append({**photo, "empreinte": empreinte, "image_id": previous["image_id"]})
+                continue
+        to_process.append(photo)
+    names = {photo["nom_fichier"] for photo in photos}
+    deleted = [name for name in manifest if name not in names]
+    return unchanged, to_process, deleted
+
+
+def deduplicate_photos(folder_photo: str, photos: list[dict], known: dict[tuple, int]):
+    """
+    Écarte du redimensionnement les photos en double : même contenu sous un
+    autre nom de fichier ou pour un autre code article.
+
+    Deux fichiers identiques ont la même taille : seules les photos dont la
+    taille est partagée (entre elles ou avec une photo déjà importée) sont
+    relues pour calculer leur empreinte.
+
+    Args:
+        photos: photos nouvelles ou modifiées
+        known: identifiant d'image des photos déjà importées, par (taille, empreinte)
+
+    Returns:
+        tuple: (photos à redimensionner,
+                photos identiques à une photo déjà importée, avec son "image_id",
+                photos en double d'une photo à redimensionner, par nom de cette photo)
+    """
+    known_sizes = {taille for taille, _ in known}
+    size_counts = {}
+    for photo in photos:
+        size_counts[photo["taille"]] = size_counts.get(photo["taille"], 0) + 1
+    to_resize, linked, duplicates = [], [], {}
+    representatives = {}
+    for photo in photos:
+        if photo["taille"] not in known_sizes and size_counts[photo["taille"]] == 1:
+            to_resize.append(photo)
+            continue
+        key = (photo["taille"], file_digest(os.path.join(folder_photo, photo["nom_fichier"])))
+        photo = {**photo, "empreinte": key[1]}
+        if key in known:
+            linked.append({**photo, "image_id": known[key]})
+        elif key in representatives:
+            duplicates.setdefault(representatives[key], []).append(photo)
+        else:
+            representatives[key] = photo["nom_fichier"]
+            to_resize.append(photo)
+    return to_resize, linked, duplicates
+
+
+def load_and_resize(folder_photo: str, photo: dict, encoder: dict = None) -> dict:
+    """
+    Lit une photo, la redimensionne et en génère la miniature. Exécutée dans un processus du pool :
+    lecture, empreinte, décodage, redimensionnement et encodage se font hors
+    du processus principal.
+    """
+    t0 = perf_counter()
+    with open(os.path.join(folder_photo, photo["nom_fichier"]), "rb") as f:
+        image_bytes = f.read()
+    t1 = perf_counter()
+    encoder = {**DEFAULT_ENCODER, **(encoder or {})}
+    image = resize_image(image_bytes, **encoder)
+    miniature = make_thumbnail(image, format=encoder["format"], quality=encoder["quality"])
+    t2 = perf_counter()
+    return {
+        **photo,
+        "empreinte": hashlib.sha256(image_bytes).hexdigest(),
+        "image": image,
+        "empreinte_image": hashlib.sha256(image).hexdigest(),
+        "miniature": miniature,
+        "octets_lus": len(image_bytes),
+        "duree_lecture": t1 - t0,
+        "duree_redimensionnement": t2 - t1,
+    }
+
+
+def resize_photos(folder_photo: str, photos: list[dict], max_workers: int = None, max_in_flight: int = None,
+                  encoder: dict = None):
+    """
+    Redimensionne les photos dans un pool de processus et renvoie les résultats
+    au fil de l'eau (dans l'ordre de fin de traitement).
+
+    Le nombre de photos en cours de traitement est borné par max_in_flight
+    (par défaut deux par processus) afin de plafonner la mémoire utilisée.
+    Une photo illisible est journalisée puis ignorée.
+    """
+    photos = iter(photos)
+    first_photo = next(photos, None)
+    if first_photo is None:
+        return
+    photos = chain([first_photo], photos)
+    # ProcessPoolExecutor refuse plus de 61 processus sous Windows
+    max_workers = min(max_workers or os.cpu_count() or 1, 61)
+    max_in_flight = max_in_flight or 2 * max_workers
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+        while True:
+            for photo in photos:
+                future = executor.submit(load_and_resize, folder_photo, photo, encoder)
+                in_flight[future] = photo["nom_fichier"]
+                if len(in_flight) >= max_in_flight:
+                    break
+            if not in_flight:
+                return
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"Photo {file} ignorée : {str(e)}")
@@ -0,0 +1,144 @@
+import sys
+import json
+import ctypes
+import threading
+from time import perf_counter, process_time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    """Structure PROCESS_MEMORY_COUNTERS de l'API Windows (psapi)"""
+    _fields_ = [
+        ("cb", ctypes.c_ulong),
+        ("PageFaultCount", ctypes.c_ulong),
+        ("PeakWorkingSetSize", ctypes.c_size_t),
+        ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t),
+        ("PeakPagefileUsage", ctypes.c_size_t),
+    ]
+
+
+def _peak_working_set() -> int | None:
+    """Pic de l'ensemble de travail du processus sous Windows (PeakWorkingSetSize)"""
+    kernel32, psapi = ctypes.WinDLL("kernel32"), ctypes.WinDLL("psapi")
+    kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+    psapi.GetProcessMemoryInfo.argtypes = [ctypes.c_void_p, ctypes.POINTER(_ProcessMemoryCounters), ctypes.c_ulong]
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss() -> int | None:
+    """Pic de mémoire résidente du processus depuis son démarrage (il ne redescend jamais), en octets, None si indisponible"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    if sys.platform == "win32":
+        return _peak_working_set()
+    return None
+
+
+def children_cpu_time() -> float | None:
+    """Temps CPU cumulé des processus fils terminés (pool de redimensionnement)"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class BuildProfiler:
+    """
+    Profil des étapes d'une construction. Pour chaque étape : début et fin
+    relativement au début de la construction, thread, temps CPU, pic de mémoire
+    résidente du processus, lignes en entrée et en sortie et octets écrits.
+
+    Les étapes peuvent se chevaucher (lecture des feuilles en parallèle,
+    transformation pendant l'écriture en base) : le temps CPU est celui du
+    processus entier pendant l'étape, il inclut donc celui des étapes concurrentes
+    et des threads de Polars. De même, le pic de mémoire (pic_memoire_processus)
+    est celui du processus depuis son démarrage, relevé à la fin de l'étape : il
+    ne mesure pas la mémoire de l'étape seule et ne peut être remis à zéro
+    pendant que d'autres étapes s'exécutent.
+    """
+
+    def __init__(self):
+        self.t0 = perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        """
+        Mesure une étape. Le dictionnaire renvoyé peut être complété dans le bloc
+        (lignes_sortie, octets_ecrits).
+        """
+        record = {"etape": name, "lignes_entree": rows_in, "lignes_sortie": None, "octets_ecrits": None}
+        start, cpu_start, children_start = perf_counter(), process_time(), children_cpu_time()
+        try:
+            yield record
+        finally:
+            end = perf_counter()
+            children_end = children_cpu_time()
+            record.update({
+                "debut": start - self.t0,
+                "fin": end - self.t0,
+                "duree": end - start,
+                "cpu": process_time() - cpu_start,
+                "cpu_processus_fils": None if children_start is None else children_end - children_start,
+                "pic_memoire_processus": peak_rss(),
+                "thread": threading.current_thread().name,
+            })
+            with self._lock:
+                self.stages.append(record)
+
+    def to_dict(self) -> dict:
+        return {
+            "duree_totale": perf_counter() - self.t0,
+            "pic_memoire_processus": peak_rss(),
+            "etapes": sorted(self.stages, key=lambda stage: stage["debut"]),
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def format(self, width: int = 30) -> str:
+        """Résumé lisible : une ligne par étape avec sa position dans la chronologie"""
+        if not self.stages:
+            return ""
+        stages = sorted(self.stages, key=lambda stage: stage["debut"])
+        total = max(stage["fin"] for stage in stages) or 1.0
+        name_width = max(len(stage["etape"]) for stage in stages)
+        lines = []
+        for stage in stages:
+            first = int(stage["debut"] / total * width)
+            last = max(first + 1, int(round(stage["fin"] / total * width)))
+            bar = " " * first + "#" * (last - first) + " " * (width - last)
+            details = [f"{stage['duree']:.2f} s", f"CPU {stage['cpu']:.2f} s"]
+            if stage["cpu_processus_fils"]:
+                details.append(f"CPU fils {stage['cpu_processus_fils']:.2f} s")
+            if stage["pic_memoire_processus"] is not None:
+                details.append(f"pic processus {stage['pic_memoire_processus'] / 1e6:.0f} Mo")
+            if stage["lignes_entree"] is not None:
+                details.append(f"{stage['lignes_entree']} lignes en entrée")
+            if stage["lignes_sortie"] is not None:
+                details.append(f"{stage['lignes_sortie']} en sortie")
+            if stage["octets_ecrits"] is not None:
+                details.append(f"{stage['octets_ecrits'] / 1e6:.1f} Mo écrits")
+            lines.append(
+                f"{stage['etape']:<{name_width}} |{bar}| {stage['debut']:6.2f} s -> {stage['fin']:6.2f} s "
+                f"({', '.join(details)}; {stage['thread']})"
+            )
+        return "\n".join(lines)
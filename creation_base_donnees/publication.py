@@ -0,0 +1,247 @@
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "articles_manifest.json"
+LEGACY_DATABASE_NAME = "articles.db"
+# Nombre de versions publiées conservées : un client peut encore lire l'avant-dernière
+VERSIONS_KEPT = 3
+# Taille des blocs dont l'empreinte est publiée dans le manifeste (réplique locale par blocs)
+BLOCK_SIZE = 1024 * 1024
+
+
+class PublicationError(Exception):
+    """Levée quand une base construite ne passe pas la validation avant publication"""
+
+
+def file_uri(path, immutable=False) -> str:
+    """
+    URI SQLite d'un fichier (file:///C:/..., file:////serveur/partage/... pour un
+    chemin réseau), à compléter par ses paramètres (?mode=ro). Avec immutable,
+    le fichier est ouvert en lecture seule sans verrou ni recherche de journal :
+    SQLite le suppose jamais modifié.
+    """
+    path = Path(path).absolute().as_posix()
+    # C:/... prend un / initial ; un chemin réseau (//serveur/partage) garde les siens
+    if not path.startswith("/"):
+        path = "/" + path
+    uri = "file://" + quote(path, safe="/:")
+    return uri + "?mode=ro&immutable=1" if immutable else uri
+
+
+def read_only_uri(path) -> str:
+    """
+    URI SQLite en lecture seule d'une base. Une version publiée (ou sa copie
+    locale : articles_<version>.db, images_<version>.db) n'est jamais modifiée
+    et est ouverte immuable ; articles.db ou une construction en cours gardent
+    verrous et journal.
+    """
+    if Path(path).match("*_????????_??????_??????.db"):
+        return file_uri(path, immutable=True)
+    return file_uri(path) + "?mode=ro"
+
+
+def new_version() -> str:
+    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+
+def snapshot_name(version: str) -> str:
+    return f"articles_{version}.db"
+
+
+def images_path(db_path) -> Path:
+    """
+    Fichier des images associé à une base : images_<version>.db à côté de
+    articles_<version>.db (images.db pour articles.db). Les images en taille
+    réelle y sont stockées à part pour que la base principale reste petite.
+    """
+    db_path = Path(db_path)
+    name = db_path.name
+    if name.startswith("articles"):
+        return db_path.with_name("images" + name[len("articles"):])
+    return db_path.with_name(f"images_{name}")
+
+
+def read_manifest(manifest_path) -> dict | None:
+    """Lit le manifeste de publication, None s'il n'existe pas"""
+    manifest_path = Path(manifest_path)
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_snapshot(manifest_path) -> Path | None:
+    """Chemin de la base publiée référencée par le manifeste"""
+    manifest = read_manifest(manifest_path)
+    if manifest is None:
+        return None
+    return Path(manifest_path).parent / manifest["fichier"]
+
+
+def current_snapshot(folder) -> Path | None:
+    """Base actuellement publiée dans le dossier : celle du manifeste, à défaut articles.db"""
+    folder = Path(folder)
+    snapshot = resolve_snapshot(folder / MANIFEST_NAME)
+    if snapshot is not None and snapshot.exists():
+        return snapshot
+    legacy = folder / LEGACY_DATABASE_NAME
+    return legacy if legacy.exists() else None
+
+
+def unfinished_build(folder) -> Path | None:
+    """
+    Construction interrompue à reprendre : le fichier temporaire le plus récent
+    du dossier. Les plus anciens sont supprimés.
+    """
+    builds = sorted(Path(folder).glob("articles_????????_??????_??????.db.tmp"), reverse=True)
+    for build in builds[1:]:
+        logger.info(f"Construction interrompue abandonnée : {build}")
+        build.unlink()
+        images_path(build).unlink(missing_ok=True)
+    return builds[0] if builds else None
+
+
+def _connect(db_path):
+    """Connexion à une base, avec son fichier d'images attaché s'il existe"""
+    connection = sqlite3.connect(db_path)
+    images = images_path(db_path)
+    if images.exists():
+        connection.execute("ATTACH DATABASE ? AS images", (str(images),))
+    return connection
+
+
+def count_rows(db_path, tables) -> dict[str, int]:
+    connection = _connect(db_path)
+    try:
+        return {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+    finally:
+        connection.close()
+
+
+def validate_database(db_path, expected_counts: dict[str, int]) -> dict[str, int]:
+    """
+    Vérifie l'intégrité de la base construite (et de son fichier d'images)
+    et le nombre de lignes de chaque table.
+
+    Raises:
+        PublicationError: si l'intégrité SQLite n'est pas correcte, si la table
+        article est vide ou si un nombre de lignes diffère de celui attendu
+    """
+    connection = _connect(db_path)
+    try:
+        # Sans nom de schéma, le contrôle porte sur toutes les bases attachées
+        integrity = connection.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        connection.close()
+    if integrity != "ok":
+        raise PublicationError(f"Contrôle d'intégrité en échec pour {db_path} : {integrity}")
+
+    counts = count_rows(db_path, expected_counts)
+    if counts.get("article", 0) == 0:
+        raise PublicationError(f"La table article de {db_path} est vide")
+    differences = {
+        table: (counts[table], expected)
+        for table, expected in expected_counts.items()
+        if counts[table] != expected
+    }
+    if differences:
+        raise PublicationError(f"Nombre de lignes inattendu (obtenu, attendu) : {differences}")
+    return counts
+
+
+def block_hash(block: bytes) -> str:
+    return hashlib.blake2b(block, digest_size=16).hexdigest()
+
+
+def block_hashes(path, block_size: int) -> list[str]:
+    """Empreintes des blocs successifs d'un fichier"""
+    hashes = []
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            hashes.append(block_hash(block))
+    return hashes
+
+
+def _write_atomically(path: Path, content: str):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def publish(build_path, folder, version: str, counts: dict[str, int]) -> Path:
+    """
+    Publie atomiquement une base construite et validée :
+    le fichier temporaire devient articles_<version>.db (et son fichier
+    d'images images_<version>.db), puis le manifeste est remplacé en une
+    opération. Le manifeste porte les empreintes par bloc des fichiers
+    publiés. Les clients passent à la nouvelle version à leur prochaine
+    requête ; les anciennes versions au-delà de VERSIONS_KEPT sont supprimées.
+    """
+    folder = Path(folder)
+    snapshot_path = folder / snapshot_name(version)
+    build_images_path = images_path(build_path)
+    has_images = build_images_path.exists()
+    if has_images:
+        # Le fichier d'images est en place avant la base qui le référence
+        os.replace(build_images_path, images_path(snapshot_path))
+    os.replace(build_path, snapshot_path)
+
+    manifest = {
+        "version": version,
+        "fichier": snapshot_path.name,
+        "immutable": True,
+        "publie_le": datetime.now().isoformat(timespec="seconds"),
+        "taille": snapshot_path.stat().st_size,
+        "comptes": counts,
+    }
+    if has_images:
+        manifest["images"] = images_path(snapshot_path).name
+        manifest["taille_images"] = images_path(snapshot_path).stat().st_size
+    # Empreintes par bloc : une réplique locale ne relit sur le partage que les blocs modifiés
+    manifest["taille_bloc"] = BLOCK_SIZE
+    manifest["blocs"] = {
+        path.name: block_hashes(path, BLOCK_SIZE)
+        for path in [snapshot_path] + ([images_path(snapshot_path)] if has_images else [])
+    }
+    _write_atomically(folder / MANIFEST_NAME, json.dumps(manifest, indent=2, ensure_ascii=False))
+    logger.info(f"Version {version} publiée : {snapshot_path}")
+
+    _remove_old_snapshots(folder, keep=VERSIONS_KEPT)
+    return snapshot_path
+
+
+def _remove_old_snapshots(folder: Path, keep: int):
+    snapshots = sorted(folder.glob("articles_????????_??????_??????.db"), reverse=True)
+    # Fichiers d'images des versions supprimées, y compris lors d'une publication précédente
+    kept_images = {images_path(snapshot) for snapshot in snapshots[:keep]}
+    old_images = [path for path in folder.glob("images_????????_??????_??????.db") if path not in kept_images]
+    for snapshot in snapshots[keep:] + old_images:
+        try:
+            snapshot.unlink()
+            logger.info(f"Ancienne version supprimée : {snapshot}")
+        except OSError as e:
+            # Fichier encore ouvert par un client : il sera supprimé à la prochaine publication
+            logger.warning(f"Impossible de supprimer {snapshot} : {str(e)}")
+
+
+def copy_snapshot(source, destination):
+    """Copie cohérente d'une base SQLite (API de sauvegarde), même si des lecteurs y sont connectés"""
+    source_connection = sqlite3.connect(read_only_uri(source), uri=True)
+    destination_connection = sqlite3.connect(destination)
+    try:
+        source_connection.backup(destination_connection)
+    finally:
+        destination_connection.close()
+        source_connection.close()
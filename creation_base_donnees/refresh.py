@@ -0,0 +1,136 @@
+import inspect
+import logging
+import polars as pl
+from sqlmodel import Session, select, insert, update, delete
+from creation_base_donnees.models import Article, ArticleManufacturer, Nomenclature, NomenclatureLevel, NomenclatureClosure
+from creation_base_donnees.schemas import ARTICLE_SCHEMA, MANUFACTURER_SCHEMA, NOMENCLATURE_SCHEMA, NOMENCLATURE_LEVEL_SCHEMA
+
+
+logger = logging.getLogger(__name__)
+
+# Taille des lots de suppression (limite du nombre de paramètres SQLite)
+_DELETE_CHUNK_SIZE = 500
+
+# Jointure où deux clés vides sont égales (join_nulls renommé nulls_equal dans polars 1.30)
+_NULLS_EQUAL = (
+    {"nulls_equal": True} if "nulls_equal" in inspect.signature(pl.DataFrame.join).parameters else {"join_nulls": True}
+)
+
+
+def _with_occurrence(df: pl.DataFrame, key: list[str]) -> pl.DataFrame:
+    """Ajoute à df _occurrence, rang de la ligne parmi celles de même clé, pour apparier les doublons un à un"""
+    return df.with_columns(pl.int_range(pl.len()).over(key).alias("_occurrence"))
+
+
+def diff_tables(current: pl.DataFrame, target: pl.DataFrame, key: list[str], schema: dict) -> dict[str, pl.DataFrame]:
+    """
+    Compare le contenu actuel d'une table au contenu cible. Les lignes sont
+    appariées sur les colonnes de la clé (une clé vide de part et d'autre est
+    une même clé) et leur rang parmi les doublons, puis leur contenu est
+    comparé colonne par colonne.
+
+    Returns:
+        dict: "inserts" (lignes cibles absentes), "updates" (lignes cibles dont
+        le contenu diffère, avec les colonnes de current qui ne sont pas dans le
+        schéma, comme l'identifiant) et "deletes" (lignes actuelles disparues)
+    """
+    columns = list(schema)
+    current = _with_occurrence(current.cast({name: dtype for name, dtype in schema.items() if name in current.columns}), key)
+    target = _with_occurrence(target.select(columns), key)
+    join_key = key + ["_occurrence"]
+    extra_columns = [column for column in current.columns if column not in schema and not column.startswith("_")]
+    value_columns = [column for column in columns if column not in key]
+
+    inserts = target.join(current.select(join_key), on=join_key, how="anti", **_NULLS_EQUAL)
+    deletes = current.join(target.select(join_key), on=join_key, how="anti", **_NULLS_EQUAL)
+    updates = (
+        target.join(current.select(join_key + extra_columns + [pl.col(column).alias(f"_{column}_actuel") for column in value_columns]),
+                    on=join_key, how="inner", **_NULLS_EQUAL)
+        .filter(pl.any_horizontal(
+            [pl.col(column).ne_missing(pl.col(f"_{column}_actuel")) for column in value_columns] or [pl.lit(False)]
+        ))
+    )
+    return {
+        "inserts": inserts.select(columns),
+        "updates": updates.select(columns + extra_columns),
+        "deletes": deletes.select(columns + extra_columns),
+    }
+
+
+def _read_table(session: Session, model, schema: dict) -> pl.DataFrame:
+    table = model.__table__
+    # Types déduits de toutes les lignes : une colonne nulle sur les premières lignes reste typée
+    df = pl.read_database(select(table), session.connection(), infer_schema_length=None)
+    if df.width == 0:
+        df = pl.DataFrame(schema=[(column.name, pl.Null) for column in table.columns])
+    return df.cast({name: dtype for name, dtype in schema.items() if name in df.columns})
+
+
+def _fill_column_defaults(model, df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Remplace les valeurs nulles par la valeur par défaut de la colonne, comme
+    le fait l'insertion en masse : sans cela, ces lignes apparaîtraient
+    modifiées à chaque rafraîchissement.
+    """
+    defaults = {
+        column.name: column.default.arg
+        for column in model.__table__.columns
+        if column.name in df.columns and column.default is not None and column.default.is_scalar
+    }
+    return df.with_columns([pl.col(name).fill_null(value) for name, value in defaults.items()])
+
+
+def _apply_diff(session: Session, model, primary_key: str, diff: dict[str, pl.DataFrame]) -> dict[str, int]:
+    table = model.__table__
+    deleted_keys = diff["deletes"][primary_key].to_list()
+    for start in range(0, len(deleted_keys), _DELETE_CHUNK_SIZE):
+        chunk = deleted_keys[start:start + _DELETE_CHUNK_SIZE]
+        session.execute(delete(table).where(table.c[primary_key].in_(chunk)))
+    if diff["updates"].height > 0:
+        # Mise à jour en masse par clé primaire
+        session.execute(update(model), diff["updates"].to_dicts())
+    if diff["inserts"].height > 0:
+        session.execute(insert(model), diff["inserts"].to_dicts())
+    return {name: df.height for name, df in diff.items()}
+
+
+def refresh_database(engine, items_df: pl.DataFrame, manufacturer_df: pl.DataFrame, nomenclature_df: pl.DataFrame,
+                     level_df: pl.DataFrame | None = None, closure_df: pl.DataFrame | None = None) -> dict[str, dict[str, int]]:
+    """
+    Rafraîchit une base existante à partir des DataFrames issus des exports 521/531 :
+    seules les lignes ajoutées, modifiées ou supprimées des tables article,
+    articlemanufacturer et nomenclature (et nomenclaturelevel si level_df est
+    fourni) sont écrites. La fermeture des nomenclatures (closure_df), table
+    dérivée et volumineuse, est remplacée entièrement.
+
+    Le contenu de chaque ligne est comparé sur toutes les colonnes
+    (date_derniere_modif_article comprise), ce qui détecte aussi les
+    modifications de la feuille TRANSPORT qui ne changent pas cette date.
+
+    Returns:
+        dict: pour chaque table, le nombre d'insertions, de mises à jour et de suppressions
+    """
+    tables = [
+        (Article, "code_article", ["code_article"], ARTICLE_SCHEMA, items_df),
+        (ArticleManufacturer, "id", list(MANUFACTURER_SCHEMA), MANUFACTURER_SCHEMA, manufacturer_df),
+        (Nomenclature, "id", ["code_article_parent", "code_article_fils"], NOMENCLATURE_SCHEMA, nomenclature_df),
+    ]
+    if level_df is not None:
+        tables.append((NomenclatureLevel, "code_article", ["code_article"], NOMENCLATURE_LEVEL_SCHEMA, level_df))
+    counts = {}
+    with Session(engine) as session:
+        for model, primary_key, key, schema, target in tables:
+            current = _read_table(session, model, schema)
+            diff = diff_tables(current, _fill_column_defaults(model, target), key, schema)
+            counts[model.__tablename__] = _apply_diff(session, model, primary_key, diff)
+            logger.info(
+                f"Table {model.__tablename__} : {diff['inserts'].height} insertions, "
+                f"{diff['updates'].height} mises à jour, {diff['deletes'].height} suppressions"
+            )
+        if closure_df is not None:
+            deleted = session.execute(delete(NomenclatureClosure)).rowcount
+            if closure_df.height > 0:
+                session.execute(insert(NomenclatureClosure), closure_df.to_dicts())
+            counts[NomenclatureClosure.__tablename__] = {"inserts": closure_df.height, "updates": 0, "deletes": deleted}
+        session.commit()
+    return counts
@@ -0,0 +1,163 @@
+import polars as pl
+from typing import NamedTuple
+
+
+class ColumnSpec(NamedTuple):
+    """
+    Colonne à lire dans une feuille Excel :
+    - name : nom normalisé (transform_string de l'en-tête)
+    - dtype : type Polars de la colonne après lecture
+    - source : en-tête exact dans le classeur ; si None, la colonne est
+      retrouvée par son en-tête normalisé
+    """
+    name: str
+    dtype: pl.DataType
+    source: str | None = None
+
+
+# Schéma cible de la table article : nom de colonne -> type Polars.
+# L'ordre des colonnes est celui du modèle Article.
+ARTICLE_SCHEMA = {
+    "code_article": pl.String,
+    "proprietaire_article": pl.String,
+    "type_article": pl.String,
+    "libelle_court_article": pl.String,
+    "libelle_long_article": pl.String,
+    "description_famille_d_achat": pl.String,
+    "commentaire_technique": pl.String,
+    "commentaire_logistique": pl.String,
+    "statut_abrege_article": pl.String,
+    "cycle_de_vie_achat": pl.String,
+    "cycle_de_vie_de_production_pim": pl.String,
+    "feuille_du_catalogue": pl.String,
+    "description_de_la_feuille_du_catalogue": pl.String,
+    "famille_d_achat_feuille_du_catalogue": pl.String,
+    "catalogue_consommable": pl.String,
+    "criticite_pim": pl.String,
+    "famille_immobilisation": pl.String,
+    "categorie_immobilisation": pl.String,
+    "categorie_inv_accounting": pl.String,
+    "suivi_par_num_serie_oui_non": pl.Boolean,
+    "stocksecu_inv_oui_non": pl.Boolean,
+    "article_hors_normes": pl.Boolean,
+    "peremption": pl.Boolean,
+    "retour_production": pl.Boolean,
+    "is_oc": pl.Boolean,
+    "is_ol": pl.Boolean,
+    "a_retrofiter": pl.Boolean,
+    "affretement": pl.Boolean,
+    "fragile": pl.Boolean,
+    "poids_article": pl.Float64,
+    "volume_article": pl.Float64,
+    "hauteur_article": pl.Float64,
+    "longueur_article": pl.Float64,
+    "largeur_article": pl.Float64,
+    "matiere_dangereuse": pl.Boolean,
+    "md_code_onu": pl.String,
+    "md_groupe_emballage": pl.String,
+    "md_type_colis": pl.String,
+    "prix_achat_prev": pl.Float64,
+    "pump": pl.Float64,
+    "prix_eur_catalogue_article": pl.Float64,
+    "compte_cg_achat": pl.String,
+    "delai_approvisionnement": pl.Int64,
+    "delai_de_reparation_contractuel": pl.Int64,
+    "point_de_commande": pl.Int64,
+    "quantite_a_commander": pl.Int64,
+    "qte_cde_minimum_point_de_reappro": pl.Int64,
+    "qte_minimum_ordre_de_commande": pl.Int64,
+    "qte_maximum_ordre_de_commande": pl.Int64,
+    "qte_min_de_l_article": pl.Int64,
+    "qte_max_de_l_article": pl.Int64,
+    "qte_cde_maximum_quantite_d_ordre_de_commande": pl.Int64,
+    "lieu_de_reparation_pim": pl.String,
+    "description_lieu_de_reparation": pl.String,
+    "rma": pl.String,
+    "role_responsable_et_equipement": pl.String,
+    "mnemonique": pl.String,
+    "date_creation_article": pl.Datetime("us"),
+    "nom_createur_article": pl.String,
+    "date_derniere_modif_article": pl.Datetime("us"),
+    "auteur_derniere_modif_article": pl.String,
+}
+
+# Colonnes booléennes renseignées "OUI"/"NON" dans le référentiel
+OUI_NON_COLUMNS = [
+    "suivi_par_num_serie_oui_non",
+    "stocksecu_inv_oui_non",
+    "article_hors_normes",
+    "peremption",
+    "retour_production",
+    "a_retrofiter",
+    "affretement",
+    "fragile",
+    "matiere_dangereuse",
+]
+
+# Colonnes booléennes calculées depuis la feuille du catalogue
+CATALOGUE_FLAG_COLUMNS = {
+    "is_oc": "EMI.AM.OC",
+    "is_ol": "EMI.AM.OL",
+}
+
+MANUFACTURER_SCHEMA = {
+    "code_article": pl.String,
+    "nom_fabricant": pl.String,
+    "reference_article_fabricant": pl.String,
+}
+
+NOMENCLATURE_SCHEMA = {
+    "code_article_parent": pl.String,
+    "code_article_fils": pl.String,
+    "quantite": pl.Float64,
+}
+
+NOMENCLATURE_LEVEL_SCHEMA = {
+    "code_article": pl.String,
+    "niveau": pl.Int64,
+    "hauteur": pl.Int64,
+    "nb_descendants": pl.Int64,
+    "cycle": pl.Int64,
+    "fermeture_materialisee": pl.Boolean,
+}
+
+NOMENCLATURE_CLOSURE_SCHEMA = {
+    "ancestor": pl.String,
+    "descendant": pl.String,
+    "min_depth": pl.Int64,
+    "cumulative_quantity": pl.Float64,
+    "path_count": pl.Int64,
+}
+
+# Colonnes des feuilles 521 renommées vers la table article
+RENAMED_COLUMNS = {
+    "proprietaire_article_champs_calcule": "proprietaire_article",
+    "pump_champs_calcule": "pump",
+}
+
+
+def _sheet_dtype(name: str, dtype: pl.DataType) -> pl.DataType:
+    # Les colonnes OUI/NON sont lues en texte puis converties par Items
+    return pl.String if name in OUI_NON_COLUMNS else dtype
+
+
+# Colonnes lues dans les feuilles "ARTICLES PIM" et "ARTICLES PIM - TRANSPORT" :
+# celles de la table article (sous leur nom dans le fichier) et celles des fabricants.
+# Une colonne absente d'une feuille est simplement ignorée.
+_SOURCE_NAMES = {target: source for source, target in RENAMED_COLUMNS.items()}
+ARTICLE_SHEET_COLUMNS = [
+    ColumnSpec(_SOURCE_NAMES.get(name, name), _sheet_dtype(name, dtype))
+    for name, dtype in ARTICLE_SCHEMA.items()
+    if name not in CATALOGUE_FLAG_COLUMNS
+] + [
+    ColumnSpec(name, dtype)
+    for name, dtype in MANUFACTURER_SCHEMA.items()
+    if name != "code_article"
+]
+
+# Colonnes lues dans la feuille "Nomenclature Fils"
+NOMENCLATURE_SHEET_COLUMNS = [
+    ColumnSpec("article", pl.String),
+    ColumnSpec("article_eqpt_article_fils", pl.String),
+    ColumnSpec("art_et_art_fils_eqpt_quantite", pl.Float64),
+]
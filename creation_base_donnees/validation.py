@@ -0,0 +1,136 @@
+import json
+import logging
+import polars as pl
+
+
+logger = logging.getLogger(__name__)
+
+# Politiques d'intégrité référentielle :
+# - keep : les anomalies sont signalées mais conservées
+# - drop : les références orphelines et les boucles sont écartées, seule la
+#   première occurrence d'un couple parent/fils en doublon est conservée
+# - aggregate : comme drop, mais les couples en doublon sont fusionnés en une
+#   ligne dont la quantité est la somme des quantités
+INTEGRITY_POLICIES = ("keep", "drop", "aggregate")
+
+_NOMENCLATURE_KEY = ["code_article_parent", "code_article_fils"]
+
+
+class IntegrityReport():
+    """
+    Anomalies de références trouvées avant le chargement : une table Polars
+    par type d'anomalie et le nombre de lignes écartées par table.
+    """
+
+    def __init__(self, policy: str, anomalies: dict[str, pl.DataFrame], removed: dict[str, int]):
+        self.policy = policy
+        self.anomalies = anomalies
+        self.removed = removed
+
+    def counts(self) -> dict[str, int]:
+        return {name: df.height for name, df in self.anomalies.items()}
+
+    def to_dict(self) -> dict:
+        return {
+            "politique": self.policy,
+            "anomalies": self.counts(),
+            "lignes_ecartees": self.removed,
+            "details": {name: df.to_dicts() for name, df in self.anomalies.items()},
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def format(self, max_rows: int = 10) -> str:
+        """Résumé lisible : nombre d'anomalies par type et premiers exemples"""
+        lines = [f"Politique d'intégrité : {self.policy}, lignes écartées : {self.removed}"]
+        for name, df in self.anomalies.items():
+            lines.append(f"{name} : {df.height}")
+            for row in df.head(max_rows).iter_rows():
+                lines.append(f"    {' | '.join(str(value) for value in row)}")
+        return "\n".join(lines)
+
+
+def _anomaly_plans(articles: pl.LazyFrame, manufacturers: pl.LazyFrame | None,
+                   nomenclatures: pl.LazyFrame | None) -> dict[str, pl.LazyFrame]:
+    plans = {}
+    if manufacturers is not None:
+        plans["fabricants_orphelins"] = manufacturers.join(articles, on="code_article", how="anti")
+    if nomenclatures is not None:
+        plans["parents_orphelins"] = nomenclatures.join(
+            articles, left_on="code_article_parent", right_on="code_article", how="anti"
+        )
+        plans["fils_orphelins"] = nomenclatures.join(
+            articles, left_on="code_article_fils", right_on="code_article", how="anti"
+        )
+        plans["doublons_nomenclature"] = (
+            nomenclatures.group_by(_NOMENCLATURE_KEY, maintain_order=True)
+            .agg(pl.len().alias("occurrences"), pl.col("quantite").sum().alias("quantite_totale"))
+            .filter(pl.col("occurrences") > 1)
+        )
+        plans["boucles_nomenclature"] = nomenclatures.filter(
+            pl.col("code_article_parent") == pl.col("code_article_fils")
+        )
+    return plans
+
+
+def _clean_nomenclatures(articles: pl.LazyFrame, nomenclatures: pl.LazyFrame, policy: str) -> pl.LazyFrame:
+    plan = (
+        nomenclatures
+        .join(articles, left_on="code_article_parent", right_on="code_article", how="semi")
+        .join(articles, left_on="code_article_fils", right_on="code_article", how="semi")
+        .filter(pl.col("code_article_parent") != pl.col("code_article_fils"))
+    )
+    if policy == "drop":
+        return plan.unique(subset=_NOMENCLATURE_KEY, keep="first", maintain_order=True)
+    return plan.group_by(_NOMENCLATURE_KEY, maintain_order=True).agg(pl.col("quantite").sum())
+
+
+def validate_references(article_codes: pl.DataFrame, manufacturer_df: pl.DataFrame | None = None,
+                        nomenclature_df: pl.DataFrame | None = None, policy: str = "aggregate"
+                        ) -> tuple[pl.DataFrame | None, pl.DataFrame | None, IntegrityReport]:
+    """
+    Contrôle les références des tables articlemanufacturer et nomenclature vers
+    la table article avant leur chargement, en une seule passe Polars
+    (anti-jointures, regroupement des doublons), et applique la politique.
+
+    Args:
+        article_codes: DataFrame avec une colonne code_article
+        manufacturer_df, nomenclature_df: tables à contrôler, None pour ne pas les contrôler
+        policy: keep, drop ou aggregate (voir INTEGRITY_POLICIES)
+
+    Returns:
+        tuple: (fabricants, nomenclatures, rapport), les tables après application de la politique
+    """
+    if policy not in INTEGRITY_POLICIES:
+        raise ValueError(f"Politique d'intégrité inconnue : {policy} (attendu : {', '.join(INTEGRITY_POLICIES)})")
+    articles = article_codes.lazy().select("code_article").unique()
+    manufacturers = manufacturer_df.lazy() if manufacturer_df is not None else None
+    nomenclatures = nomenclature_df.lazy() if nomenclature_df is not None else None
+
+    plans = _anomaly_plans(articles, manufacturers, nomenclatures)
+    cleaned_plans = {}
+    if policy != "keep":
+        if manufacturers is not None:
+            cleaned_plans["articlemanufacturer"] = manufacturers.join(articles, on="code_article", how="semi")
+        if nomenclatures is not None:
+            cleaned_plans["nomenclature"] = _clean_nomenclatures(articles, nomenclatures, policy)
+    results = pl.collect_all(list(plans.values()) + list(cleaned_plans.values()))
+    anomalies = dict(zip(plans, results[:len(plans)]))
+    cleaned = dict(zip(cleaned_plans, results[len(plans):]))
+
+    removed = {}
+    if manufacturer_df is not None:
+        cleaned_manufacturers = cleaned.get("articlemanufacturer", manufacturer_df)
+        removed["articlemanufacturer"] = manufacturer_df.height - cleaned_manufacturers.height
+        manufacturer_df = cleaned_manufacturers
+    if nomenclature_df is not None:
+        cleaned_nomenclatures = cleaned.get("nomenclature", nomenclature_df).select(nomenclature_df.columns)
+        removed["nomenclature"] = nomenclature_df.height - cleaned_nomenclatures.height
+        nomenclature_df = cleaned_nomenclatures
+    report = IntegrityReport(policy, anomalies, removed)
+    for name, count in report.counts().items():
+        if count:
+            logger.warning(f"Contrôle des références : {count} {name.replace('_', ' ')}")
+    return manufacturer_df, nomenclature_df, report
@@ -1,23 +1,28 @@
 """Utilitaires pour la base de données"""
-from sqlmodel import create_engine
-from pathlib import Path
+from PyQt6.QtCore import QObject, pyqtSignal
+from backend.api import snapshots
 
-def get_engine():
-    """Retourne le moteur de base de données"""
-    # Obtient le chemin absolu du projet
-    project_root = Path(__file__).parent.parent.parent.absolute()
-    
-    # Chemin absolu de la base de données
-    db_path = project_root / "database_sqlite" / "articles.db"
-    
-    # Crée l'URL de connexion
-    database_url = f"sqlite:///{db_path}"
-    
-    # Crée le moteur de base de données
-    engine = create_engine(
-        database_url,
-        echo=False,
-        connect_args={"check_same_thread": False}
-    )
-    
-    return engine
+def get_session():
+    """
+    Nouvelle session sur la base lue par l'application. Le moteur d'une version
+    remplacée n'est fermé qu'à la fermeture de ses dernières sessions : les
+    lectures de l'interface passent toujours par une session, jamais par le moteur.
+    """
+    return snapshots.session()
+
+
+class SnapshotNotifier(QObject):
+    """
+    Signale dans le thread de l'interface la bascule sur une nouvelle version
+    de la base, qu'elle ait été détectée par l'interface ou par un thread de
+    chargement des images. L'abonnement est retiré à la destruction du notifier.
+    """
+
+    snapshot_changed = pyqtSignal(str)  # URL de la nouvelle base
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        callback = self.snapshot_changed.emit
+        snapshots.add_listener(callback)
+        # Fonction indépendante de self : elle est encore appelable pendant la destruction
+        self.destroyed.connect(lambda: snapshots.remove_listener(callback))
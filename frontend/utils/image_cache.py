@@ -0,0 +1,161 @@
+"""Décodage des images hors du thread de l'interface et cache des pixmaps redimensionnés"""
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+from frontend.utils.logging_config import logger
+
+# Taille maximale du cache des pixmaps, en octets (4 octets par pixel)
+PIXMAP_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class PixmapCache:
+    """Cache LRU borné des pixmaps redimensionnés, par (clé de l'image, largeur, hauteur)"""
+
+    def __init__(self, max_bytes=PIXMAP_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # Incrémenté à chaque vidage : les décodages lancés avant ne sont pas mis en cache
+        self.generation = 0
+        self._pixmaps = OrderedDict()
+
+    @staticmethod
+    def _cost(pixmap):
+        return pixmap.width() * pixmap.height() * 4
+
+    def get(self, key):
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        if key in self._pixmaps:
+            self.size -= self._cost(self._pixmaps.pop(key))
+        self._pixmaps[key] = pixmap
+        self.size += self._cost(pixmap)
+        # Les pixmaps les moins récemment affichés sont libérés en premier
+        while self.size > self.max_bytes and len(self._pixmaps) > 1:
+            _, oldest = self._pixmaps.popitem(last=False)
+            self.size -= self._cost(oldest)
+
+    def clear(self):
+        self._pixmaps.clear()
+        self.size = 0
+        self.generation += 1
+
+    def __contains__(self, key):
+        return key in self._pixmaps
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+
+# Cache partagé par les panneaux d'images
+pixmap_cache = PixmapCache()
+
+
+class _DecodeSignals(QObject):
+    """Signaux des tâches de décodage, reçus dans le thread de l'interface"""
+    decoded = pyqtSignal(object, int, QImage)
+    failed = pyqtSignal(object, int)
+
+
+class DecodeTask(QRunnable):
+    """Lecture et décodage d'une image dans un thread du pool, redimensionnée
+    à la taille cible. Le QImage obtenu est converti en QPixmap dans le thread
+    de l'interface (un QPixmap ne peut pas être créé ailleurs)."""
+
+    def __init__(self, key, load, size, signals, generation=0):
+        super().__init__()
+        self.key = key
+        self.generation = generation
+        self.load = load
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        try:
+            data = self.load()
+            image = QImage()
+            if not data or not image.loadFromData(data):
+                logger.warning(f"Image {self.key[0]} illisible")
+                self.signals.failed.emit(self.key, self.generation)
+                return
+            if image.width() > self.size.width() or image.height() > self.size.height():
+                image = image.scaled(
+                    self.size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+                )
+            self.signals.decoded.emit(self.key, self.generation, image)
+        except Exception as e:
+            logger.error(f"Erreur lors du décodage de l'image {self.key[0]} : {str(e)}")
+            self.signals.failed.emit(self.key, self.generation)
+
+
+class ImageLoader(QObject):
+    """
+    Charge et décode les images dans un QThreadPool. Les pixmaps redimensionnés
+    sont conservés dans un cache borné : une image déjà affichée (ou préchargée)
+    l'est de nouveau sans lecture ni décodage.
+    """
+
+    image_ready = pyqtSignal(object, QPixmap)  # clé de l'image, pixmap redimensionné
+    image_failed = pyqtSignal(object)
+
+    def __init__(self, cache=None, pool=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache if cache is not None else pixmap_cache
+        self.pool = pool or QThreadPool.globalInstance()
+        self._pending = {}
+        self._signals = _DecodeSignals(self)
+        self._signals.decoded.connect(self._on_decoded)
+        self._signals.failed.connect(self._on_failed)
+
+    def request(self, image_key, load, size, priority=0):
+        """
+        Pixmap de l'image à la taille cible s'il est en cache ; sinon None, et
+        son chargement est lancé (image_ready est émis à la fin).
+
+        Args:
+            image_key: identifiant de l'image (clé du cache)
+            load: fonction renvoyant les octets de l'image, appelée dans le pool
+            size (QSize): taille maximale du pixmap
+            priority (int): priorité de la tâche (image affichée avant préchargement)
+        """
+        key = (image_key, size.width(), size.height())
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            return pixmap
+        pending = self._pending.get(key)
+        if pending is None or pending.generation != self.cache.generation:
+            task = DecodeTask(key, load, size, self._signals, self.cache.generation)
+            # La tâche reste à la charge du chargeur pour pouvoir être annulée
+            task.setAutoDelete(False)
+            self._pending[key] = task
+            self.pool.start(task, priority)
+        return None
+
+    def cancel_pending(self):
+        """Annule les chargements pas encore commencés (images d'un article qui n'est plus affiché)"""
+        for key, task in list(self._pending.items()):
+            if self.pool.tryTake(task):
+                del self._pending[key]
+
+    def _finished(self, key, generation) -> bool:
+        """Retire la tâche terminée ; False si elle a été lancée avant le dernier vidage du cache"""
+        task = self._pending.get(key)
+        if task is not None and task.generation == generation:
+            del self._pending[key]
+        return generation == self.cache.generation
+
+    def _on_decoded(self, key, generation, image):
+        if not self._finished(key, generation):
+            # Image lue dans une version de la base remplacée depuis
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.cache.put(key, pixmap)
+        self.image_ready.emit(key[0], pixmap)
+
+    def _on_failed(self, key, generation):
+        if not self._finished(key, generation):
+            return
+        self.image_failed.emit(key[0])
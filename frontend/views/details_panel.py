@@ -1,25 +1,45 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QScrollArea,
     QTableWidget, QTableWidgetItem, QHeaderView,
-    QSplitter, QTabWidget, QTextBrowser, QGroupBox, QPushButton, QHBoxLayout
+    QSplitter, QTabWidget, QTextBrowser, QGroupBox, QPushButton, QHBoxLayout,
+    QListWidget, QListWidgetItem, QListView
 )
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtGui import QPixmap, QIcon
 import io
-from sqlmodel import Session, select
+from collections import OrderedDict
+from sqlmodel import select, or_
 from frontend.views.image_panel import ImagePanel
-from creation_base_donnees.models import Article, Image
-from frontend.utils.database import get_engine
+from backend.api import get_session, get_image_data, get_image_thumbnails, get_manufacturers_by_article
+from frontend.utils.image_cache import ImageLoader
+from creation_base_donnees.models import Article, Image, Nomenclature
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Nombre d'articles dont les onglets déjà chargés sont gardés en mémoire
+ARTICLES_CACHED = 20
+
+# Taille maximale de l'image affichée et des icônes du bandeau de miniatures
+DISPLAY_SIZE = QSize(800, 600)
+ICON_SIZE = QSize(96, 96)
+
+
 class ImagePanel(QWidget):
+    """Images d'un article : les miniatures sont affichées d'emblée, l'image en
+    taille réelle n'est lue qu'à son affichage, onglet Images visible. Lecture
+    et décodage se font hors du thread de l'interface (ImageLoader) ; les
+    images voisines de l'image affichée sont préchargées."""
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setup_ui()
         self.current_image_index = 0
         self.images = []
+        self.rows = {}
+        self.loader = ImageLoader(parent=self)
+        self.loader.image_ready.connect(self.on_image_ready)
+        self.loader.image_failed.connect(self.on_image_failed)
         
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -29,6 +49,16 @@ class ImagePanel(QWidget):
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(self.image_label)
         
+        # Bandeau des miniatures
+        self.thumbnail_list = QListWidget()
+        self.thumbnail_list.setViewMode(QListView.ViewMode.IconMode)
+        self.thumbnail_list.setFlow(QListView.Flow.LeftToRight)
+        self.thumbnail_list.setWrapping(False)
+        self.thumbnail_list.setIconSize(ICON_SIZE)
+        self.thumbnail_list.setFixedHeight(120)
+        self.thumbnail_list.currentRowChanged.connect(self.show_image)
+        layout.addWidget(self.thumbnail_list)
+        
         # Boutons de navigation
         nav_layout = QHBoxLayout()
         
@@ -49,6 +79,16 @@ class ImagePanel(QWidget):
         
         layout.addLayout(nav_layout)
         
+    def showEvent(self, event):
+        """L'image courante est chargée quand l'onglet Images devient visible"""
+        super().showEvent(event)
+        self.display_current_image()
+
+    def show_image(self, index):
+        if 0 <= index < len(self.images) and index != self.current_image_index:
+            self.current_image_index = index
+            self.display_current_image()
+
     def show_previous_image(self):
         if self.current_image_index > 0:
             self.current_image_index -= 1
@@ -58,6 +98,11 @@ class ImagePanel(QWidget):
         if self.current_image_index < len(self.images) - 1:
             self.current_image_index += 1
             self.display_current_image()
+
+    def request_image(self, index, priority=0):
+        """Pixmap de l'image à afficher s'il est en cache, sinon lance sa lecture"""
+        image_id, _ = self.images[index]
+        return self.loader.request(image_id, lambda: get_image_data(image_id), DISPLAY_SIZE, priority)
             
     def display_current_image(self):
         if not self.images:
@@ -74,30 +119,70 @@ class ImagePanel(QWidget):
         # Mettre à jour les boutons
         self.prev_button.setEnabled(self.current_image_index > 0)
         self.next_button.setEnabled(self.current_image_index < len(self.images) - 1)
+        self.thumbnail_list.setCurrentRow(self.current_image_index)
         
-        # Afficher l'image courante
-        image_data = self.images[self.current_image_index]
-        pixmap = QPixmap()
-        pixmap.loadFromData(image_data)
-        
-        # Redimensionner l'image si elle est trop grande
-        if pixmap.width() > 800 or pixmap.height() > 600:
-            pixmap = pixmap.scaled(800, 600, Qt.AspectRatioMode.KeepAspectRatio)
-            
-        self.image_label.setPixmap(pixmap)
+        # L'image en taille réelle n'est lue que si elle est effectivement affichée
+        if not self.isVisible():
+            return
+        pixmap = self.request_image(self.current_image_index, priority=1)
+        if pixmap is not None:
+            self.image_label.setPixmap(pixmap)
+        else:
+            # En attendant l'image, la miniature agrandie sert d'aperçu
+            icon = self.thumbnail_list.item(self.current_image_index).icon()
+            self.image_label.setPixmap(icon.pixmap(ICON_SIZE).scaled(
+                DISPLAY_SIZE, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation
+            ))
+
+        # Préchargement des images voisines, pour une navigation sans attente
+        for index in (self.current_image_index + 1, self.current_image_index - 1):
+            if 0 <= index < len(self.images):
+                self.request_image(index)
+
+    def on_image_ready(self, image_key, pixmap):
+        """Affiche une image décodée si c'est l'image courante, ou sa miniature"""
+        if isinstance(image_key, tuple):
+            row = self.rows.get(image_key[1])
+            if row is not None:
+                self.thumbnail_list.item(row).setIcon(QIcon(pixmap))
+        elif self.images and self.isVisible() and self.images[self.current_image_index][0] == image_key:
+            self.image_label.setPixmap(pixmap)
+
+    def on_image_failed(self, image_key):
+        if not isinstance(image_key, tuple) and self.images and self.images[self.current_image_index][0] == image_key:
+            self.image_label.setText("Image indisponible")
+            self.image_label.setPixmap(QPixmap())
         
-    def update_images(self, image_data_list):
-        self.images = image_data_list or []
+    def update_images(self, thumbnails):
+        """Affiche les miniatures (identifiant, miniature) des images d'un article"""
+        # Les images de l'article précédent pas encore chargées ne le sont plus
+        self.loader.cancel_pending()
+        self.images = list(thumbnails or [])
+        self.rows = {image_id: row for row, (image_id, _) in enumerate(self.images)}
         self.current_image_index = 0 if self.images else -1
+        self.thumbnail_list.blockSignals(True)
+        self.thumbnail_list.clear()
+        for image_id, miniature in self.images:
+            # Les miniatures sont décodées dans le pool et affichées à mesure
+            item = QListWidgetItem(QIcon(), "")
+            self.thumbnail_list.addItem(item)
+            if miniature:
+                pixmap = self.loader.request(("miniature", image_id), lambda data=miniature: data, ICON_SIZE)
+                if pixmap is not None:
+                    item.setIcon(QIcon(pixmap))
+        self.thumbnail_list.blockSignals(False)
         self.display_current_image()
 
 class DetailsPanel(QWidget):
-    """Panel affichant les détails d'un article"""
+    """Panel affichant les détails d'un article. Chaque onglet n'est rempli
+    qu'à son affichage ; les données déjà lues sont gardées par article."""
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setup_ui()
         self.current_article_code = None
+        self.loaded_tabs = set()
+        self.article_cache = OrderedDict()
+        self.setup_ui()
         
     def setup_ui(self):
         """Configuration de l'interface utilisateur"""
@@ -107,6 +192,7 @@ class DetailsPanel(QWidget):
         # Onglets
         tabs = QTabWidget()
         layout.addWidget(tabs)
+        self.tabs = tabs
         
         # Onglet Informations générales
         info_tab = QWidget()
@@ -271,6 +357,97 @@ class DetailsPanel(QWidget):
         
         tabs.addTab(images_tab, "Images")
         
+        # Données de chaque onglet : (clé du cache, lecture, affichage).
+        # Les deux premiers onglets affichent la même ligne article.
+        article_data = ("article", self._load_article, self.update_article)
+        self.tab_data = [
+            article_data,
+            article_data,
+            ("fabricants", get_manufacturers_by_article, self.update_manufacturers),
+            ("nomenclatures", self._load_nomenclatures, self.update_nomenclatures),
+            ("images", get_image_thumbnails, self.update_images),
+        ]
+        tabs.currentChanged.connect(self.load_current_tab)
+
+    def show_article(self, code_article):
+        """
+        Affiche un article : seul l'onglet visible est rempli, les autres le
+        seront à leur ouverture. Les images de l'article précédent pas encore
+        chargées ne le sont plus.
+        """
+        self.current_article_code = code_article
+        self.loaded_tabs = set()
+        self.image_panel.loader.cancel_pending()
+        self.load_current_tab()
+
+    def invalidate(self):
+        """Nouvelle version de la base : les données gardées en mémoire sont relues"""
+        self.article_cache.clear()
+        self.loaded_tabs = set()
+        self.load_current_tab()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.load_current_tab()
+
+    def load_current_tab(self, index=None):
+        """Remplit l'onglet affiché s'il ne l'est pas déjà pour l'article courant"""
+        if self.current_article_code is None or not self.isVisible():
+            return
+        key, load, update = self.tab_data[self.tabs.currentIndex()]
+        if key in self.loaded_tabs:
+            return
+        
+        data = self.article_cache.setdefault(self.current_article_code, {})
+        self.article_cache.move_to_end(self.current_article_code)
+        while len(self.article_cache) > ARTICLES_CACHED:
+            self.article_cache.popitem(last=False)
+        
+        if key not in data:
+            try:
+                data[key] = load(self.current_article_code)
+            except Exception as e:
+                logger.error(f"Erreur lors du chargement de l'onglet {key} de {self.current_article_code} : {str(e)}")
+                return
+            logger.info(f"Onglet {key} chargé pour l'article {self.current_article_code}")
+        update(data[key])
+        self.loaded_tabs.add(key)
+
+    def _load_article(self, code_article):
+        with get_session() as session:
+            article = session.exec(select(Article).where(Article.code_article == code_article)).first()
+        if article is None:
+            logger.warning(f"Article {code_article} non trouvé dans la base")
+        return article
+
+    def _load_nomenclatures(self, code_article):
+        """Lignes du tableau des nomenclatures : (relation, article lié, quantité)"""
+        with get_session() as session:
+            # Nomenclatures où l'article est parent ou fils
+            nomenclatures = session.exec(
+                select(Nomenclature).where(
+                    or_(Nomenclature.code_article_parent == code_article, Nomenclature.code_article_fils == code_article)
+                )
+            ).all()
+            
+            # Récupérer tous les articles liés en une seule requête
+            article_codes = {n.code_article_parent for n in nomenclatures} | {n.code_article_fils for n in nomenclatures}
+            articles = {
+                article.code_article: article
+                for article in session.exec(select(Article).where(Article.code_article.in_(article_codes))).all()
+            }
+        
+        rows = []
+        for nomenclature in nomenclatures:
+            # Si l'article est parent, on affiche le fils
+            # Si l'article est fils, on affiche le parent
+            is_parent = nomenclature.code_article_parent == code_article
+            article = articles.get(nomenclature.code_article_fils if is_parent else nomenclature.code_article_parent)
+            if article:
+                relation = "Est composé de" if is_parent else "Entre dans la composition de"
+                rows.append((relation, article, nomenclature.quantite))
+        return rows
+        
     def update_article(self, article):
         """Met à jour les informations de l'article"""
         if not article:
@@ -329,76 +506,24 @@ class DetailsPanel(QWidget):
             self.manufacturers_table.setItem(row, 0, QTableWidgetItem(manufacturer.nom_fabricant or ''))
             self.manufacturers_table.setItem(row, 1, QTableWidgetItem(manufacturer.reference_article_fabricant or ''))
             
-    def update_nomenclatures(self, nomenclatures):
-        """Met à jour le tableau des nomenclatures"""
+    def update_nomenclatures(self, rows):
+        """Met à jour le tableau des nomenclatures à partir des lignes (relation, article, quantité)"""
         # Effacer le contenu actuel
         self.nomenclatures_table.setRowCount(0)
         
-        if not nomenclatures:
+        if not rows:
             return
             
-        # Configurer le tableau
-        self.nomenclatures_table.setRowCount(len(nomenclatures))
-        
-        try:
-            with Session(get_engine()) as session:
-                # Récupérer tous les codes articles (parents et fils)
-                article_codes = []
-                for n in nomenclatures:
-                    if n.code_article_parent not in article_codes:
-                        article_codes.append(n.code_article_parent)
-                    if n.code_article_fils not in article_codes:
-                        article_codes.append(n.code_article_fils)
-                
-                # Récupérer tous les articles en une seule requête
-                articles = {
-                    article.code_article: article 
-                    for article in session.exec(
-                        select(Article).where(Article.code_article.in_(article_codes))
-                    ).all()
-                }
-                
-                # Remplir le tableau avec les données
-                for row, nomenclature in enumerate(nomenclatures):
-                    # Si l'article est parent, on affiche le fils
-                    # Si l'article est fils, on affiche le parent
-                    article_code = nomenclature.code_article_fils
-                    is_parent = True
-                    
-                    if article_code == self.current_article_code:
-                        article_code = nomenclature.code_article_parent
-                        is_parent = False
-                    
-                    article = articles.get(article_code)
-                    if not article:
-                        continue
-                    
-
-                    # Ajouter une indication du type de relation
-                    relation = "Est composé de" if is_parent else "Entre dans la composition de"
-                    self.nomenclatures_table.setItem(row, 0, QTableWidgetItem(relation))
-                    # Remplir la ligne
-                    self.nomenclatures_table.setItem(row, 1, QTableWidgetItem(article.code_article))
-                    self.nomenclatures_table.setItem(row, 2, QTableWidgetItem(article.libelle_court_article))
-                    self.nomenclatures_table.setItem(row, 3, QTableWidgetItem(article.type_article or ''))
-                    self.nomenclatures_table.setItem(row, 4, QTableWidgetItem(f"{nomenclature.quantite:.1f}"))
-                    
-                    
-                    
-        except Exception as e:
-            logger.error(f"Erreur lors de la mise à jour des nomenclatures : {str(e)}")
-            
-    def update_images(self, images):
-        """Met à jour les images dans le panneau d'images"""
-        if not images:
-            self.image_panel.update_images([])
-            return
+        # Remplir le tableau avec les données
+        self.nomenclatures_table.setRowCount(len(rows))
+        for row, (relation, article, quantite) in enumerate(rows):
+            self.nomenclatures_table.setItem(row, 0, QTableWidgetItem(relation))
+            self.nomenclatures_table.setItem(row, 1, QTableWidgetItem(article.code_article))
+            self.nomenclatures_table.setItem(row, 2, QTableWidgetItem(article.libelle_court_article))
+            self.nomenclatures_table.setItem(row, 3, QTableWidgetItem(article.type_article or ''))
+            self.nomenclatures_table.setItem(row, 4, QTableWidgetItem(f"{quantite:.1f}"))
             
-        # Extraire les données binaires des images
-        image_data_list = []
-        for image in images:
-            if hasattr(image, 'image') and image.image:
-                image_data_list.append(image.image)
-                
-        # Mettre à jour le panneau d'images avec les données binaires
-        self.image_panel.update_images(image_data_list)
+    def update_images(self, thumbnails):
+        """Met à jour les images dans le panneau d'images à partir des
+        miniatures (identifiant, miniature) de l'article"""
+        self.image_panel.update_images(thumbnails or [])
@@ -1,18 +1,25 @@
+import hashlib
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QScrollArea,
     QSplitter
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QPixmap
-from sqlmodel import Session
-from frontend.utils.database import get_engine
+from frontend.utils.image_cache import ImageLoader
 from frontend.utils.logging_config import logger
 
+# Les images plus larges sont réduites à 800 px de large
+MAX_SIZE = QSize(800, 100000)
+
 class ImagePanel(QWidget):
     """Panel affichant les images d'un article"""
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.image_labels = {}
+        self.loader = ImageLoader(parent=self)
+        self.loader.image_ready.connect(self.on_image_ready)
+        self.loader.image_failed.connect(self.on_image_failed)
         self.setup_ui()
         
     def setup_ui(self):
@@ -44,13 +51,16 @@ class ImagePanel(QWidget):
                 child.widget().deleteLater()
                 
     def update_images(self, image_data_list):
-        """Met à jour les images affichées depuis la base de données
+        """Met à jour les images affichées depuis la base de données.
+        Chaque image est décodée dans le pool de threads (ImageLoader) et
+        affichée à mesure ; un emplacement lui est réservé d'ici là.
         
         Args:
             image_data_list: Liste des données binaires des images
         """
         # Nettoyer les images existantes
         self.clear_images()
+        self.image_labels = {}
                 
         if not image_data_list:
             # Afficher le message par défaut
@@ -61,35 +71,32 @@ class ImagePanel(QWidget):
             
         # Ajouter les nouvelles images
         for image_data in image_data_list:
-            try:
-                # Vérifier que les données ne sont pas vides
-                if not image_data:
-                    logger.warning(f"Données d'image vides")
-                    continue
-                    
-                # Créer un label pour l'image
-                image_label = QLabel()
-                pixmap = QPixmap()
-                
-                # Charger les données binaires dans le QPixmap
-                success = pixmap.loadFromData(image_data)
-                if not success:
-                    logger.error(f"Impossible de charger l'image")
-                    continue
-                    
-                # Redimensionner l'image si elle est trop grande
-                if pixmap.width() > 800:
-                    pixmap = pixmap.scaledToWidth(800, Qt.TransformationMode.SmoothTransformation)
-                    
-                image_label.setPixmap(pixmap)
-                image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                
-                self.image_layout.addWidget(image_label)
-                self.image_layout.addSpacing(10)  # Espace entre les images
-                
-            except Exception as e:
-                logger.error(f"Erreur lors de l'affichage de l'image : {str(e)}")
+            # Vérifier que les données ne sont pas vides
+            if not image_data:
+                logger.warning(f"Données d'image vides")
                 continue
                 
+            # Créer un label pour l'image, rempli une fois l'image décodée
+            image_label = QLabel("Chargement...")
+            image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.image_layout.addWidget(image_label)
+            self.image_layout.addSpacing(10)  # Espace entre les images
+            
+            # Les images n'ont pas d'identifiant ici : la clé du cache est leur empreinte
+            image_key = ("donnees", hashlib.sha1(image_data).hexdigest())
+            self.image_labels.setdefault(image_key, []).append(image_label)
+            pixmap = self.loader.request(image_key, lambda data=image_data: data, MAX_SIZE)
+            if pixmap is not None:
+                self.on_image_ready(image_key, pixmap)
+                
         # Ajouter un espaceur à la fin
         self.image_layout.addStretch()
+
+    def on_image_ready(self, image_key, pixmap):
+        for image_label in self.image_labels.pop(image_key, []):
+            image_label.setPixmap(pixmap)
+
+    def on_image_failed(self, image_key):
+        logger.error(f"Impossible de charger l'image")
+        for image_label in self.image_labels.pop(image_key, []):
+            image_label.setText("Image indisponible")
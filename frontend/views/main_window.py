@@ -1,7 +1,7 @@
 import os
 import sys
 from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QTabWidget, QSplitter, QMessageBox
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 
 # Ajout du chemin racine au PYTHONPATH
 root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,6 +13,9 @@ from backend.api import *
 from creation_base_donnees.models import Article, ArticleManufacturer, Nomenclature, Image
 from frontend.utils.logging_config import logger, setup_logging
 from frontend.utils.error_handlers import show_error_dialog
+from frontend.utils.database import SnapshotNotifier
+from frontend.utils.image_cache import pixmap_cache
+from backend.snapshots import MANIFEST_CHECK_INTERVAL
 from frontend.views.search_panel import SearchPanel
 from frontend.views.tree_panel import TreePanel
 from frontend.views.parent_tree_panel import ParentTreePanel
@@ -109,6 +112,21 @@ class MainWindow(QMainWindow):
         # Connecter les signaux
         self.search_panel.article_selected.connect(self.on_article_selected)
         self.tree_panel.article_selected.connect(self.on_article_selected)
+        
+        # Nouvelle version de la base : vérifiée régulièrement, même sans requête en cours
+        self.snapshot_notifier = SnapshotNotifier(self)
+        self.snapshot_notifier.snapshot_changed.connect(self.on_snapshot_changed)
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.timeout.connect(snapshots.check)
+        self.snapshot_timer.start(int(MANIFEST_CHECK_INTERVAL * 1000))
+
+    def on_snapshot_changed(self, url):
+        """Bascule sur une nouvelle version de la base : les données affichées sont relues"""
+        logger.info(f"Nouvelle version de la base, rechargement de l'affichage : {url}")
+        pixmap_cache.clear()
+        self.details_panel.invalidate()
+        self.tree_panel.invalidate()
+        self.statusBar().showMessage("Nouvelle version de la base chargée", 10000)
 
     def on_article_selected(self, code_article):
         """Gère la sélection d'un article"""
@@ -117,44 +135,7 @@ class MainWindow(QMainWindow):
             
         logger.info(f"Article sélectionné : {code_article}")
         
-        with get_session() as session:
-            # Récupérer l'article
-            article = session.exec(select(Article).where(Article.code_article == code_article)).first()
-            
-            if article:
-                logger.info(f"Article trouvé : {article.code_article} - {article.libelle_court_article}")
-                
-                # Récupérer les fabricants
-                fabricants = session.exec(select(ArticleManufacturer).where(ArticleManufacturer.code_article == code_article)).all()
-                logger.info(f"Nombre de fabricants trouvés : {len(fabricants)}")
-                
-                # Récupérer les nomenclatures où l'article est parent ou fils
-                nomenclatures_parent = session.exec(
-                    select(Nomenclature)
-                    .where(Nomenclature.code_article_parent == code_article)
-                ).all()
-                
-                nomenclatures_fils = session.exec(
-                    select(Nomenclature)
-                    .where(Nomenclature.code_article_fils == code_article)
-                ).all()
-                
-                nomenclatures = nomenclatures_parent + nomenclatures_fils
-                logger.info(f"Nombre de nomenclatures trouvées (parent: {len(nomenclatures_parent)}, fils: {len(nomenclatures_fils)})")
-                
-                # Récupérer les images
-                images = session.exec(select(Image).where(Image.code_article == code_article)).all()
-                logger.info(f"Nombre d'images trouvées : {len(images)}")
-                
-                # Mettre à jour les détails
-                logger.info("Mise à jour des détails...")
-                self.details_panel.update_article(article)
-                self.details_panel.update_manufacturers(fabricants)
-                self.details_panel.update_nomenclatures(nomenclatures)
-                self.details_panel.update_images(images)
-                logger.info("Détails mis à jour avec succès")
-                
-                # Mettre à jour l'arborescence
-                logger.info("Mise à jour de l'arborescence...")
-                self.tree_panel.show_article_tree(code_article)
-                logger.info("Arborescence mise à jour avec succès")
+        # Chaque onglet lit ses données à son affichage : celles des onglets
+        # jamais ouverts ne sont pas lues
+        self.details_panel.show_article(code_article)
+        self.tree_panel.set_article(code_article)
@@ -4,7 +4,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import pyqtSignal
 from sqlmodel import select
-from backend.api import get_session
+from backend.api import get_session, get_tree_height
 from creation_base_donnees.models import Article, Nomenclature
 from frontend.utils.logging_config import logger
 
@@ -15,6 +15,8 @@ class TreePanel(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.pending_article = None
+        self.shown_article = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -51,12 +53,34 @@ class TreePanel(QWidget):
             if code:
                 self.article_selected.emit(code)
                 
+    def set_article(self, code_article):
+        """Article dont l'arborescence est à afficher : elle n'est construite
+        que lorsque l'onglet est visible"""
+        self.pending_article = code_article
+        if self.isVisible():
+            self._show_pending_article()
+
+    def invalidate(self):
+        """Nouvelle version de la base : l'arborescence est reconstruite"""
+        self.shown_article = None
+        if self.isVisible():
+            self._show_pending_article()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._show_pending_article()
+
+    def _show_pending_article(self):
+        if self.pending_article and self.pending_article != self.shown_article:
+            self.show_article_tree(self.pending_article)
+                
     def show_article_tree(self, code_article=None):
         """Affiche l'arborescence d'un article"""
         if not code_article:
             return
             
         self.tree_widget.clear()
+        self.pending_article = self.shown_article = code_article
         
         try:
             with get_session() as session:
@@ -71,8 +95,11 @@ class TreePanel(QWidget):
                 root = QTreeWidgetItem(self.tree_widget)
                 root.setText(0, f"{article.code_article} | {article.libelle_court_article}")
                 
-                # Construire l'arbre récursivement
-                self._build_tree(session, root, article.code_article)
+                # Construire l'arbre récursivement, sur la hauteur calculée à la construction
+                # de la base (limitée à 10 niveaux si un cycle est atteint)
+                height = get_tree_height(article.code_article)
+                max_depth = height - 1 if height is not None else 10
+                self._build_tree(session, root, article.code_article, max_depth=max_depth)
                 
                 # Développer l'arbre
                 self.tree_widget.expandAll()
@@ -81,9 +108,9 @@ class TreePanel(QWidget):
             logger.error(f"Erreur lors de la construction de l'arbre : {str(e)}")
             QMessageBox.critical(self, "Erreur", "Une erreur est survenue lors de la construction de l'arborescence.")
             
-    def _build_tree(self, session, parent_item, code_article_parent, depth=0):
+    def _build_tree(self, session, parent_item, code_article_parent, depth=0, max_depth=10):
         """Construit récursivement l'arbre des articles"""
-        if depth > 10:  # Limite de profondeur pour éviter les boucles infinies
+        if depth > max_depth:  # Limite de profondeur pour éviter les boucles infinies
             return
             
         try:
@@ -100,7 +127,7 @@ class TreePanel(QWidget):
                 item.setText(0, f"{article.code_article} | {article.libelle_court_article} | {article.type_article or ''} | {nomenclature.quantite:.1f}")
                 
                 # Récursivement construire l'arbre pour cet article
-                self._build_tree(session, item, article.code_article, depth + 1)
+                self._build_tree(session, item, article.code_article, depth + 1, max_depth)
                 
         except Exception as e:
             logger.error(f"Erreur lors de la construction d'une branche : {str(e)}")
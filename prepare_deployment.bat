@@ -15,11 +15,13 @@ if not exist "deployment" mkdir deployment
 REM Copier l'exécutable
 copy "dist\consultation_article.exe" "deployment\"
 
-REM Copier la base de données
-copy "database_sqlite\articles.db" "deployment\"
+REM Copier le manifeste et les versions publiées de la base de données
+copy "database_sqlite\articles_manifest.json" "deployment\"
+copy "database_sqlite\articles_*.db" "deployment\"
+copy "database_sqlite\images_*.db" "deployment\"
 
-REM Créer le fichier de configuration avec le chemin relatif
-echo articles.db > "deployment\database_settings.txt"
+REM Créer le fichier de configuration avec le chemin relatif du manifeste
+echo articles_manifest.json > "deployment\database_settings.txt"
 
 echo Déploiement terminé ! Les fichiers se trouvent dans le dossier 'deployment'
 pause
@@ -0,0 +1,72 @@
+import os
+import sys
+import sqlite3
+import importlib
+
+sys.path.append(os.getcwd())
+
+import pytest
+from creation_base_donnees.publication import images_path
+
+
+def _legacy_database(path):
+    """Base antérieure à la séparation des images : chaque image porte son code article"""
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE image (id INTEGER PRIMARY KEY, code_article TEXT, image BLOB)")
+    connection.executemany(
+        "INSERT INTO image VALUES (?, ?, ?)", [(2, "TDF000001", b"b"), (1, "TDF000001", b"a"), (3, "TDF000002", b"c")]
+    )
+    connection.commit()
+    connection.close()
+
+
+def _split_database(path, with_images=True):
+    """Base actuelle : table d'association et miniatures, images en taille réelle dans images.db"""
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE articleimage (code_article TEXT, image_id INTEGER, PRIMARY KEY (code_article, image_id))")
+    connection.execute("CREATE TABLE imageminiature (image_id INTEGER PRIMARY KEY, miniature BLOB)")
+    connection.executemany("INSERT INTO articleimage VALUES (?, ?)", [("TDF000001", 1), ("TDF000002", 1)])
+    connection.execute("INSERT INTO imageminiature VALUES (1, x'00')")
+    connection.commit()
+    connection.close()
+    if with_images:
+        connection = sqlite3.connect(images_path(path))
+        connection.execute(
+            "CREATE TABLE image (id INTEGER PRIMARY KEY, empreinte TEXT, nb_references INTEGER, image BLOB)"
+        )
+        connection.execute("INSERT INTO image VALUES (1, 'e1', 2, x'01')")
+        connection.commit()
+        connection.close()
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """Module backend.api sur une base placée à côté de l'exécutable (dossier temporaire)"""
+    _legacy_database(tmp_path / "articles.db")
+    monkeypatch.setattr(sys, "frozen", True, raising=False)
+    monkeypatch.setattr(sys, "executable", str(tmp_path / "consultation_article.exe"))
+    if "backend.api" in sys.modules:
+        module = sys.modules["backend.api"]
+        module.set_database_path(str(tmp_path / "articles.db"))
+        return module
+    return importlib.import_module("backend.api")
+
+
+def test_images_legacy_database(api):
+    """Test la lecture des images d'une base antérieure à la table articleimage"""
+    images = api.get_images_by_article("TDF000001")
+    assert [(image.id, image.image) for image in images] == [(1, b"a"), (2, b"b")]
+    assert api.get_image_thumbnails("TDF000001") == [(1, None), (2, None)]
+    assert api.get_images_by_article("TDF999999") == []
+
+
+def test_images_split_database(api, tmp_path):
+    """Test la lecture des images d'une base actuelle, avec ou sans son fichier d'images"""
+    _split_database(tmp_path / "split.db")
+    api.set_database_path(str(tmp_path / "split.db"))
+    assert [(image.id, image.image) for image in api.get_images_by_article("TDF000002")] == [(1, b"\x01")]
+
+    _split_database(tmp_path / "sans_images.db", with_images=False)
+    api.set_database_path(str(tmp_path / "sans_images.db"))
+    assert api.get_images_by_article("TDF000001") == []
+    assert [tuple(row) for row in api.get_image_thumbnails("TDF000001")] == [(1, b"\x00")]
@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, Session, create_engine, select
+from creation_base_donnees.models import Nomenclature, BuildStage
+from creation_base_donnees.checkpoints import completed_stages, is_completed, reset_stage, mark_completed
+
+
+def test_checkpoints():
+    """Test l'enregistrement des étapes terminées et la remise à zéro d'une étape dont les sources ont changé"""
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Nomenclature(code_article_parent="A", code_article_fils="B", quantite=1.0))
+        mark_completed(session, "nomenclature", "empreinte-1", 1)
+        session.commit()
+
+        stages = completed_stages(session)
+        assert is_completed(stages, "nomenclature", "empreinte-1")
+        assert not is_completed(stages, "nomenclature", "empreinte-2")
+        assert not is_completed(stages, "article", "empreinte-1")
+
+        reset_stage(session, stages, "nomenclature", Nomenclature)
+        session.commit()
+        assert session.exec(select(Nomenclature)).all() == []
+        assert session.exec(select(BuildStage)).all() == []
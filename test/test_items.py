@@ -5,7 +5,8 @@ sys.path.append(os.getcwd())
 
 import pytest
 import polars as pl
-from creation_base_donnees.items import Items
+from creation_base_donnees.items import Items, coerce_to_schema
+from creation_base_donnees.schemas import ARTICLE_SCHEMA
 from creation_base_donnees.constants import folder_path_input, file_name_521, sheet_names_521
 
 
@@ -79,4 +80,51 @@ def test_dataframes_info(items_instance):
     assert items_instance.manufacturer_df.shape[0] > 0, "Le DataFrame manufacturer_df est vide"
     print(f"\nDimension de la table manufacturer_df: {items_instance.manufacturer_df.shape}")
     print("Schema de la table manufacturer_df:")
-    print(items_instance.manufacturer_df.schema)
\ No newline at end of file
+    print(items_instance.manufacturer_df.schema)
+
+
+def test_coerce_to_schema():
+    """Test la conversion vectorisée d'un DataFrame brut vers le schéma article"""
+    raw_df = pl.DataFrame({
+        "code_article": ["ART001", "ART002"],
+        "peremption": ["OUI", "NON"],
+        "fragile": [None, "OUI"],
+        "poids_article": ["1.5", None],
+        "delai_approvisionnement": ["12.0", "3"],
+        "date_creation_article": ["2024-01-15 10:30:00", None],
+    })
+    df = raw_df.select(coerce_to_schema(raw_df.schema, ARTICLE_SCHEMA))
+    assert df.columns == list(ARTICLE_SCHEMA)
+    for name, dtype in ARTICLE_SCHEMA.items():
+        assert df[name].dtype == dtype
+    assert df["peremption"].to_list() == [True, False]
+    assert df["fragile"].to_list() == [False, True]
+    assert df["poids_article"].to_list() == [1.5, None]
+    assert df["delai_approvisionnement"].to_list() == [12, 3]
+    assert df["date_creation_article"][0].year == 2024
+    # Colonne absente du fichier : booléen à False, texte à null
+    assert df["matiere_dangereuse"].to_list() == [False, False]
+    assert df["md_code_onu"].to_list() == [None, None]
+
+
+def test_items_from_dataframes():
+    """Test la construction depuis des feuilles déjà chargées : doublons, fusion TRANSPORT et fabricants"""
+    main_df = pl.DataFrame({
+        "code_article": ["ART001", "ART002", "ART001"],
+        "libelle_court_article": ["Câble", "Connecteur", "Câble modifié"],
+        "feuille_du_catalogue": ["EMI.AM.OC", None, "EMI.AM.OC"],
+        "nom_fabricant": ["FAB", None, "FAB"],
+        "reference_article_fabricant": ["REF1", None, "REF1"],
+    })
+    transport_df = pl.DataFrame({
+        "code_article": ["ART002"],
+        "libelle_court_article": ["Ignoré"],
+        "fragile": ["OUI"],
+    })
+    items = Items.from_dataframes([main_df, transport_df])
+    assert items.items_df["code_article"].to_list() == ["ART001", "ART002"]
+    assert items.items_df["libelle_court_article"].to_list() == ["Câble", "Connecteur"]
+    assert items.items_df["fragile"].to_list() == [False, True]
+    assert items.items_df["is_oc"].to_list() == [True, False]
+    assert items.duplicate_codes == ["ART001"]
+    assert items.get_manufacturer_lines().rows() == [("ART001", "FAB", "REF1")]
@@ -1,11 +1,14 @@
 import os
 import sys
+import zipfile
 
 sys.path.append(os.getcwd())
 
 import pytest
 import polars as pl
+from creation_base_donnees import load_file
 from creation_base_donnees.load_file import read_excel
+from creation_base_donnees.schemas import ColumnSpec
 from creation_base_donnees.constants import folder_path_input, file_name_521, sheet_names_521
 
 
@@ -19,3 +22,127 @@ def test_read_excel_521(sheet_name):
     print(f"Dimension du Dataframe: {df.shape}")
     print("Schema du Dataframe:")
     print(df.schema)
+
+
+def test_read_excel_cache(tmp_path, monkeypatch):
+    """Test la lecture depuis le cache Parquet et son invalidation quand le fichier change"""
+    monkeypatch.setattr(load_file, "get_cache_folder", lambda: tmp_path / "cache")
+    file_path = tmp_path / "classeur.xlsx"
+    file_path.write_bytes(b"pas un vrai classeur")
+
+    # Le cache est alimenté comme après une première lecture du fichier
+    cached_df = pl.DataFrame({"code_article": ["TDF000001"]})
+    cache_file, cache_name = load_file._cache_path(str(file_path), "Feuille", tmp_path / "cache")
+    load_file._write_cache(cached_df, cache_file, cache_name)
+    assert read_excel(str(tmp_path), file_path.name, "Feuille").equals(cached_df)
+
+    # Fichier modifié : le cache est ignoré et le classeur relu
+    file_path.write_bytes(b"contenu modifie, toujours illisible")
+    with pytest.raises(Exception, match="Erreur lors de la lecture du fichier Excel"):
+        read_excel(str(tmp_path), file_path.name, "Feuille")
+    with pytest.raises(Exception, match="Erreur lors de la lecture du fichier Excel"):
+        read_excel(str(tmp_path), file_path.name, "Feuille", use_cache=False)
+
+
+def _write_xlsx(path, header, rows):
+    """Classeur .xlsx minimal d'une feuille "Feuille" : en-têtes en chaînes partagées,
+    valeurs numériques ou texte en ligne"""
+    namespace = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    relationships = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+    def cell(reference, value):
+        if isinstance(value, str):
+            return f'<c r="{reference}" t="inlineStr"><is><t>{value}</t></is></c>'
+        return f'<c r="{reference}"><v>{value}</v></c>'
+
+    lines = ['<row r="1">' + "".join(
+        f'<c r="{chr(65 + i)}1" t="s"><v>{i}</v></c>' for i in range(len(header))
+    ) + "</row>"]
+    for r, row in enumerate(rows, start=2):
+        lines.append(f'<row r="{r}">' + "".join(
+            cell(f"{chr(65 + i)}{r}", value) for i, value in enumerate(row) if value is not None
+        ) + "</row>")
+
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml",
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            '</Types>')
+        archive.writestr("_rels/.rels",
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{relationships}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+        archive.writestr("xl/workbook.xml",
+            f'<workbook {namespace} xmlns:r="{relationships}"><sheets>'
+            '<sheet name="Feuille" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        archive.writestr("xl/_rels/workbook.xml.rels",
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{relationships}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{relationships}/sharedStrings" Target="sharedStrings.xml"/>'
+            '</Relationships>')
+        archive.writestr("xl/sharedStrings.xml",
+            f'<sst {namespace}>' + "".join(f"<si><t>{label}</t></si>" for label in header) + "</sst>")
+        archive.writestr("xl/worksheets/sheet1.xml", f'<worksheet {namespace}><sheetData>{"".join(lines)}</sheetData></worksheet>')
+
+
+def test_read_excel_columns(tmp_path):
+    """Test la lecture des seules colonnes spécifiées, converties vers leur type"""
+    _write_xlsx(
+        tmp_path / "classeur.xlsx",
+        ["Code article", "Poids article", "Délai approvisionnement", "Commentaire", "Date création article", "Compte CG achat"],
+        [[123456, 1.123456789012, 12, "ignoré", "2024-01-15 10:30:00", 606100],
+         ["TDF000001", "1,5", None, "ignoré", None, 606100.5]],
+    )
+
+    columns = [
+        ColumnSpec("code_article", pl.String),
+        ColumnSpec("poids", pl.Float64, source="Poids article"),
+        ColumnSpec("delai_approvisionnement", pl.Int64),
+        ColumnSpec("date_creation_article", pl.Datetime("us")),
+        ColumnSpec("compte_cg_achat", pl.String),
+        ColumnSpec("absente", pl.String),
+    ]
+    df = read_excel(str(tmp_path), "classeur.xlsx", "Feuille", use_cache=False, columns=columns)
+    assert df.columns == ["code_article", "poids", "delai_approvisionnement", "date_creation_article", "compte_cg_achat"]
+    assert df["code_article"].to_list() == ["123456", "TDF000001"]
+    # Colonne numérique contenant du texte : relue en nombre, sans perte de précision
+    assert df["poids"].to_list() == [1.123456789012, None]
+    assert df["delai_approvisionnement"].to_list() == [12, None]
+    assert df["date_creation_article"].dtype == pl.Datetime("us")
+    assert df["compte_cg_achat"].to_list() == ["606100", "606100.5"]
+
+
+def test_read_excel_known_headers(tmp_path, monkeypatch):
+    """Test la lecture en une seule analyse d'une nouvelle version du fichier dont les en-têtes sont connus"""
+    monkeypatch.setattr(load_file, "get_cache_folder", lambda: tmp_path / "cache")
+    loads = []
+    read_excel_engine = load_file.fastexcel.read_excel
+
+    class CountingReader:
+        def __init__(self, path):
+            self.reader = read_excel_engine(path)
+
+        def load_sheet(self, *args, **kwargs):
+            loads.append(kwargs.get("dtypes"))
+            return self.reader.load_sheet(*args, **kwargs)
+
+    monkeypatch.setattr(load_file.fastexcel, "read_excel", CountingReader)
+    columns = [ColumnSpec("code_article", pl.String), ColumnSpec("poids_article", pl.Float64)]
+    header = ["Code article", "Poids article"]
+
+    # Première lecture : la colonne numérique contenant du texte est relue avec son type
+    _write_xlsx(tmp_path / "classeur.xlsx", header, [[123456, 1.123456789012], ["TDF000001", "1,5"]])
+    df = read_excel(str(tmp_path), "classeur.xlsx", "Feuille", columns=columns)
+    assert len(loads) == 2
+    assert df["poids_article"].to_list() == [1.123456789012, None]
+
+    # Nouvelle version du fichier : les types sont imposés dès la première analyse
+    loads.clear()
+    _write_xlsx(tmp_path / "classeur.xlsx", header, [[654321, 2.123456789012], ["TDF000002", "2,5"], ["TDF000003", 3.0]])
+    df = read_excel(str(tmp_path), "classeur.xlsx", "Feuille", columns=columns)
+    assert loads == [{"Code article": "string", "Poids article": "float"}]
+    assert df["code_article"].to_list() == ["654321", "TDF000002", "TDF000003"]
+    assert df["poids_article"].to_list() == [2.123456789012, None, 3.0]
@@ -0,0 +1,114 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import polars as pl
+import creation_base_donnees.nomenclature_graph as nomenclature_graph
+from creation_base_donnees.nomenclature_graph import nomenclature_levels, nomenclature_closure, strongly_connected_components
+from creation_base_donnees.schemas import NOMENCLATURE_SCHEMA, NOMENCLATURE_LEVEL_SCHEMA, NOMENCLATURE_CLOSURE_SCHEMA
+
+
+def _nomenclatures(edges):
+    """Lignes de nomenclature de quantité 1 à partir de couples (parent, fils)"""
+    return pl.DataFrame(
+        {
+            "code_article_parent": [parent for parent, _ in edges],
+            "code_article_fils": [child for _, child in edges],
+            "quantite": [1.0] * len(edges),
+        },
+        schema=NOMENCLATURE_SCHEMA,
+    )
+
+
+def test_strongly_connected_components():
+    """Test les composantes produites dans l'ordre topologique inverse"""
+    # 0 -> 1 -> 2 -> 1, 2 -> 3
+    components = strongly_connected_components([[1], [2], [1, 3], []])
+    assert [sorted(component) for component in components] == [[3], [1, 2], [0]]
+
+
+def test_nomenclature_levels():
+    """Test le niveau, la hauteur, les descendants et les cycles de chaque article"""
+    # A contient B et C qui contiennent tous deux D ; D et E forment un cycle ; F -> G est isolé
+    levels_df, cycles = nomenclature_levels(_nomenclatures([
+        ("A", "B"), ("A", "C"), ("B", "D"), ("C", "D"), ("D", "E"), ("E", "D"), ("F", "G"),
+    ]))
+    assert levels_df.schema == pl.Schema(NOMENCLATURE_LEVEL_SCHEMA)
+    assert cycles == [["D", "E"]]
+    rows = {row["code_article"]: row for row in levels_df.iter_rows(named=True)}
+    assert {code: row["niveau"] for code, row in rows.items()} == {"A": 0, "B": 1, "C": 1, "D": 2, "E": 2, "F": 0, "G": 1}
+    assert {code: row["nb_descendants"] for code, row in rows.items()} == {"A": 4, "B": 2, "C": 2, "D": 1, "E": 1, "F": 1, "G": 0}
+    # Un cycle est atteint depuis A : son arbre est infini
+    assert rows["A"]["hauteur"] is None and rows["F"]["hauteur"] == 1 and rows["G"]["hauteur"] == 0
+    assert rows["D"]["cycle"] == rows["E"]["cycle"] == 1 and rows["A"]["cycle"] is None
+
+
+def test_nomenclature_levels_deep_chain():
+    """Test une chaîne plus profonde que la limite de récursion de Python"""
+    depth = 5000
+    levels_df, cycles = nomenclature_levels(_nomenclatures([(f"A{i:05d}", f"A{i + 1:05d}") for i in range(depth)]))
+    assert cycles == []
+    top = levels_df.filter(pl.col("code_article") == "A00000").row(0, named=True)
+    assert top["hauteur"] == depth and top["nb_descendants"] == depth
+    assert levels_df["niveau"].max() == depth
+
+
+def test_nomenclature_levels_dense(monkeypatch):
+    """Test le décompte des descendants passé en ensembles de bits au-delà de quelques éléments"""
+    nomenclature_df = _nomenclatures(
+        [(f"A{i:02d}", f"A{j:02d}") for i in range(30) for j in range(i + 1, 30, 3)] + [("A29", "A27")]
+    )
+    sparse_df, _ = nomenclature_levels(nomenclature_df)
+    monkeypatch.setattr(nomenclature_graph, "_MIN_DENSE_SIZE", 2)
+    dense_df, cycles = nomenclature_levels(nomenclature_df)
+    assert dense_df.equals(sparse_df)
+    assert cycles == [["A27", "A28", "A29"]]
+    # A00 atteint tous les autres articles
+    assert dense_df.filter(pl.col("code_article") == "A00")["nb_descendants"].item() == 29
+
+
+def test_nomenclature_closure():
+    """Test la fermeture transitive : profondeur minimale, quantités cumulées, chemins et cycles"""
+    # A contient 2 B (en deux lignes) et 3 C ; B contient 4 D et C 5 D ; F contient G qui est dans un cycle avec H
+    nomenclature_df = pl.DataFrame({
+        "code_article_parent": ["A", "A", "A", "B", "C", "F", "G", "H"],
+        "code_article_fils": ["B", "B", "C", "D", "D", "G", "H", "G"],
+        "quantite": [1.0, 1.0, 3.0, 4.0, 5.0, 1.0, 1.0, 1.0],
+    }, schema=NOMENCLATURE_SCHEMA)
+    levels_df, _ = nomenclature_levels(nomenclature_df)
+    closure_df, levels_df = nomenclature_closure(nomenclature_df, levels_df, max_descendants=100, max_rows=100)
+    assert closure_df.schema == pl.Schema(NOMENCLATURE_CLOSURE_SCHEMA)
+    closure = {(row[0], row[1]): row[2:] for row in closure_df.rows()}
+    assert closure[("A", "B")] == (1, 2.0, 2)
+    assert closure[("A", "D")] == (2, 2.0 * 4.0 + 3.0 * 5.0, 3)
+    assert closure[("F", "H")] == (2, None, None)
+    assert ("G", "G") not in closure and ("H", "H") not in closure
+    assert closure_df.height == levels_df["nb_descendants"].sum()
+    assert levels_df["fermeture_materialisee"].all()
+
+
+def test_nomenclature_closure_cycle():
+    """Test qu'un article d'un cycle n'a pas de ligne de fermeture vers lui-même, comme dans nb_descendants"""
+    # A et B forment un cycle, B contient C ; D contient A
+    nomenclature_df = _nomenclatures([("A", "B"), ("B", "A"), ("B", "C"), ("D", "A")])
+    levels_df, _ = nomenclature_levels(nomenclature_df)
+    closure_df, levels_df = nomenclature_closure(nomenclature_df, levels_df, max_descendants=100, max_rows=100)
+    counts = dict(closure_df.group_by("ancestor").len().rows())
+    assert counts == {code: n for code, n in levels_df.select("code_article", "nb_descendants").rows() if n}
+    assert closure_df.filter(pl.col("ancestor") == "A").sort("descendant").select("descendant", "min_depth").rows() == [
+        ("B", 1), ("C", 2)
+    ]
+
+
+def test_nomenclature_closure_guard():
+    """Test les limites de taille : les plus gros ancêtres ne sont pas matérialisés"""
+    nomenclature_df = _nomenclatures([("A", "B"), ("B", "C"), ("C", "D")])
+    levels_df, _ = nomenclature_levels(nomenclature_df)
+    closure_df, levels_df = nomenclature_closure(nomenclature_df, levels_df, max_descendants=2, max_rows=100)
+    assert levels_df.filter(~pl.col("fermeture_materialisee"))["code_article"].to_list() == ["A"]
+    assert closure_df.filter(pl.col("ancestor") == "A").height == 0
+
+    closure_df, levels_df = nomenclature_closure(nomenclature_df, levels_df, max_descendants=100, max_rows=2)
+    assert levels_df.filter(~pl.col("fermeture_materialisee"))["code_article"].to_list() == ["A", "B"]
+    assert closure_df.rows() == [("C", "D", 1, 1.0, 1)]
@@ -5,7 +5,7 @@ sys.path.append(os.getcwd())
 
 import pytest
 import polars as pl
-from creation_base_donnees.items import Nomenclatures
+from creation_base_donnees.items import Nomenclatures, NomenclatureCycleError
 from creation_base_donnees.constants import folder_path_input, file_name_531, sheet_name_531
 
 
@@ -96,4 +96,65 @@ def test_dataframe_info(nomenclatures_instance):
     # Affiche un exemple de nomenclature
     parent_code = next(iter(nomenclatures_instance.nomenclature_dictionnary))
     print(f"\nExemple de nomenclature pour l'article {parent_code}:")
-    print(nomenclatures_instance.get_item_nomenclature(parent_code))
\ No newline at end of file
+    print(nomenclatures_instance.get_item_nomenclature(parent_code))
+
+
+@pytest.fixture
+def synthetic_nomenclatures():
+    """Nomenclatures construites depuis une feuille 531 synthétique"""
+    df = pl.DataFrame({
+        "article": ["A", "A", "A", "B", "B", "C", "D"],
+        "article_eqpt_article_fils": ["B", "C", "A", "C", "E", "E", "E"],
+        "art_et_art_fils_eqpt_quantite": [2.0, 1.0, 1.0, 3.0, None, 0.0, 5.0],
+    })
+    return Nomenclatures.from_dataframe(df)
+
+
+def test_nomenclature_dictionary_from_dataframe(synthetic_nomenclatures):
+    """Test la construction du dictionnaire par group_by sur des données synthétiques"""
+    assert synthetic_nomenclatures.nomenclature_dictionnary == {
+        "A": [{"code_article": "B", "quantite": 2.0}, {"code_article": "C", "quantite": 1.0}],
+        "B": [{"code_article": "C", "quantite": 3.0}],
+        "D": [{"code_article": "E", "quantite": 5.0}],
+    }
+
+
+def test_get_item_nomenclature_shared_subtree(synthetic_nomenclatures):
+    """Test l'expansion d'une nomenclature dont un sous-ensemble est partagé"""
+    nomenclature = synthetic_nomenclatures.get_item_nomenclature("A", multiplying_factor=2)
+    assert nomenclature == {
+        "code_article": "A",
+        "quantite": 2,
+        "article_fils": [
+            {"code_article": "B", "quantite": 4.0, "article_fils": [{"code_article": "C", "quantite": 12.0}]},
+            {"code_article": "C", "quantite": 2.0},
+        ],
+    }
+    # Quantité reprise de l'article parent
+    assert synthetic_nomenclatures.get_item_nomenclature("C", item_parent="B")["quantite"] == 3.0
+
+
+def test_get_item_nomenclature_table(synthetic_nomenclatures):
+    """Test la vue à plat (chemin, niveau, code, quantité cumulée)"""
+    table = synthetic_nomenclatures.get_item_nomenclature_table("A")
+    assert table.rows() == [
+        ("A", 0, "A", 1.0),
+        ("A/B", 1, "B", 2.0),
+        ("A/B/C", 2, "C", 6.0),
+        ("A/C", 1, "C", 1.0),
+    ]
+    assert synthetic_nomenclatures.get_item_total_quantities("A") == {"A": 1, "B": 2.0, "C": 7.0}
+
+
+def test_get_item_nomenclature_cycle():
+    """Test la détection explicite d'un cycle dans la nomenclature"""
+    df = pl.DataFrame({
+        "article": ["A", "B", "C"],
+        "article_eqpt_article_fils": ["B", "C", "A"],
+        "art_et_art_fils_eqpt_quantite": [1.0, 1.0, 1.0],
+    })
+    nomenclatures = Nomenclatures.from_dataframe(df)
+    with pytest.raises(NomenclatureCycleError) as error:
+        nomenclatures.get_item_nomenclature("A")
+    assert error.value.cycle == ["A", "B", "C", "A"]
+
@@ -0,0 +1,133 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import pytest
+from PIL import Image as PILImage
+import io
+import random
+import hashlib
+import shutil
+import creation_base_donnees.photos as photos_module
+from creation_base_donnees.photos import (
+    resize_photos, list_photos, compare_with_manifest, file_digest, deduplicate_photos, load_and_resize, encode_image,
+    THUMBNAIL_SIZE, MIN_QUALITY
+)
+
+
+@pytest.fixture
+def folder_photo(tmp_path):
+    """Dossier photos avec deux photos nommées d'après un code article et un fichier ignoré"""
+    PILImage.new("RGB", (40, 30), (255, 0, 0)).save(tmp_path / "TDF12345678_face.jpg")
+    PILImage.new("RGB", (1000, 500), (0, 0, 255)).save(tmp_path / "TDF12345679_grande.jpg")
+    PILImage.new("RGB", (40, 30), (0, 255, 0)).save(tmp_path / "photo.TDF87654321.png")
+    (tmp_path / "TDF11111111.txt").write_text("pas une photo")
+    return str(tmp_path)
+
+
+def test_list_photos(folder_photo):
+    """Test le parcours du dossier photos"""
+    photos = sorted(list_photos(folder_photo), key=lambda photo: photo["nom_fichier"])
+    assert [(photo["nom_fichier"], photo["code_article"]) for photo in photos] == [
+        ("TDF12345678_face.jpg", "TDF123456"),
+        ("TDF12345679_grande.jpg", "TDF123456"),
+        ("photo.TDF87654321.png", "TDF876543"),
+    ]
+    assert all(photo["taille"] > 0 for photo in photos)
+
+
+def test_compare_with_manifest(folder_photo):
+    """Test la détection des photos inchangées, modifiées, nouvelles et supprimées"""
+    photos = {photo["nom_fichier"]: photo for photo in list_photos(folder_photo)}
+    face = photos["TDF12345678_face.jpg"]
+    manifest = {
+        # Inchangée : même taille et même date
+        "TDF12345678_face.jpg": {**face, "empreinte": "x", "image_id": 1},
+        # Supprimée du dossier
+        "TDF00000000.jpg": {"taille": 1, "date_modification": 0.0, "empreinte": "y", "image_id": 2},
+    }
+    unchanged, to_process, deleted = compare_with_manifest(folder_photo, list(photos.values()), manifest)
+    assert [photo["image_id"] for photo in unchanged] == [1]
+    assert sorted(photo["nom_fichier"] for photo in to_process) == ["TDF12345679_grande.jpg", "photo.TDF87654321.png"]
+    assert deleted == ["TDF00000000.jpg"]
+
+    # Date modifiée mais contenu identique : la photo reste inchangée
+    manifest["TDF12345678_face.jpg"] = {
+        **face,
+        "date_modification": face["date_modification"] - 60,
+        "empreinte": file_digest(os.path.join(folder_photo, "TDF12345678_face.jpg")),
+        "image_id": 1,
+    }
+    unchanged, to_process, deleted = compare_with_manifest(folder_photo, list(photos.values()), manifest)
+    assert [photo["image_id"] for photo in unchanged] == [1]
+
+    # Photo encodée autrement : retraitée
+    manifest["TDF12345678_face.jpg"]["encodage"] = "JPEG q85"
+    unchanged, to_process, deleted = compare_with_manifest(folder_photo, list(photos.values()), manifest, "WEBP q80")
+    assert unchanged == []
+
+
+def test_load_and_resize_thumbnail(folder_photo):
+    """Test la miniature générée avec l'image redimensionnée"""
+    photo = next(photo for photo in list_photos(folder_photo) if photo["nom_fichier"] == "TDF12345679_grande.jpg")
+    result = load_and_resize(folder_photo, photo)
+    image = PILImage.open(io.BytesIO(result["image"]))
+    miniature = PILImage.open(io.BytesIO(result["miniature"]))
+    assert image.size == (700, 350)
+    assert miniature.size == (THUMBNAIL_SIZE[0], THUMBNAIL_SIZE[1] // 2)
+    assert len(result["miniature"]) < len(result["image"])
+    assert result["empreinte_image"] == hashlib.sha256(result["image"]).hexdigest()
+
+
+def test_deduplicate_photos(folder_photo):
+    """Test les photos en double écartées du redimensionnement"""
+    # Même contenu pour un autre article, puis sous un autre nom pour le même article
+    shutil.copy(os.path.join(folder_photo, "TDF12345678_face.jpg"), os.path.join(folder_photo, "TDF99999999_copie.jpg"))
+    shutil.copy(os.path.join(folder_photo, "TDF12345678_face.jpg"), os.path.join(folder_photo, "TDF12345678_bis.jpg"))
+    photos = sorted(list_photos(folder_photo), key=lambda photo: photo["nom_fichier"])
+
+    to_resize, linked, duplicates = deduplicate_photos(folder_photo, photos, {})
+    assert sorted(photo["nom_fichier"] for photo in to_resize) == [
+        "TDF12345678_bis.jpg", "TDF12345679_grande.jpg", "photo.TDF87654321.png"
+    ]
+    assert linked == []
+    assert [photo["nom_fichier"] for photo in duplicates["TDF12345678_bis.jpg"]] == [
+        "TDF12345678_face.jpg", "TDF99999999_copie.jpg"
+    ]
+
+    # Photo identique à une photo déjà importée : reliée à son image
+    face = next(photo for photo in photos if photo["nom_fichier"] == "TDF12345678_face.jpg")
+    known = {(face["taille"], file_digest(os.path.join(folder_photo, face["nom_fichier"]))): 7}
+    to_resize, linked, duplicates = deduplicate_photos(folder_photo, photos, known)
+    assert sorted((photo["nom_fichier"], photo["image_id"]) for photo in linked) == [
+        ("TDF12345678_bis.jpg", 7), ("TDF12345678_face.jpg", 7), ("TDF99999999_copie.jpg", 7)
+    ]
+    assert duplicates == {}
+
+
+def test_encode_image():
+    """Test les formats d'encodage et la taille cible"""
+    rng = random.Random(0)
+    img = PILImage.new("RGB", (300, 200))
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(300 * 200)])
+    webp = encode_image(img, "WEBP", 80)
+    assert PILImage.open(io.BytesIO(webp)).format == "WEBP"
+
+    jpeg = encode_image(img, "JPEG", 85)
+    target = len(jpeg) // 2
+    smaller = encode_image(img, "JPEG", 85, target_bytes=target)
+    assert len(smaller) <= target
+    # Cible inatteignable : l'encodage à la qualité minimale
+    assert encode_image(img, "JPEG", 85, target_bytes=1) == encode_image(img, "JPEG", MIN_QUALITY)
+
+    with pytest.raises(ValueError):
+        encode_image(img, "GIF", 85)
+
+
+def test_resize_photos_empty(folder_photo, monkeypatch):
+    """Test qu'aucun pool de processus n'est créé sans photo à redimensionner"""
+    def no_pool(*args, **kwargs):
+        raise AssertionError("pool de processus créé")
+    monkeypatch.setattr(photos_module, "ProcessPoolExecutor", no_pool)
+    assert list(resize_photos(folder_photo, [], max_workers=64)) == []
@@ -0,0 +1,32 @@
+import os
+import sys
+import json
+
+sys.path.append(os.getcwd())
+
+from creation_base_donnees.profiling import BuildProfiler
+
+
+def test_build_profiler(tmp_path):
+    """Test l'enregistrement des étapes et l'export JSON du profil"""
+    profiler = BuildProfiler()
+    with profiler.stage("lecture", rows_in=10) as stage:
+        stage["lignes_sortie"] = 8
+        stage["octets_ecrits"] = 1024
+    with profiler.stage("écriture"):
+        pass
+
+    assert [stage["etape"] for stage in profiler.stages] == ["lecture", "écriture"]
+    lecture = profiler.stages[0]
+    assert (lecture["lignes_entree"], lecture["lignes_sortie"], lecture["octets_ecrits"]) == (10, 8, 1024)
+    assert lecture["fin"] >= lecture["debut"] and lecture["cpu"] >= 0
+    # Pic cumulé du processus : il ne diminue pas d'une étape à la suivante
+    peaks = [stage["pic_memoire_processus"] for stage in profiler.stages]
+    if peaks[0] is not None:
+        assert 0 < peaks[0] <= peaks[1]
+
+    profiler.write_json(tmp_path / "profil.json")
+    with open(tmp_path / "profil.json", encoding="utf-8") as f:
+        profile = json.load(f)
+    assert [stage["etape"] for stage in profile["etapes"]] == ["lecture", "écriture"]
+    assert "lecture" in profiler.format()
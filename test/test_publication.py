@@ -0,0 +1,98 @@
+import os
+import sys
+import sqlite3
+
+sys.path.append(os.getcwd())
+
+import pytest
+from creation_base_donnees.publication import (
+    PublicationError, MANIFEST_NAME, snapshot_name, read_manifest, current_snapshot,
+    validate_database, publish, images_path, copy_snapshot, read_only_uri, VERSIONS_KEPT
+)
+
+
+def _build(path, nb_articles):
+    """Base minimale avec une table article de nb_articles lignes"""
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE article (code_article TEXT PRIMARY KEY)")
+    connection.executemany("INSERT INTO article VALUES (?)", [(f"TDF{i:06d}",) for i in range(nb_articles)])
+    connection.commit()
+    connection.close()
+
+
+def _build_images(db_path, nb_images):
+    """Fichier d'images d'une base avec une table image de nb_images lignes"""
+    connection = sqlite3.connect(images_path(db_path))
+    connection.execute("CREATE TABLE image (id INTEGER PRIMARY KEY, code_article TEXT, image BLOB)")
+    connection.executemany("INSERT INTO image VALUES (?, ?, ?)", [(i, "TDF000000", b"x") for i in range(nb_images)])
+    connection.commit()
+    connection.close()
+
+
+def test_validate_database(tmp_path):
+    """Test le refus d'une base vide ou dont le nombre de lignes diffère de celui attendu"""
+    db_path = tmp_path / "build.db.tmp"
+    _build(db_path, 3)
+    assert validate_database(db_path, {"article": 3}) == {"article": 3}
+    with pytest.raises(PublicationError):
+        validate_database(db_path, {"article": 4})
+
+    empty_path = tmp_path / "empty.db.tmp"
+    _build(empty_path, 0)
+    with pytest.raises(PublicationError):
+        validate_database(empty_path, {"article": 0})
+
+    # Les images sont comptées dans le fichier d'images attaché
+    _build_images(db_path, 2)
+    assert validate_database(db_path, {"article": 3, "image": 2}) == {"article": 3, "image": 2}
+    with pytest.raises(PublicationError):
+        validate_database(db_path, {"article": 3, "image": 1})
+
+
+def test_images_path(tmp_path):
+    """Test le nom du fichier des images associé à une base"""
+    assert images_path(tmp_path / "articles_20250101_000000_000000.db.tmp").name == "images_20250101_000000_000000.db.tmp"
+    assert images_path(tmp_path / "articles.db").name == "images.db"
+
+
+def test_publish(tmp_path):
+    """Test la publication versionnée, le manifeste et la purge des anciennes versions"""
+    assert current_snapshot(tmp_path) is None
+    versions = [f"20250101_000000_00000{i}" for i in range(VERSIONS_KEPT + 2)]
+    for i, version in enumerate(versions):
+        build_path = tmp_path / (snapshot_name(version) + ".tmp")
+        _build(build_path, i + 1)
+        _build_images(build_path, i + 1)
+        publish(build_path, tmp_path, version, {"article": i + 1})
+
+    manifest = read_manifest(tmp_path / MANIFEST_NAME)
+    assert manifest["version"] == versions[-1]
+    assert manifest["comptes"] == {"article": len(versions)}
+    assert manifest["images"] == images_path(snapshot_name(versions[-1])).name
+    assert current_snapshot(tmp_path) == tmp_path / snapshot_name(versions[-1])
+    assert sorted(path.name for path in tmp_path.glob("articles_*.db")) == [
+        snapshot_name(version) for version in versions[-VERSIONS_KEPT:]
+    ]
+    assert sorted(path.name for path in tmp_path.glob("images_*.db")) == [
+        images_path(snapshot_name(version)).name for version in versions[-VERSIONS_KEPT:]
+    ]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_copy_snapshot(tmp_path):
+    """Test la copie d'une version publiée dont le chemin contient des caractères réservés des URI"""
+    folder = tmp_path / "partage #1 ?été"
+    folder.mkdir()
+    _build(folder / "articles.db", 3)
+    copy_snapshot(folder / "articles.db", tmp_path / "copie.db")
+    connection = sqlite3.connect(tmp_path / "copie.db")
+    assert connection.execute("SELECT COUNT(*) FROM article").fetchone()[0] == 3
+    connection.close()
+
+
+def test_read_only_uri(tmp_path):
+    """Test l'ouverture immuable des seules versions publiées"""
+    assert read_only_uri(tmp_path / snapshot_name("20250101_000000_000001")).endswith("?mode=ro&immutable=1")
+    assert read_only_uri(tmp_path / "images_20250101_000000_000001.db").endswith("?mode=ro&immutable=1")
+    assert read_only_uri(tmp_path / "articles.db").endswith("/articles.db?mode=ro")
+    assert read_only_uri(tmp_path / (snapshot_name("20250101_000000_000001") + ".tmp")).endswith(".tmp?mode=ro")
@@ -0,0 +1,87 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import polars as pl
+from sqlmodel import SQLModel, Session, create_engine, select
+from creation_base_donnees.models import Article, ArticleManufacturer, Nomenclature
+from creation_base_donnees.refresh import diff_tables, refresh_database
+from creation_base_donnees.schemas import ARTICLE_SCHEMA, MANUFACTURER_SCHEMA, NOMENCLATURE_SCHEMA
+
+
+def _articles(rows):
+    """DataFrame au schéma article à partir de (code, libellé)"""
+    df = pl.DataFrame(
+        {"code_article": [code for code, _ in rows], "libelle_court_article": [libelle for _, libelle in rows]}
+    ).with_columns(pl.lit("PROP").alias("proprietaire_article"))
+    return df.select([
+        pl.col(name).cast(dtype) if name in df.columns
+        else pl.lit(False if dtype == pl.Boolean else None, dtype=dtype).alias(name)
+        for name, dtype in ARTICLE_SCHEMA.items()
+    ])
+
+
+def test_diff_tables_nomenclature():
+    """Test le calcul des insertions, mises à jour et suppressions"""
+    current = pl.DataFrame({
+        "id": [1, 2, 3],
+        "code_article_parent": ["A", "A", "B"],
+        "code_article_fils": ["B", "C", "C"],
+        "quantite": [1.0, 2.0, 3.0],
+    })
+    target = pl.DataFrame({
+        "code_article_parent": ["A", "A", "B"],
+        "code_article_fils": ["B", "C", "D"],
+        "quantite": [1.0, 5.0, 1.0],
+    })
+    diff = diff_tables(current, target, ["code_article_parent", "code_article_fils"], NOMENCLATURE_SCHEMA)
+    assert diff["inserts"].rows() == [("B", "D", 1.0)]
+    assert diff["updates"].rows() == [("A", "C", 5.0, 2)]
+    assert diff["deletes"]["id"].to_list() == [3]
+
+
+def test_diff_tables_duplicates_and_null_keys():
+    """Test l'appariement sur les colonnes de la clé : doublons un à un, clés vides égales entre elles"""
+    current = pl.DataFrame({
+        "id": [1, 2, 3],
+        "code_article": ["A", "A", "B"],
+        "nom_fabricant": ["FAB", "FAB", "FAB"],
+        "reference_article_fabricant": [None, None, "R1"],
+    })
+    target = pl.DataFrame({
+        "code_article": ["A", "B", "B"],
+        "nom_fabricant": ["FAB", "FAB", "FAB"],
+        "reference_article_fabricant": [None, "R1", "R1"],
+    })
+    diff = diff_tables(current, target, list(MANUFACTURER_SCHEMA), MANUFACTURER_SCHEMA)
+    assert diff["inserts"].rows() == [("B", "FAB", "R1")]
+    assert diff["updates"].height == 0
+    assert diff["deletes"]["id"].to_list() == [2]
+
+
+def test_refresh_database():
+    """Test le rafraîchissement d'une base existante"""
+    engine = create_engine("sqlite:///:memory:")
+    SQLModel.metadata.create_all(engine)
+    empty_manufacturers = pl.DataFrame(schema=MANUFACTURER_SCHEMA)
+    empty_nomenclatures = pl.DataFrame(schema=NOMENCLATURE_SCHEMA)
+
+    counts = refresh_database(engine, _articles([("A", "a"), ("B", "b")]), empty_manufacturers, empty_nomenclatures)
+    assert counts["article"] == {"inserts": 2, "updates": 0, "deletes": 0}
+
+    manufacturers = pl.DataFrame({"code_article": ["A"], "nom_fabricant": ["FAB"], "reference_article_fabricant": [None]},
+                                 schema=MANUFACTURER_SCHEMA)
+    counts = refresh_database(engine, _articles([("A", "a modifié"), ("C", "c")]), manufacturers, empty_nomenclatures)
+    assert counts["article"] == {"inserts": 1, "updates": 1, "deletes": 1}
+    assert counts["articlemanufacturer"] == {"inserts": 1, "updates": 0, "deletes": 0}
+
+    # Un second rafraîchissement avec les mêmes données n'écrit rien
+    counts = refresh_database(engine, _articles([("A", "a modifié"), ("C", "c")]), manufacturers, empty_nomenclatures)
+    assert all(count == 0 for table in counts.values() for count in table.values())
+
+    with Session(engine) as session:
+        articles = {article.code_article: article.libelle_court_article for article in session.exec(select(Article)).all()}
+        assert articles == {"A": "a modifié", "C": "c"}
+        assert len(session.exec(select(ArticleManufacturer)).all()) == 1
+        assert len(session.exec(select(Nomenclature)).all()) == 0
@@ -0,0 +1,103 @@
+import os
+import sys
+import sqlite3
+import threading
+
+sys.path.append(os.getcwd())
+
+import pytest
+import creation_base_donnees.publication as publication
+from creation_base_donnees.publication import MANIFEST_NAME, snapshot_name, read_manifest, publish, images_path
+from backend.replica import ReplicaError, copy_file, sync
+
+
+def _build(path, nb_articles):
+    """Base avec une table article de nb_articles lignes, et son fichier d'images"""
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE article (code_article TEXT PRIMARY KEY, libelle TEXT)")
+    connection.executemany(
+        "INSERT INTO article VALUES (?, ?)", [(f"TDF{i:06d}", "libellé " * 20) for i in range(nb_articles)]
+    )
+    connection.commit()
+    connection.close()
+    connection = sqlite3.connect(images_path(path))
+    connection.execute("CREATE TABLE image (id INTEGER PRIMARY KEY, image BLOB)")
+    connection.executemany("INSERT INTO image VALUES (?, ?)", [(i, bytes([i]) * 3000) for i in range(50)])
+    connection.commit()
+    connection.close()
+
+
+def _publish(folder, version, nb_articles):
+    build_path = folder / (snapshot_name(version) + ".tmp")
+    _build(build_path, nb_articles)
+    publish(build_path, folder, version, {"article": nb_articles})
+
+
+def test_sync(tmp_path, monkeypatch):
+    """Test la copie vérifiée de la version publiée et la reprise des blocs inchangés"""
+    monkeypatch.setattr(publication, "BLOCK_SIZE", 4096)
+    remote, local = tmp_path / "partage", tmp_path / "local"
+    remote.mkdir()
+    _publish(remote, "20250101_000000_000001", 500)
+
+    remote_db, local_db = sync(remote / MANIFEST_NAME, local)
+    assert local_db == local / snapshot_name("20250101_000000_000001")
+    assert local_db.read_bytes() == remote_db.read_bytes()
+    assert images_path(local_db).read_bytes() == images_path(remote_db).read_bytes()
+
+    # Nouvelle version : seuls les blocs modifiés sont lus sur le partage
+    _publish(remote, "20250101_000000_000002", 501)
+    manifest = read_manifest(remote / MANIFEST_NAME)
+    name = manifest["fichier"]
+    stats = copy_file(
+        remote / name, local / "copie.db", manifest["blocs"][name], manifest["taille_bloc"],
+        previous=local / snapshot_name("20250101_000000_000001")
+    )
+    assert stats["blocs_locaux"] > 0
+    assert (local / "copie.db").read_bytes() == (remote / name).read_bytes()
+
+    _, local_db = sync(remote / MANIFEST_NAME, local)
+    assert local_db.read_bytes() == (remote / name).read_bytes()
+    assert not list(local.glob("*.tmp"))
+
+
+def test_sync_reserved_characters(tmp_path):
+    """Test la réplique dans un dossier dont le chemin contient des caractères réservés des URI"""
+    remote, local = tmp_path / "partage", tmp_path / "local #1 ?été"
+    remote.mkdir()
+    _publish(remote, "20250101_000000_000001", 10)
+    remote_db, local_db = sync(remote / MANIFEST_NAME, local)
+    assert local_db.read_bytes() == remote_db.read_bytes()
+    # Le contrôle d'intégrité porte sur la copie, pas sur une base vide créée au chemin tronqué au "?"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["local #1 ?été", "partage"]
+
+
+def test_copy_file_verification(tmp_path, monkeypatch):
+    """Test le refus d'une copie dont un bloc ne correspond pas au manifeste"""
+    monkeypatch.setattr(publication, "BLOCK_SIZE", 4096)
+    remote, local = tmp_path / "partage", tmp_path / "local"
+    remote.mkdir()
+    local.mkdir()
+    _publish(remote, "20250101_000000_000001", 500)
+    manifest = read_manifest(remote / MANIFEST_NAME)
+    name = manifest["fichier"]
+
+    hashes = list(manifest["blocs"][name])
+    hashes[1] = "0" * 32
+    with pytest.raises(ReplicaError):
+        copy_file(remote / name, local / name, hashes, manifest["taille_bloc"])
+    assert not list(local.iterdir())
+
+
+def test_copy_file_stop(tmp_path):
+    """Test l'abandon d'une copie quand la synchronisation est arrêtée"""
+    remote, local = tmp_path / "partage", tmp_path / "local"
+    remote.mkdir()
+    local.mkdir()
+    _publish(remote, "20250101_000000_000001", 500)
+    name = read_manifest(remote / MANIFEST_NAME)["fichier"]
+    stop = threading.Event()
+    stop.set()
+    with pytest.raises(ReplicaError):
+        copy_file(remote / name, local / name, stop=stop)
+    assert not list(local.iterdir())
@@ -0,0 +1,117 @@
+import os
+import sys
+import sqlite3
+import time
+
+sys.path.append(os.getcwd())
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import text
+import creation_base_donnees.publication as publication
+from creation_base_donnees.publication import MANIFEST_NAME, snapshot_name, publish, resolve_snapshot
+from backend.snapshots import SnapshotManager, MMAP_SIZE, snapshot_url, url_path, is_immutable, create_snapshot_engine
+
+
+def _publish(folder, version, nb_articles):
+    build_path = folder / (snapshot_name(version) + ".tmp")
+    connection = sqlite3.connect(build_path)
+    connection.execute("CREATE TABLE article (code_article TEXT PRIMARY KEY)")
+    connection.executemany("INSERT INTO article VALUES (?)", [(f"TDF{i:06d}",) for i in range(nb_articles)])
+    connection.commit()
+    connection.close()
+    publish(build_path, folder, version, {"article": nb_articles})
+
+
+def _resolve_url(path):
+    return f"sqlite:///{resolve_snapshot(path)}"
+
+
+def _count(session):
+    return session.exec(text("SELECT COUNT(*) FROM article")).one()[0]
+
+
+def test_snapshot_swap(tmp_path):
+    """Test la bascule sur une nouvelle version, sans interrompre les sessions ouvertes"""
+    _publish(tmp_path, "20250101_000000_000001", 1)
+    manager = SnapshotManager(str(tmp_path / MANIFEST_NAME), _resolve_url, check_interval=0)
+    notified = []
+    manager.add_listener(notified.append)
+
+    with manager.session() as session:
+        assert _count(session) == 1
+    assert not manager.check()
+
+    # Une session ouverte avant la publication reste sur l'ancienne version
+    old_session = manager.session()
+    old_engine = manager.engine
+    _publish(tmp_path, "20250101_000000_000002", 2)
+    os.utime(tmp_path / MANIFEST_NAME, ns=(1, 1))
+    with manager.session() as session:
+        assert _count(session) == 2
+    assert notified == [manager.url]
+    assert manager.url.endswith(snapshot_name("20250101_000000_000002"))
+    assert _count(old_session) == 1
+    assert old_engine in manager._retired
+
+    # L'ancien moteur est fermé à la fermeture de sa dernière session
+    old_session.close()
+    assert old_engine not in manager._retired
+    assert not manager._in_flight
+
+    # Un abonné retiré n'est plus prévenu
+    manager.remove_listener(notified.append)
+    _publish(tmp_path, "20250101_000000_000003", 3)
+    os.utime(tmp_path / MANIFEST_NAME, ns=(2, 2))
+    assert manager.check()
+    assert len(notified) == 1
+
+
+def test_configure_replica(tmp_path, monkeypatch):
+    """Test l'arrêt de la réplique de l'ancien fichier configuré avant d'en lancer une autre"""
+    monkeypatch.setattr(publication, "BLOCK_SIZE", 4096)
+    remote = tmp_path / "partage"
+    remote.mkdir()
+    _publish(remote, "20250101_000000_000001", 2000)
+    manifest_path = str(remote / MANIFEST_NAME)
+    manager = SnapshotManager(manifest_path, _resolve_url, replica_dir=tmp_path / "local", check_interval=0)
+    first = manager.replica
+
+    manager.configure(manifest_path)
+    assert manager.replica is not first
+    assert first._thread is None
+    first.start(manifest_path)
+    assert first._thread is None
+
+    # Seule la nouvelle réplique copie la version publiée, puis la base est lue en local
+    deadline = time.monotonic() + 10
+    while url_path(manager.url).startswith(str(remote)):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+        manager.check()
+    with manager.session() as session:
+        assert _count(session) == 2000
+    assert url_path(manager.url) == str(tmp_path / "local" / snapshot_name("20250101_000000_000001"))
+    assert not list((tmp_path / "local").glob("*.tmp"))
+    manager.replica.stop()
+
+
+def test_read_only_snapshot(tmp_path):
+    """Test l'ouverture d'une version immuable en lecture seule"""
+    folder = tmp_path / "partage réseau"
+    folder.mkdir()
+    _publish(folder, "20250101_000000_000001", 3)
+    db_path = resolve_snapshot(folder / MANIFEST_NAME)
+
+    url = snapshot_url(db_path, immutable=True)
+    assert is_immutable(url) and not is_immutable(snapshot_url(db_path))
+    assert url_path(url) == url_path(snapshot_url(db_path)) == str(db_path)
+
+    engine = create_snapshot_engine(url)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT COUNT(*) FROM article").scalar() == 3
+        assert connection.exec_driver_sql("PRAGMA query_only").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA mmap_size").scalar() == MMAP_SIZE
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("INSERT INTO article VALUES ('TDF999999')")
+    engine.dispose()
@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+
+sys.path.append(os.getcwd())
+
+import pytest
+import polars as pl
+from creation_base_donnees.validation import validate_references
+from creation_base_donnees.items import Nomenclatures
+from creation_base_donnees.schemas import MANUFACTURER_SCHEMA, NOMENCLATURE_SCHEMA
+
+
+@pytest.fixture
+def tables():
+    """Articles A, B, C ; un fabricant orphelin, un couple en doublon, des parent et fils orphelins et une boucle"""
+    articles = pl.DataFrame({"code_article": ["A", "B", "C"]})
+    manufacturers = pl.DataFrame({
+        "code_article": ["A", "Z"],
+        "nom_fabricant": ["FAB1", "FAB2"],
+        "reference_article_fabricant": ["REF1", "REF2"],
+    }, schema=MANUFACTURER_SCHEMA)
+    nomenclatures = pl.DataFrame({
+        "code_article_parent": ["A", "A", "A", "B", "X", "C"],
+        "code_article_fils": ["B", "B", "C", "Y", "A", "C"],
+        "quantite": [1.0, 2.0, 1.0, 1.0, 1.0, 1.0],
+    }, schema=NOMENCLATURE_SCHEMA)
+    return articles, manufacturers, nomenclatures
+
+
+def test_validate_references_report(tables, tmp_path):
+    """Test la détection de chaque type d'anomalie et l'écriture du rapport"""
+    _, _, report = validate_references(*tables, policy="keep")
+    assert report.counts() == {
+        "fabricants_orphelins": 1,
+        "parents_orphelins": 1,
+        "fils_orphelins": 1,
+        "doublons_nomenclature": 1,
+        "boucles_nomenclature": 1,
+    }
+    assert report.anomalies["doublons_nomenclature"].rows() == [("A", "B", 2, 3.0)]
+    report.write_json(tmp_path / "controle.json")
+    with open(tmp_path / "controle.json", encoding="utf-8") as f:
+        assert json.load(f)["details"]["fils_orphelins"] == [
+            {"code_article_parent": "B", "code_article_fils": "Y", "quantite": 1.0}
+        ]
+
+
+@pytest.mark.parametrize("policy, expected_nomenclatures, expected_manufacturers", [
+    ("keep", 6, 2),
+    ("drop", [("A", "B", 1.0), ("A", "C", 1.0)], 1),
+    ("aggregate", [("A", "B", 3.0), ("A", "C", 1.0)], 1),
+])
+def test_validate_references_policies(tables, policy, expected_nomenclatures, expected_manufacturers):
+    """Test l'application de chaque politique aux tables contrôlées"""
+    manufacturers, nomenclatures, report = validate_references(*tables, policy=policy)
+    assert manufacturers.height == expected_manufacturers
+    assert nomenclatures.columns == list(NOMENCLATURE_SCHEMA)
+    if isinstance(expected_nomenclatures, int):
+        assert nomenclatures.height == expected_nomenclatures
+        assert report.removed == {"articlemanufacturer": 0, "nomenclature": 0}
+    else:
+        assert nomenclatures.rows() == expected_nomenclatures
+        assert report.removed == {"articlemanufacturer": 1, "nomenclature": 4}
+
+
+def test_validate_references_unknown_policy(tables):
+    """Test le refus d'une politique inconnue"""
+    with pytest.raises(ValueError):
+        validate_references(*tables, policy="ignore")
+
+
+def test_validate_references_sheet_loops():
+    """Test le signalement des boucles d'un article sur lui-même lues dans la feuille de nomenclature"""
+    nomenclatures = Nomenclatures.from_dataframe(pl.DataFrame({
+        "article": ["A", "B", "A"],
+        "article_eqpt_article_fils": ["B", "B", "C"],
+        "art_et_art_fils_eqpt_quantite": [1.0, 2.0, None],
+    }))
+    articles = pl.DataFrame({"code_article": ["A", "B", "C"]})
+    _, nomenclature_df, report = validate_references(articles, None, nomenclatures.get_nomenclature_lines(), "drop")
+    assert report.anomalies["boucles_nomenclature"].rows() == [("B", "B", 2.0)]
+    assert nomenclature_df.rows() == [("A", "B", 1.0)]
+    # La boucle n'est pas un fils de B pour le parcours des nomenclatures
+    assert "B" not in nomenclatures.nomenclature_dictionnary